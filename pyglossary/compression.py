@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 
 import os
+import io
+import zlib
+from bisect import bisect_right
+from collections import deque
 import logging
 
 stdCompressions = ("gz", "bz2", "lzma")
@@ -26,7 +30,12 @@ def compressionOpenFunc(c: str):
 	return None
 
 
-def compressionOpen(filename, dz=False, **kwargs):
+def compressionOpen(filename, dz=False, workers=0, **kwargs):
+	"""
+		if workers > 1, and the file is opened for writing with a
+		standard compression, the file is compressed in `workers` threads
+		see ParallelCompressWriter
+	"""
 	from os.path import splitext
 	filenameNoExt, ext = splitext(filename)
 	ext = ext.lower().lstrip(".")
@@ -37,6 +46,10 @@ def compressionOpen(filename, dz=False, **kwargs):
 	else:
 		_, ext = splitext(filenameNoExt)
 		ext = ext.lower().lstrip(".")
+	if ext in stdCompressions and workers > 1 and "w" in kwargs.get("mode", ""):
+		_file = parallelCompressOpen(filename, ext, workers, **kwargs)
+		_file.compression = ext
+		return _file
 	if ext in stdCompressions or (dz and ext == "dz"):
 		_file = compressionOpenFunc(ext)(filename, **kwargs)
 		_file.compression = ext
@@ -44,6 +57,349 @@ def compressionOpen(filename, dz=False, **kwargs):
 	return open(filename, **kwargs)
 
 
+def _compressBlock(compression: str, data: bytes) -> bytes:
+	"""
+		compresses data into a complete gzip member, bzip2 stream or
+		xz stream, with the same settings as gzip.open, bz2.open and
+		lzma.open
+		runs in worker threads, all three compressors release GIL
+	"""
+	if compression == "gz":
+		import gzip
+		return gzip.compress(data)
+	if compression == "bz2":
+		import bz2
+		return bz2.compress(data)
+	if compression == "lzma":
+		import lzma
+		return lzma.compress(data)
+	raise ValueError(f"unexpected {compression=}")
+
+
+class ParallelCompressWriter(io.BufferedIOBase):
+	"""
+		write-only compressed file (like gzip.open(filename, "wb")), that
+		splits data into blocks and compresses them in `workers` threads
+		(like pigz)
+
+		each block is written as a separate gzip member, bzip2 stream or
+		xz stream, so the output is a standard multi-member file that
+		gzip, bzip2 and xz tools (and python modules) decompress as one
+		compressed file is slightly larger than with one member, since
+		each block starts with an empty dictionary
+
+		blocks are written in order, and at most 2 * workers blocks are
+		kept in memory (besides the ones being compressed)
+		flush() does not cut the current block, so data is only written
+		to disk in complete blocks (and on close)
+
+		lzma compressor (with default preset) takes about 100 MiB of
+		memory, so lzma with 8 workers takes about 800 MiB
+	"""
+
+	blockSizeByCompression = {
+		"gz": 1024 * 1024,
+		"bz2": 4 * 1024 * 1024,
+		# same as dictionary size of lzma preset 6 (default)
+		"lzma": 8 * 1024 * 1024,
+	}
+
+	def __init__(
+		self,
+		filename: str,
+		compression: str,
+		workers: int = 0,
+	) -> None:
+		if compression not in self.blockSizeByCompression:
+			raise ValueError(f"unexpected {compression=}")
+		io.BufferedIOBase.__init__(self)
+		if workers < 1:
+			workers = os.cpu_count() or 1
+		self.name = filename
+		self._compression = compression
+		self._blockSize = self.blockSizeByCompression[compression]
+		self._file = open(filename, "wb")
+		self._workers = workers
+		self._executor = None
+		if workers > 1:
+			from concurrent.futures import ThreadPoolExecutor
+			self._executor = ThreadPoolExecutor(max_workers=workers)
+		self._pending = deque()
+		self._buf = bytearray()
+		# uncompressed size
+		self._size = 0
+
+	def writable(self) -> bool:
+		return True
+
+	def seekable(self) -> bool:
+		# for tell(), like GzipFile
+		return True
+
+	def tell(self) -> int:
+		return self._size
+
+	def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+		if whence == io.SEEK_CUR:
+			offset += self._size
+		elif whence != io.SEEK_SET:
+			raise io.UnsupportedOperation("seek")
+		if offset != self._size:
+			raise io.UnsupportedOperation("seek")
+		return self._size
+
+	def write(self, data: "bytes") -> int:
+		if self.closed:
+			raise ValueError("write to closed file")
+		buf = self._buf
+		oldLen = len(buf)
+		buf += data
+		size = len(buf) - oldLen
+		self._size += size
+		blockSize = self._blockSize
+		if len(buf) >= blockSize:
+			start = 0
+			while len(buf) - start >= blockSize:
+				self._submit(bytes(buf[start:start + blockSize]))
+				start += blockSize
+			del buf[:start]
+		return size
+
+	def _submit(self, block: bytes) -> None:
+		if self._executor is None:
+			self._file.write(_compressBlock(self._compression, block))
+			return
+		self._pending.append(self._executor.submit(
+			_compressBlock,
+			self._compression,
+			block,
+		))
+		while len(self._pending) > 2 * self._workers:
+			self._file.write(self._pending.popleft().result())
+
+	def flush(self) -> None:
+		if not self.closed:
+			self._file.flush()
+
+	def close(self) -> None:
+		if self.closed:
+			return
+		try:
+			# an empty file is still a valid compressed file
+			if self._buf or self._size == 0:
+				self._submit(bytes(self._buf))
+				self._buf = bytearray()
+			while self._pending:
+				self._file.write(self._pending.popleft().result())
+		finally:
+			if self._executor is not None:
+				for future in self._pending:
+					future.cancel()
+				self._executor.shutdown()
+				self._executor = None
+			# flushes self._file, so must be called before closing it
+			io.BufferedIOBase.close(self)
+			self._file.close()
+
+
+def parallelCompressOpen(
+	filename: str,
+	compression: str,
+	workers: int,
+	mode: str = "wb",
+	encoding: "Optional[str]" = None,
+	errors: "Optional[str]" = None,
+	newline: "Optional[str]" = None,
+) -> "io.IOBase":
+	"""
+		opens a ParallelCompressWriter, in binary or text mode
+		like gzip.open, mode is "wb" or "w" / "wt" for text mode
+	"""
+	if "r" in mode or "a" in mode or "+" in mode:
+		raise ValueError(f"invalid {mode=}, only writing is supported")
+	binaryFile = ParallelCompressWriter(filename, compression, workers=workers)
+	if "b" in mode:
+		return binaryFile
+	return io.TextIOWrapper(
+		binaryFile,
+		encoding=encoding,
+		errors=errors,
+		newline=newline,
+	)
+
+
+class SeekableGzipFile(io.RawIOBase):
+	"""
+		read-only gzip file with fast random access, for readers
+		that need to seek in a compressed input file
+
+		the file is decompressed sequentially like gzip.GzipFile, and
+		a checkpoint (a copy of zlib decompressor state and the offsets
+		in compressed and uncompressed data) is kept every
+		`checkpointSpan` bytes of uncompressed data (like zran.c in zlib)
+		seeking backward (or far forward) restarts decompressing from the
+		nearest checkpoint, instead of from the beginning of file
+
+		each checkpoint takes about 40 KiB of memory (mostly the 32 KiB
+		window of decompressor), so about 10 KiB per 1 MiB of data with
+		default span
+
+		`checkpoints` list can be shared by multiple objects that read the
+		same file, so the index is only built once
+		use seekableGzipOpen to get a buffered file object
+	"""
+
+	checkpointSpan = 4 * 1024 * 1024
+
+	# size of compressed data read from file at once
+	chunkSize = 64 * 1024
+
+	def __init__(
+		self,
+		filename: str,
+		checkpoints: "Optional[List[Tuple[int, int, Any]]]" = None,
+	) -> None:
+		io.RawIOBase.__init__(self)
+		self.name = filename
+		self._file = open(filename, "rb")
+		# list of (uncompressedOffset, compressedOffset, decompressor)
+		# tuples, sorted by offsets, not including the beginning of file
+		if checkpoints is None:
+			checkpoints = []
+		self._checkpoints = checkpoints
+		self._reset(0, 0, None)
+
+	def _reset(
+		self,
+		uOffset: int,
+		cOffset: int,
+		dobj: "Optional[zlib._Decompress]",
+	) -> None:
+		self._file.seek(cOffset)
+		# decompressor of current gzip member, or None between members
+		self._dobj = dobj.copy() if dobj is not None else None
+		# uncompressed offset of self._buf[0]
+		self._bufStart = uOffset
+		self._buf = b""
+		self._bufPos = 0
+		self._eof = False
+
+	def _addCheckpoint(self) -> None:
+		uOffset = self._bufStart + len(self._buf)
+		checkpoints = self._checkpoints
+		lastOffset = checkpoints[-1][0] if checkpoints else 0
+		if uOffset < lastOffset + self.checkpointSpan:
+			return
+		dobj = self._dobj.copy() if self._dobj is not None else None
+		checkpoints.append((uOffset, self._file.tell(), dobj))
+
+	def _fill(self) -> bool:
+		"""
+			replaces self._buf with the next chunk of uncompressed data
+			returns False at the end of file
+		"""
+		self._bufStart += len(self._buf)
+		self._buf = b""
+		self._bufPos = 0
+		while not self._buf:
+			if self._eof:
+				return False
+			data = self._file.read(self.chunkSize)
+			if not data:
+				self._eof = True
+				if self._dobj is not None and not self._dobj.eof:
+					raise EOFError(
+						"Compressed file ended before the "
+						"end-of-stream marker was reached",
+					)
+				return False
+			outList = []
+			while data:
+				if self._dobj is None or self._dobj.eof:
+					# start of next member, skipping zero padding
+					data = data.lstrip(b"\x00")
+					if not data:
+						break
+					self._dobj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+				outList.append(self._dobj.decompress(data))
+				data = self._dobj.unused_data
+			self._buf = b"".join(outList)
+		self._addCheckpoint()
+		return True
+
+	def readable(self) -> bool:
+		return True
+
+	def seekable(self) -> bool:
+		return True
+
+	def readinto(self, b: "bytearray") -> int:
+		while self._bufPos >= len(self._buf):
+			if not self._fill():
+				return 0
+		pos = self._bufPos
+		size = min(len(b), len(self._buf) - pos)
+		b[:size] = self._buf[pos:pos + size]
+		self._bufPos = pos + size
+		return size
+
+	def tell(self) -> int:
+		return self._bufStart + self._bufPos
+
+	def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+		if whence == io.SEEK_CUR:
+			offset += self.tell()
+		elif whence == io.SEEK_END:
+			while self._fill():
+				pass
+			offset += self._bufStart
+		elif whence != io.SEEK_SET:
+			raise ValueError(f"invalid {whence=}")
+		offset = max(offset, 0)
+
+		bufEnd = self._bufStart + len(self._buf)
+		if offset < self._bufStart or offset >= bufEnd + self.checkpointSpan:
+			checkpoints = self._checkpoints
+			# second item is larger than any compressed offset, so
+			# decompressor objects are never compared
+			index = bisect_right(checkpoints, (offset, float("inf")))
+			uOffset, cOffset, dobj = (0, 0, None)
+			if index > 0:
+				uOffset, cOffset, dobj = checkpoints[index - 1]
+			if offset < self._bufStart or uOffset > bufEnd:
+				self._reset(uOffset, cOffset, dobj)
+
+		while offset > self._bufStart + len(self._buf):
+			if not self._fill():
+				# like GzipFile, seeking past the end of file
+				# sets position to the end
+				return self.tell()
+		self._bufPos = offset - self._bufStart
+		return offset
+
+	def close(self) -> None:
+		if not self.closed:
+			self._file.close()
+			self._buf = b""
+			self._dobj = None
+		io.RawIOBase.close(self)
+
+
+def seekableGzipOpen(
+	filename: str,
+	checkpoints: "Optional[List[Tuple[int, int, Any]]]" = None,
+	bufferSize: int = io.DEFAULT_BUFFER_SIZE,
+) -> "io.BufferedReader":
+	"""
+		opens a gzip file for reading (in binary mode) with fast
+		random access, see SeekableGzipFile
+	"""
+	return io.BufferedReader(
+		SeekableGzipFile(filename, checkpoints=checkpoints),
+		buffer_size=bufferSize,
+	)
+
+
 def zipFileOrDir(glos: "GlossaryType", filename: str) -> "Optional[str]":
 	import zipfile
 	import shutil
@@ -97,9 +453,14 @@ def compress(glos: "GlossaryType", filename: str, compression: str) -> str:
 
 	compFilename = f"{filename}.{compression}"
 	if compression in stdCompressions:
-		with compressionOpenFunc(compression)(compFilename, mode="wb") as dest:
+		workers = glos.getConfig("workers", 0)
+		if workers > 1:
+			dest = ParallelCompressWriter(compFilename, compression, workers=workers)
+		else:
+			dest = compressionOpenFunc(compression)(compFilename, mode="wb")
+		with dest:
 			with open(filename, mode="rb") as source:
-				shutil.copyfileobj(source, dest)
+				shutil.copyfileobj(source, dest, 1024 * 1024)
 		return compFilename
 
 	if compression == "zip":
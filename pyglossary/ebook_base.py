@@ -28,10 +28,9 @@ from os.path import join
 import zipfile
 import tempfile
 from datetime import datetime
-import shutil
 
 from pyglossary.text_utils import toStr, toBytes
-from pyglossary.os_utils import indir, rmtree
+from pyglossary.zip_writer import ZipStreamWriter
 
 import logging
 log = logging.getLogger("pyglossary")
@@ -81,6 +80,7 @@ class EbookWriter(object):
 	_compress: bool = True
 	_css: str = ""  # path to css file, or ""
 	_cover_path: str = ""  # path to cover file, or ""
+	_workers: int = 0  # number of compression threads, 0 means workers config
 
 	CSS_CONTENTS = ""
 	GROUP_XHTML_TEMPLATE = ""
@@ -146,24 +146,31 @@ class EbookWriter(object):
 		# "group_by_prefix_merge_min_size": 0,
 
 		self._tmpDir = None
+		# files are written to _outDir (if not None) and added to _zipWriter
+		# (if not None), see open()
+		self._outDir = None
+		self._zipWriter = None
 		self.cover = None
 		self.files = []
 		self.manifest_files = []
 		self._group_labels = []
 
 	def finish(self):
+		if self._zipWriter is not None:
+			# only if write() was not finished
+			self._zipWriter.close()
+			self._zipWriter = None
 		self._filename = None
 
-	def myOpen(self, fname, mode):
-		return open(join(self._tmpDir, fname), mode)
-
 	def add_file(self, relative_path, contents, mode=None):
 		if mode is None:
 			mode = zipfile.ZIP_DEFLATED
-		file_path = os.path.join(self._tmpDir, relative_path)
 		contents = toBytes(contents)
-		with self.myOpen(file_path, "wb") as file_obj:
-			file_obj.write(contents)
+		if self._zipWriter is not None:
+			self._zipWriter.add(relative_path, contents, mode)
+		if self._outDir is not None:
+			with open(join(self._outDir, relative_path), "wb") as file_obj:
+				file_obj.write(contents)
 		self.files.append({
 			"path": relative_path,
 			"mode": mode,
@@ -171,7 +178,7 @@ class EbookWriter(object):
 
 	def write_cover(self, cover_path):
 		basename = os.path.basename(cover_path)
-		with self.myOpen(cover_path, "rb") as cover_obj:
+		with open(cover_path, "rb") as cover_obj:
 			cover = cover_obj.read()
 		b = basename.lower()
 		mimetype = "image/jpeg"
@@ -186,7 +193,7 @@ class EbookWriter(object):
 		css = self.CSS_CONTENTS
 		if custom_css_path_absolute is not None:
 			try:
-				with self.myOpen(custom_css_path_absolute, "rb") as css_obj:
+				with open(custom_css_path_absolute, "rb") as css_obj:
 					css = css_obj.read()
 			except Exception:
 				log.exception("")
@@ -369,69 +376,59 @@ class EbookWriter(object):
 		pass
 
 	def open(self, filename: str):
+		"""
+			if compress is enabled, files are compressed (in `workers` threads)
+			and written directly to the zip file, and also to a temp directory
+			if keep is enabled
+			otherwise files are written directly to `filename` directory
+		"""
 		self._filename = filename
-		self._tmpDir = tempfile.mkdtemp()
+		if not self._compress:
+			self._outDir = filename
+			return
+		# 0 or 1 (from either option or config) means no threads
+		self._zipWriter = ZipStreamWriter(
+			filename,
+			workers=self._workers or self._glos.getConfig("workers", 0),
+		)
+		if self._keep:
+			self._tmpDir = self._outDir = tempfile.mkdtemp()
+			log.info(f"Keeping temp files in {self._tmpDir}")
 
 	def write(self):
-		filename = self._filename
 		# self._group_by_prefix_length
 		# self._include_index_page
 		css = self._css
 		cover_path = self._cover_path
 
-		with indir(self._tmpDir):
-			if cover_path:
-				cover_path = os.path.abspath(cover_path)
-
-			if css:
-				css = os.path.abspath(css)
+		if self._outDir is not None:
+			os.makedirs(join(self._outDir, "META-INF"), exist_ok=True)
+			os.makedirs(join(self._outDir, "OEBPS"), exist_ok=True)
 
-			os.makedirs("META-INF")
-			os.makedirs("OEBPS")
+		if self.MIMETYPE_CONTENTS:
+			self.add_file("mimetype", self.MIMETYPE_CONTENTS, mode=zipfile.ZIP_STORED)
+		if self.CONTAINER_XML_CONTENTS:
+			self.add_file("META-INF/container.xml", self.CONTAINER_XML_CONTENTS)
 
-			if self.MIMETYPE_CONTENTS:
-				self.add_file("mimetype", self.MIMETYPE_CONTENTS, mode=zipfile.ZIP_STORED)
-			if self.CONTAINER_XML_CONTENTS:
-				self.add_file("META-INF/container.xml", self.CONTAINER_XML_CONTENTS)
-
-			if cover_path:
-				try:
-					self.write_cover(cover_path)
-				except Exception:
-					log.exception("")
+		if cover_path:
+			try:
+				self.write_cover(cover_path)
+			except Exception:
+				log.exception("")
 
-			if css:
-				self.write_css(css)
+		if css:
+			self.write_css(css)
 
-			yield from self.write_groups()
-			group_labels = self._group_labels
+		yield from self.write_groups()
+		group_labels = self._group_labels
 
-			if self._include_index_page:
-				self.write_index()
+		if self._include_index_page:
+			self.write_index()
 
-			self.write_ncx(group_labels)
+		self.write_ncx(group_labels)
 
-			self.write_opf()
+		self.write_opf()
 
-			if self._compress:
-				zipFp = zipfile.ZipFile(
-					filename,
-					"w",
-					compression=zipfile.ZIP_DEFLATED,
-				)
-				for fileDict in self.files:
-					zipFp.write(
-						fileDict["path"],
-						compress_type=fileDict["mode"],
-					)
-				zipFp.close()
-				if not self._keep:
-					rmtree(self._tmpDir)
-			else:
-				if self._keep:
-					shutil.copytree(self._tmpDir, filename)
-				elif os.sep == "\\":
-					shutil.copytree(self._tmpDir, filename)
-					self._glos._cleanupPathList.add(self._tmpDir)
-				else:
-					shutil.move(self._tmpDir, filename)
+		if self._zipWriter is not None:
+			self._zipWriter.close()
+			self._zipWriter = None
@@ -15,8 +15,8 @@ from .text_utils import (
 	joinByBar,
 )
 
-from pickle import dumps, loads
-from zlib import compress, decompress
+from pickle import loads
+from zlib import decompress
 
 import logging
 log = logging.getLogger("pyglossary")
@@ -144,14 +144,11 @@ class DataEntry(BaseEntry):
 		b_fpath = b""
 		if glos.tmpDataDir:
 			b_fpath = self.save(glos.tmpDataDir).encode("utf-8")
-		tpl = (
+		return (
 			[self._fname],
 			b_fpath,
 			"b",
 		)
-		if glos.rawEntryCompress:
-			return compress(dumps(tpl), level=9)
-		return tpl
 
 
 class Entry(BaseEntry):
@@ -198,11 +195,9 @@ class Entry(BaseEntry):
 		# (word, defi, defiFormat)
 		# so x[0] is word(s) in bytes, that can be a str (one word),
 		# or a list or tuple (one word with or more alternatives)
-		if glos.rawEntryCompress:
-			return lambda x: key(loads(decompress(x))[0])
-		else:
-			# x is rawEntry, so x[0] is list of words (entry.l_word)
-			return lambda x: key(x[0])
+		# words are never compressed (see EntryList), so x[0] is list of
+		# words (entry.l_word)
+		return lambda x: key(x[0])
 
 	def __init__(
 		self,
@@ -420,21 +415,15 @@ class Entry(BaseEntry):
 			where both word and defi might be string or list of strings
 		"""
 		if self._defiFormat and self._defiFormat != glos.getDefaultDefiFormat():
-			tpl = (
+			return (
 				self.l_word,
 				self.b_defi,
 				self._defiFormat,
 			)
-		else:
-			tpl = (
-				self.l_word,
-				self.b_defi,
-			)
-
-		if glos.rawEntryCompress:
-			return compress(dumps(tpl), level=9)
-
-		return tpl
+		return (
+			self.l_word,
+			self.b_defi,
+		)
 
 	@classmethod
 	def fromRaw(
@@ -8,6 +8,9 @@ from .text_utils import (
 )
 
 from .entry_base import BaseEntry
+from .html_utils import HtmlTextExtractor
+from .memory_profile import getRssKiB
+from .word_set import newWordSet
 
 
 log = logging.getLogger("pyglossary")
@@ -18,9 +21,24 @@ class EntryFilter(object):
 	desc = ""
 	falseComment = ""
 
+	# parallel: run() does not keep any state between entries,
+	# and does not use the glossary object, so it can be run
+	# in worker processes (see entry_pipeline.py)
+	parallel = False
+
 	def __init__(self, glos: "GlossaryType"):
 		self.glos = glos
 
+	def __getstate__(self) -> "Dict[str, Any]":
+		# the glossary object is not sent to worker processes
+		state = self.__dict__.copy()
+		state.pop("glos", None)
+		return state
+
+	def __setstate__(self, state: "Dict[str, Any]") -> None:
+		self.__dict__.update(state)
+		self.glos = None
+
 	def prepare(self) -> None:
 		"""
 			run this after glossary info is set and ready
@@ -40,6 +58,7 @@ class EntryFilter(object):
 class TrimWhitespaces(EntryFilter):
 	name = "trim_whitespaces"
 	desc = "Remove leading/trailing whitespaces from word(s) and definition"
+	parallel = True
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		entry.strip()
@@ -50,6 +69,7 @@ class TrimWhitespaces(EntryFilter):
 class NonEmptyWordFilter(EntryFilter):
 	name = "non_empty_word"
 	desc = "Skip entries with empty word"
+	parallel = True
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		if not entry.s_word:
@@ -60,6 +80,7 @@ class NonEmptyWordFilter(EntryFilter):
 class NonEmptyDefiFilter(EntryFilter):
 	name = "non_empty_defi"
 	desc = "Skip entries with empty definition"
+	parallel = True
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		if not entry.defi:
@@ -70,6 +91,7 @@ class NonEmptyDefiFilter(EntryFilter):
 class RemoveEmptyAndDuplicateAltWords(EntryFilter):
 	name = "remove_empty_dup_alt_words"
 	desc = "Remove empty and duplicate alternate words"
+	parallel = True
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		entry.removeEmptyAndDuplicateAltWords()
@@ -82,6 +104,7 @@ class FixUnicode(EntryFilter):
 	name = "utf8_check"
 	desc = "Fix Unicode in word(s) and definition"
 	falseComment = "Do not fix Unicode in word(s) and definition",
+	parallel = True
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		entry.editFuncWord(fixUtf8)
@@ -93,6 +116,7 @@ class LowerWord(EntryFilter):
 	name = "lower"
 	desc = "Lowercase word(s)"
 	falseComment = "Do not lowercase words before writing"
+	parallel = True
 
 	def __init__(self, glos: "GlossaryType"):
 		EntryFilter.__init__(self, glos)
@@ -113,6 +137,7 @@ class LowerWord(EntryFilter):
 class RTLDefi(EntryFilter):
 	name = "rtl"
 	desc = "Make definition right-to-left"
+	parallel = True
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		entry.editFuncDefi(lambda defi: f'<div dir="rtl">{defi}</div>')
@@ -122,6 +147,7 @@ class RTLDefi(EntryFilter):
 class RemoveHtmlTagsAll(EntryFilter):
 	name = "remove_html_all"
 	desc = "Remove all HTML tags from definition"
+	parallel = True
 
 	def __init__(self, glos: "GlossaryType"):
 		self._p_pattern = re.compile(
@@ -136,10 +162,9 @@ class RemoveHtmlTagsAll(EntryFilter):
 			"<br[ /]*>",
 			re.IGNORECASE,
 		)
+		self._textExtractor = HtmlTextExtractor()
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
-		from bs4 import BeautifulSoup
-
 		def fixStr(st: str) -> str:
 			st = self._p_pattern.sub("\\2\n", st)
 			# if there is </p> left without opening, replace with <br>
@@ -150,7 +175,7 @@ class RemoveHtmlTagsAll(EntryFilter):
 			st = st.replace("</div>", "\n")
 
 			st = self._br_pattern.sub("\n", st)
-			return BeautifulSoup(st, "lxml").text
+			return self._textExtractor.getText(st)
 
 		entry.editFuncDefi(fixStr)
 		return entry
@@ -159,6 +184,7 @@ class RemoveHtmlTagsAll(EntryFilter):
 class RemoveHtmlTags(EntryFilter):
 	name = "remove_html"
 	desc = "Remove given HTML tags (comma-separated) from definitions"
+	parallel = True
 
 	def __init__(self, glos: "GlossaryType", tagsStr: str):
 		import re
@@ -182,6 +208,7 @@ class RemoveHtmlTags(EntryFilter):
 class NormalizeHtml(EntryFilter):
 	name = "normalize_html"
 	desc = "Normalize HTML tags in definition (WIP)"
+	parallel = True
 
 	def __init__(self, glos: "GlossaryType"):
 		log.info("Normalizing HTML tags")
@@ -215,6 +242,7 @@ class NormalizeHtml(EntryFilter):
 class SkipDataEntry(EntryFilter):
 	name = "skip_resources"
 	desc = "Skip resources / data files"
+	parallel = True
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		if entry.isData():
@@ -225,6 +253,7 @@ class SkipDataEntry(EntryFilter):
 class LanguageCleanup(EntryFilter):
 	name = "lang"
 	desc = "Language-specific cleanup/fixes"
+	parallel = True
 
 	def __init__(self, glos: "GlossaryType"):
 		EntryFilter.__init__(self, glos)
@@ -265,6 +294,7 @@ class TextListSymbolCleanup(EntryFilter):
 
 	name = "text_list_symbol_cleanup"
 	desc = "Text List Symbol Cleanup"
+	parallel = True
 
 	winNewlinePattern = re.compile("[\r\n]+")
 	spacesNewlinePattern = re.compile(" *\n *")
@@ -295,7 +325,10 @@ class PreventDuplicateWords(EntryFilter):
 
 	def __init__(self, glos: "GlossaryType"):
 		EntryFilter.__init__(self, glos)
-		self._wordSet = set()
+		self._wordSet = newWordSet(glos.getConfig("word_set", "memory"))
+		# last used number for each duplicate word, so the next duplicate
+		# does not have to try " (2)", " (3)", ... again
+		self._dupCount = {}  # type: Dict[str, int]
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		if entry.isData():
@@ -304,40 +337,39 @@ class PreventDuplicateWords(EntryFilter):
 		wordSet = self._wordSet
 		word = entry.s_word
 
-		if word not in wordSet:
-			wordSet.add(word)
+		if wordSet.add(word):
 			return entry
 
-		n = 2
-		while f"{word} ({n})" in wordSet:
+		n = self._dupCount.get(word, 1) + 1
+		# only loops if input already has a word like "{word} ({n})"
+		while not wordSet.add(f"{word} ({n})"):
 			n += 1
-		word = f"{word} ({n})"
+		self._dupCount[word] = n
 
-		wordSet.add(word)
-		entry._word = word
+		entry._word = f"{word} ({n})"
 		# use entry.editFuncWord?
 
 		return entry
 
+
 class SkipEntriesWithDuplicateHeadword(EntryFilter):
 	name = "skip_duplicate_headword"
 	desc = "Skip entries with a duplicate headword"
 
 	def __init__(self, glos: "GlossaryType"):
 		EntryFilter.__init__(self, glos)
-		self._wset = set()
+		self._wset = newWordSet(glos.getConfig("word_set", "memory"))
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
-		word = entry.l_word[0]
-		if word in self._wset:
+		if not self._wset.add(entry.l_word[0]):
 			return
-		self._wset.add(word)
 		return entry
 
 
 class TrimArabicDiacritics(EntryFilter):
 	name = "trim_arabic_diacritics"
 	desc = "Trim Arabic diacritics from headword"
+	parallel = True
 
 	def __init__(self, glos: "GlossaryType"):
 		EntryFilter.__init__(self, glos)
@@ -364,6 +396,7 @@ class ShowProgressBar(EntryFilter):
 		self._wordCountThreshold = 0
 		self._lastPos = 0
 		self._index = 0
+		self._byteProgress = False
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
 		index = self._index
@@ -372,11 +405,17 @@ class ShowProgressBar(EntryFilter):
 		if entry is not None:
 			bp = entry.byteProgress()
 			if bp:
+				self._byteProgress = True
 				if bp[0] > self._lastPos + 20000:
 					self.glos.progress(bp[0], bp[1], unit="bytes")
 					self._lastPos = bp[0]
 				return entry
 
+		if self._byteProgress:
+			# like data entries (resources) after entries with byteProgress
+			# no need to count entries (which may read the whole file)
+			return entry
+
 		if self._wordCount == -1:
 			self._wordCount = len(self.glos)
 			self._wordCountThreshold = max(1, min(
@@ -395,15 +434,20 @@ class ShowMaxMemoryUsage(EntryFilter):
 	name = "max_memory_usage"
 	desc = "Show Max Memory Usage"
 
+	# check memory usage once every `sampleInterval` entries
+	sampleInterval = 100
+
 	def __init__(self, glos: "GlossaryType"):
 		EntryFilter.__init__(self, glos)
 		self._max_mem_usage = 0
+		self._index = 0
 
 	def run(self, entry: BaseEntry) -> "Optional[BaseEntry]":
-		import os
-		import psutil
-		usage = psutil.Process(os.getpid()).memory_info().rss // 1024
-		if usage > self._max_mem_usage:
+		self._index += 1
+		if self._index % self.sampleInterval != 0:
+			return entry
+		usage = getRssKiB()
+		if usage is not None and usage > self._max_mem_usage:
 			self._max_mem_usage = usage
 			word = entry.s_word
 			if len(word) > 30:
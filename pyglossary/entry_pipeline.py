@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+# entry_pipeline.py
+#
+# Copyright © 2008-2022 Saeed Rasooli <saeed.gnu@gmail.com> (ilius)
+# This file is part of PyGlossary project, https://github.com/ilius/pyglossary
+#
+# This program is a free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. Or on Debian systems, from /usr/share/common-licenses/GPL
+# If not, see <http://www.gnu.org/licenses/gpl.txt>.
+
+from collections import deque
+from time import time as now
+
+from .entry import Entry
+
+import logging
+log = logging.getLogger("pyglossary")
+
+
+# entry filters of the parallel stage, set once in each worker process
+_workerFilters = []
+
+
+def _initWorker(entryFilters: "List[EntryFilter]") -> None:
+	global _workerFilters
+	_workerFilters = entryFilters
+
+
+def _runBatch(
+	batch: "List[Tuple[List[str], str, str]]",
+) -> "Tuple[List[Optional[Tuple[List[str], str, str]]], float]":
+	"""
+		runs in a worker process
+		batch is a list of (l_word, defi, defiFormat) tuples
+		returns (results, elapsedSeconds)
+			where results[i] is the filtered tuple of batch[i],
+			or None if the entry is skipped by a filter
+	"""
+	t0 = now()
+	results = []
+	for word, defi, defiFormat in batch:
+		entry = Entry(word, defi, defiFormat=defiFormat)
+		for entryFilter in _workerFilters:
+			entry = entryFilter.run(entry)
+			if entry is None:
+				break
+		if entry is None:
+			results.append(None)
+			continue
+		results.append((
+			list(entry.l_word),
+			entry.defi,
+			entry.defiFormat,
+		))
+	return results, now() - t0
+
+
+class EntryPipeline(object):
+	"""
+		Runs entry filters on a pool of worker processes
+
+		The leading entry filters that have `parallel = True` (the parallel
+		stage) are sent to the workers, and entries are sent in batches of
+		(l_word, defi, defiFormat) tuples. The rest of the filters (the serial
+		stage, starting from the first filter with `parallel = False`) are
+		run in the main process on the results, in the original order.
+
+		Data entries (resources) are not sent to workers, they go through
+		all filters in the main process, in their original position.
+	"""
+
+	batchSize = 500
+
+	# number of batches that are submitted to workers (per worker)
+	# but not yet consumed by the main process
+	pendingPerWorker = 2
+
+	def __init__(
+		self,
+		entryFilters: "List[EntryFilter]",
+		workers: int,
+	) -> None:
+		parallelCount = 0
+		for entryFilter in entryFilters:
+			if not entryFilter.parallel:
+				break
+			parallelCount += 1
+		self._entryFilters = entryFilters
+		self._parallelFilters = entryFilters[:parallelCount]
+		self._serialFilters = entryFilters[parallelCount:]
+		self._workers = workers
+
+		self._readTime = 0.0
+		self._workerTime = 0.0
+		self._waitTime = 0.0
+		self._serialTime = 0.0
+		self._inputCount = 0
+		self._outputCount = 0
+
+	def _serialGen(
+		self,
+		gen: "Iterator[BaseEntry]",
+	) -> "Iterator[BaseEntry]":
+		entryFilters = self._entryFilters
+		for entry in gen:
+			if entry is None:
+				continue
+			entry = self._runFilters(entryFilters, entry)
+			if entry is not None:
+				yield entry
+
+	@staticmethod
+	def _runFilters(
+		entryFilters: "List[EntryFilter]",
+		entry: "BaseEntry",
+	) -> "Optional[BaseEntry]":
+		for entryFilter in entryFilters:
+			entry = entryFilter.run(entry)
+			if entry is None:
+				return None
+		return entry
+
+	def _readBatches(
+		self,
+		gen: "Iterator[BaseEntry]",
+	) -> "Iterator[Tuple[List[Union[BaseEntry, Tuple]], List[Tuple]]]":
+		"""
+			yields (items, batch) pairs
+				items[i] is either a DataEntry, or byteProgress of an Entry
+				batch is the list of (l_word, defi, defiFormat) tuples
+					to send to a worker
+		"""
+		batchSize = self.batchSize
+		items = []
+		batch = []
+		t0 = now()
+		for entry in gen:
+			if entry is None:
+				continue
+			self._inputCount += 1
+			if entry.isData():
+				items.append(entry)
+				continue
+			items.append((entry.byteProgress(),))
+			batch.append((
+				list(entry.l_word),
+				entry.defi,
+				entry.defiFormat,
+			))
+			if len(batch) >= batchSize:
+				self._readTime += now() - t0
+				yield items, batch
+				items = []
+				batch = []
+				t0 = now()
+		self._readTime += now() - t0
+		if items:
+			yield items, batch
+
+	def _outputGen(
+		self,
+		items: "List[Union[BaseEntry, Tuple]]",
+		results: "List[Optional[Tuple[List[str], str, str]]]",
+	) -> "Iterator[BaseEntry]":
+		parallelFilters = self._parallelFilters
+		serialFilters = self._serialFilters
+		resultIter = iter(results)
+		for item in items:
+			t0 = now()
+			if isinstance(item, tuple):
+				result = next(resultIter)
+				if result is None:
+					continue
+				word, defi, defiFormat = result
+				entry = Entry(
+					word,
+					defi,
+					defiFormat=defiFormat,
+					byteProgress=item[0],
+				)
+			else:
+				entry = self._runFilters(parallelFilters, item)
+				if entry is None:
+					continue
+			entry = self._runFilters(serialFilters, entry)
+			self._serialTime += now() - t0
+			if entry is None:
+				continue
+			self._outputCount += 1
+			yield entry
+
+	def run(
+		self,
+		gen: "Iterator[BaseEntry]",
+	) -> "Iterator[BaseEntry]":
+		from concurrent.futures import ProcessPoolExecutor
+
+		if not self._parallelFilters:
+			log.info(
+				"No entry filter can run in parallel"
+				", running entry filters in main process"
+			)
+			yield from self._serialGen(gen)
+			return
+
+		log.info(
+			f"Running {len(self._parallelFilters)} entry filters"
+			f" on {self._workers} worker processes"
+		)
+		maxPending = self._workers * self.pendingPerWorker
+		t0 = now()
+		pending = deque()
+		executor = ProcessPoolExecutor(
+			max_workers=self._workers,
+			initializer=_initWorker,
+			initargs=(self._parallelFilters,),
+		)
+		try:
+			for items, batch in self._readBatches(gen):
+				pending.append((items, executor.submit(_runBatch, batch)))
+				if len(pending) < maxPending:
+					continue
+				yield from self._popPending(pending)
+			while pending:
+				yield from self._popPending(pending)
+		finally:
+			for _, future in pending:
+				future.cancel()
+			executor.shutdown(wait=True)
+
+		self._logStats(now() - t0)
+
+	def _popPending(
+		self,
+		pending: "Deque[Tuple[List, Future]]",
+	) -> "Iterator[BaseEntry]":
+		items, future = pending.popleft()
+		t0 = now()
+		results, workerTime = future.result()
+		self._waitTime += now() - t0
+		self._workerTime += workerTime
+		yield from self._outputGen(items, results)
+
+	def _logStats(self, totalTime: float) -> None:
+		def rate(seconds: float) -> str:
+			if seconds <= 0:
+				return "-"
+			return f"{int(self._inputCount / seconds):,} entries/s"
+
+		log.info(
+			f"Entry pipeline: {self._inputCount:,} entries in"
+			f", {self._outputCount:,} entries out"
+			f", {totalTime:.1f} seconds ({rate(totalTime)})"
+		)
+		log.info(
+			f"Entry pipeline stages:"
+			f" read: {self._readTime:.1f}s ({rate(self._readTime)})"
+			f", workers: {self._workerTime:.1f}s in total"
+			f" ({rate(self._workerTime)} per worker)"
+			f", waiting for workers: {self._waitTime:.1f}s"
+			f", serial filters: {self._serialTime:.1f}s"
+			f" ({rate(self._serialTime)})"
+		)
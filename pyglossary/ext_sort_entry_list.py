@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2008-2022 Saeed Rasooli <saeed.gnu@gmail.com> (ilius)
+# This file is part of PyGlossary project, https://github.com/ilius/pyglossary
+#
+# This program is a free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. Or on Debian systems, from /usr/share/common-licenses/GPL
+# If not, see <http://www.gnu.org/licenses/gpl.txt>.
+
+import sys
+import os
+from os.path import join, isdir
+from pickle import dumps, loads, dump, load
+import heapq
+
+from .entry import Entry
+from .glossary_utils import getSortKey
+from .sq_entry_list import PICKLE_PROTOCOL
+from .os_utils import rmtree
+
+import logging
+log = logging.getLogger("pyglossary")
+
+# approximate memory used by each item of a run (the tuple, the int
+# and list slot), other than the sort key and pickled entry
+_itemOverhead = 120
+
+
+class ExtSortEntryList(object):
+	"""
+		entry list that is sorted with an external merge sort
+
+		sort key of each entry is computed once, when entry is appended,
+		so setSortKey must be called before adding entries.
+		entries are kept as (sortKey, index, pickledRawEntry) tuples,
+		when their size reaches `bufferSize` bytes (approximately), they are
+		sorted and written to a run file in `dirname`.
+		iterating over the list merges the run files and the remaining
+		entries, so entries are always iterated in sorted order.
+	"""
+
+	def __init__(
+		self,
+		glos,
+		dirname: str,
+		bufferSize: int = 256 * 1024 * 1024,
+	):
+		self._glos = glos
+		self._sortKey = None
+		self._dirname = dirname
+		self._bufferSize = bufferSize
+		self._run = []
+		self._runSize = 0
+		self._runPaths = []
+		self._len = 0
+		os.makedirs(dirname, mode=0o700, exist_ok=True)
+
+	def setSortKey(
+		self,
+		namedSortKey: "NamedSortKey",
+		sortEncoding: "Optional[str]",
+		sortLocale: "Optional[str]",
+		writeOptions: "Dict[str, Any]",
+	):
+		self._sortKey = getSortKey(
+			namedSortKey,
+			sortEncoding,
+			sortLocale,
+			writeOptions,
+		)
+
+	def append(self, entry):
+		if self._sortKey is None:
+			raise ValueError("ExtSortEntryList.append: sortKey is not set")
+		rawEntry = entry.getRaw(self._glos)
+		try:
+			key = self._sortKey(entry.l_word)
+		except Exception:
+			log.critical(f"error in sortKey func for {rawEntry = }")
+			raise
+		pickleEntry = dumps(rawEntry, protocol=PICKLE_PROTOCOL)
+		# index makes the sort stable, and pickleEntry is never compared
+		self._run.append((key, self._len, pickleEntry))
+		self._len += 1
+		self._runSize += len(pickleEntry) + sys.getsizeof(key) + _itemOverhead
+		if self._runSize >= self._bufferSize:
+			self._writeRun()
+
+	def __len__(self):
+		return self._len
+
+	def _writeRun(self):
+		self._run.sort()
+		runPath = join(self._dirname, f"run{len(self._runPaths)}")
+		log.debug(f"Writing {len(self._run)} sorted entries to {runPath}")
+		with open(runPath, "wb") as _file:
+			for item in self._run:
+				dump(item, _file, protocol=PICKLE_PROTOCOL)
+		self._runPaths.append(runPath)
+		self._run = []
+		self._runSize = 0
+
+	@staticmethod
+	def _readRun(runPath: str) -> "Iterator[Tuple[Any, int, bytes]]":
+		with open(runPath, "rb") as _file:
+			while True:
+				try:
+					yield load(_file)
+				except EOFError:
+					break
+
+	def sort(self):
+		if self._sortKey is None:
+			raise ValueError("ExtSortEntryList.sort: sortKey is not set")
+		self._run.sort()
+
+	def __iter__(self):
+		glos = self._glos
+		self._run.sort()
+		items = self._run
+		if self._runPaths:
+			log.info(f"Merging {len(self._runPaths) + 1} sorted runs")
+			items = heapq.merge(
+				*[self._readRun(runPath) for runPath in self._runPaths],
+				self._run,
+			)
+		for _, _, pickleEntry in items:
+			yield Entry.fromRaw(
+				glos, loads(pickleEntry),
+				defaultDefiFormat=glos._defaultDefiFormat,
+			)
+
+	def clear(self):
+		self.close()
+
+	def close(self):
+		self._run = []
+		self._runSize = 0
+		self._runPaths = []
+		self._len = 0
+		if isdir(self._dirname):
+			rmtree(self._dirname)
@@ -1,3 +1,6 @@
+import os
+import re
+import mmap
 from itertools import (
 	takewhile,
 	repeat,
@@ -10,12 +13,80 @@ def toBytes(s: "AnyStr") -> bytes:
 	return bytes(s, "utf-8") if isinstance(s, str) else bytes(s)
 
 
-def fileCountLines(filename: str, newline: str = "\n"):
-	newline = toBytes(newline)  # required? FIXME
+def _safeCutPattern(sep: bytes) -> "re.Pattern":
+	"""
+		returns a pattern that matches a byte that is not used in `sep`,
+		no occurrence of `sep` can contain that byte, so the file can be
+		cut right after it without splitting any occurrence of `sep`
+	"""
+	return re.compile(
+		b"[^" + b"".join(re.escape(bytes([c])) for c in set(sep)) + b"]",
+	)
+
+
+def fileCountLines(
+	filename: str,
+	newline: str = "\n",
+	chunkSize: int = 1024 * 1024,
+) -> int:
+	"""
+		returns the number of (non-overlapping) occurrences of `newline`
+		in file, same as reading the whole file and calling bytes.count
+
+		the file is counted in chunks of about `chunkSize` bytes, chunks
+		of a mmap when `newline` has more than one byte, so that chunks
+		can be cut at positions that do not split any occurrence
+	"""
+	newline = toBytes(newline)
+	if len(newline) == 1:
+		with open(filename, "rb") as _file:
+			bufgen = takewhile(
+				lambda x: x, (_file.read(chunkSize) for _ in repeat(None))
+			)
+			return sum(
+				buf.count(newline) for buf in bufgen if buf
+			)
+
+	size = os.path.getsize(filename)
+	if size == 0:
+		return 0
+	safeCut = _safeCutPattern(newline)
+	count = 0
+	with open(filename, "rb") as _file:
+		with mmap.mmap(_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+			start = 0
+			while start < size:
+				end = start + chunkSize
+				if end < size:
+					m = safeCut.search(mm, end)
+					end = m.end() if m else size
+				count += mm[start:end].count(newline)
+				start = end
+	return count
+
+
+def fileEstimateLines(
+	filename: str,
+	newline: str = "\n",
+	sampleSize: int = 256 * 1024,
+	sampleCount: int = 8,
+) -> int:
+	"""
+		returns an estimate of the number of occurrences of `newline` in
+		file, by counting them in `sampleCount` samples of `sampleSize`
+		bytes at evenly spaced offsets, so it takes the same (short) time
+		for any file size
+
+		small files are counted exactly with fileCountLines
+	"""
+	size = os.path.getsize(filename)
+	sampledSize = sampleSize * sampleCount
+	if size <= sampledSize * 4:
+		return fileCountLines(filename, newline=newline)
+	newline = toBytes(newline)
+	count = 0
 	with open(filename, "rb") as _file:
-		bufgen = takewhile(
-			lambda x: x, (_file.read(1024 * 1024) for _ in repeat(None))
-		)
-		return sum(
-			buf.count(newline) for buf in bufgen if buf
-		)
+		for index in range(sampleCount):
+			_file.seek(size * index // sampleCount)
+			count += _file.read(sampleSize).count(newline)
+	return count * size // sampledSize
@@ -77,6 +77,7 @@ from .glossary_utils import (
 )
 from .sort_keys import namedSortKeyByName, NamedSortKey
 from .os_utils import showMemoryUsage, rmtree
+from .memory_profile import MemoryProfiler, getRssKiB
 from .glossary_info import GlossaryInfo
 from .plugin_manager import PluginManager
 from .glossary_type import GlossaryType
@@ -180,6 +181,7 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 		self._sqlite = False
 		self._rawEntryCompress = True
 		self._cleanupPathList = set()
+		self._memoryProfiler = None  # type: Optional[MemoryProfiler]
 		self.clear()
 		if info:
 			if not isinstance(info, (dict, odict)):
@@ -238,13 +240,8 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 		if self.ui and self._progressbar:
 			entryFilters.append(ShowProgressBar(self))
 
-		if log.level <= core.TRACE:
-			try:
-				import psutil
-			except ModuleNotFoundError:
-				pass
-			else:
-				entryFilters.append(ShowMaxMemoryUsage(self))
+		if log.level <= core.TRACE and getRssKiB() is not None:
+			entryFilters.append(ShowMaxMemoryUsage(self))
 
 		self._entryFilters = entryFilters
 
@@ -265,7 +262,16 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 	def _addExtraEntryFilter(self, cls):
 		if cls.name in self._entryFiltersName:
 			return
-		self._entryFilters.append(cls(self))
+		# keep ShowProgressBar and ShowMaxMemoryUsage last, they can not
+		# run in parallel, and EntryPipeline stops its parallel stage
+		# at the first filter that can not
+		index = len(self._entryFilters)
+		while index > 0 and isinstance(
+			self._entryFilters[index - 1],
+			(ShowProgressBar, ShowMaxMemoryUsage),
+		):
+			index -= 1
+		self._entryFilters.insert(index, cls(self))
 		self._entryFiltersName.add(cls.name)
 
 	def removeHtmlTagsAll(self) -> None:
@@ -327,6 +333,14 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 		self,
 		gen: "Iterator[BaseEntry]",
 	) -> "Iterator[BaseEntry]":
+		workers = self._config.get("workers", 0)
+		if workers > 1:
+			from .entry_pipeline import EntryPipeline
+			yield from EntryPipeline(self._entryFilters, workers).run(gen)
+			return
+		if self._memoryProfiler is not None:
+			yield from self._applyEntryFiltersProfileGen(gen)
+			return
 		for entry in gen:
 			if entry is None:
 				continue
@@ -337,6 +351,32 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 			else:
 				yield entry
 
+	def _applyEntryFiltersProfileGen(
+		self,
+		gen: "Iterator[BaseEntry]",
+	) -> "Iterator[BaseEntry]":
+		"""
+			same as _applyEntryFiltersGen, but also sets the phase of
+			memory profiler to "read" while reading entries from `gen`,
+			and to "filter" while running entry filters
+		"""
+		profiler = self._memoryProfiler
+		outerPhase = profiler.phase
+		profiler.phase = "read"
+		for entry in gen:
+			if entry is None:
+				continue
+			profiler.phase = "filter"
+			for entryFilter in self._entryFilters:
+				entry = entryFilter.run(entry)
+				if entry is None:
+					break
+			else:
+				profiler.phase = outerPhase
+				yield entry
+			profiler.phase = "read"
+		profiler.phase = outerPhase
+
 	def __iter__(self) -> "Iterator[BaseEntry]":
 		if self._iter is None:
 			log.error(
@@ -819,6 +859,7 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 		self._sort = sort
 
 		if sort:
+			self._setMemoryPhase("sort")
 			t0 = now()
 			self._data.sort()
 			log.info(f"Sorting took {now() - t0:.1f} seconds")
@@ -834,6 +875,7 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 			return
 
 		showMemoryUsage()
+		self._setMemoryPhase("write")
 
 		writerList = [writer]
 		try:
@@ -868,6 +910,7 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 			return
 		finally:
 			showMemoryUsage()
+			self._setMemoryPhase("finish")
 			log.debug("Running writer.finish()")
 			for writer in writerList:
 				writer.finish()
@@ -877,6 +920,25 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 
 		return filename
 
+	def _startMemoryProfile(self) -> None:
+		if not self._config.get("memory_profile", False):
+			return
+		self._memoryProfiler = MemoryProfiler()
+		self._memoryProfiler.start()
+
+	def _setMemoryPhase(self, phase: str) -> None:
+		if self._memoryProfiler is None:
+			return
+		self._memoryProfiler.setPhase(phase)
+
+	def _stopMemoryProfile(self) -> None:
+		profiler = self._memoryProfiler
+		if profiler is None:
+			return
+		self._memoryProfiler = None
+		profiler.stop()
+		profiler.logSummary()
+
 	def _compressOutput(self, filename: str, compression: str) -> str:
 		from pyglossary.compression import compress
 		return compress(self, filename, compression)
@@ -910,6 +972,24 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 		self._config["enable_alts"] = True
 		self._sqlite = True
 
+	def _switchToExternalSort(self) -> None:
+		import uuid
+		from pyglossary.ext_sort_entry_list import ExtSortEntryList
+
+		sortDir = join(cacheDir, "tmp", f"sort-{uuid.uuid1().hex}")
+		bufferSize = self._config.get("external_sort_memory", 256) * 1024 * 1024
+		log.info(
+			f"Using external merge sort with {bufferSize >> 20} MiB buffer"
+		)
+		self._data = ExtSortEntryList(
+			self,
+			sortDir,
+			bufferSize=bufferSize,
+		)
+		# entries are pickled anyway, compressing them is a waste of time
+		# sortDir is removed by ExtSortEntryList.close
+		self._rawEntryCompress = False
+
 	def _resolveConvertSortParams(
 		self,
 		sort: "Optional[bool]",
@@ -967,8 +1047,13 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 
 		writerSortEncoding = getattr(plugin, "sortEncoding", None)
 
+		externalSort = self._config.get("external_sort", False)
 		if sqlite is None:
-			sqlite = sort and self._config.get("auto_sqlite", True)
+			sqlite = (
+				sort and
+				not externalSort and
+				self._config.get("auto_sqlite", True)
+			)
 			if sqlite:
 				log.info(
 					"Automatically switching to SQLite mode"
@@ -1006,6 +1091,8 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 				inputFilename=inputFilename,
 				outputFormat=outputFormat,
 			)
+		elif externalSort:
+			self._switchToExternalSort()
 
 		if not sortEncoding:
 			sortEncoding = "utf-8"
@@ -1107,48 +1194,53 @@ class Glossary(GlossaryInfo, PluginManager, GlossaryType):
 		del sqlite
 		showMemoryUsage()
 
-		tm0 = now()
-		if not self._read(
-			inputFilename,
-			format=inputFormat,
-			direct=direct,
-			progressbar=progressbar,
-			**readOptions
-		):
-			log.critical(f"Reading file {relpath(inputFilename)!r} failed.")
-			self.cleanup()
-			return
-
-		del inputFilename, inputFormat, direct, readOptions
-
-		if infoOverride:
-			for key, value in infoOverride.items():
-				self.setInfo(key, value)
+		self._startMemoryProfile()
+		try:
+			self._setMemoryPhase("read")
+			tm0 = now()
+			if not self._read(
+				inputFilename,
+				format=inputFormat,
+				direct=direct,
+				progressbar=progressbar,
+				**readOptions
+			):
+				log.critical(f"Reading file {relpath(inputFilename)!r} failed.")
+				self.cleanup()
+				return
+
+			del inputFilename, inputFormat, direct, readOptions
+
+			if infoOverride:
+				for key, value in infoOverride.items():
+					self.setInfo(key, value)
+
+			if compression and not self.plugins[outputFormat].singleFile:
+				os.makedirs(outputFilename, mode=0o700, exist_ok=True)
+
+			finalOutputFile = self._write(
+				outputFilename,
+				outputFormat,
+				sort=sort,
+				**writeOptions
+			)
+			if not finalOutputFile:
+				log.critical(f"Writing file {relpath(outputFilename)!r} failed.")
+				self._closeReaders()
+				self.cleanup()
+				return
 
-		if compression and not self.plugins[outputFormat].singleFile:
-			os.makedirs(outputFilename, mode=0o700, exist_ok=True)
+			if compression:
+				finalOutputFile = self._compressOutput(finalOutputFile, compression)
 
-		finalOutputFile = self._write(
-			outputFilename,
-			outputFormat,
-			sort=sort,
-			**writeOptions
-		)
-		if not finalOutputFile:
-			log.critical(f"Writing file {relpath(outputFilename)!r} failed.")
-			self._closeReaders()
+			log.info(f"Writing file {finalOutputFile!r} done.")
+			log.info(f"Running time of convert: {now()-tm0:.1f} seconds")
+			showMemoryUsage()
 			self.cleanup()
-			return
-
-		if compression:
-			finalOutputFile = self._compressOutput(finalOutputFile, compression)
 
-		log.info(f"Writing file {finalOutputFile!r} done.")
-		log.info(f"Running time of convert: {now()-tm0:.1f} seconds")
-		showMemoryUsage()
-		self.cleanup()
-
-		return finalOutputFile
+			return finalOutputFile
+		finally:
+			self._stopMemoryProfile()
 
 	# ________________________________________________________________________#
 
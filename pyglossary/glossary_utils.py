@@ -24,6 +24,8 @@ from os.path import (
 	splitext,
 )
 import subprocess
+import zlib
+from array import array
 import logging
 
 from .compression import (
@@ -34,56 +36,224 @@ from .entry import Entry
 log = logging.getLogger("pyglossary")
 
 
+def getLocaleSortKey(
+	namedSortKey: "NamedSortKey",
+	sortLocale: str,
+	writeOptions: "Dict[str, Any]",
+) -> "sortKey":
+	from icu import Locale, Collator
+
+	if namedSortKey.locale is None:
+		raise ValueError(
+			f"locale-sorting is not supported "
+			f"for sortKey={namedSortKey.name}"
+		)
+
+	localeObj = Locale(sortLocale)
+	if not localeObj.getISO3Language():
+		raise ValueError(f"invalid locale {sortLocale!r}")
+
+	log.info(f"Sorting based on locale {localeObj.getName()}")
+
+	collator = Collator.createInstance(localeObj)
+
+	return namedSortKey.locale(collator, **writeOptions)
+
+
+def getSortKey(
+	namedSortKey: "NamedSortKey",
+	sortEncoding: "Optional[str]",
+	sortLocale: "Optional[str]",
+	writeOptions: "Dict[str, Any]",
+) -> "sortKey":
+	"""
+		returns sortKey function that takes list of words (entry.l_word)
+		used by EntryList and ExtSortEntryList
+	"""
+	if sortLocale:
+		return getLocaleSortKey(namedSortKey, sortLocale, writeOptions)
+	return namedSortKey.normal(sortEncoding, **writeOptions)
+
+
 class EntryList(object):
+	"""
+		list of entries kept in memory (indirect mode)
+
+		entries are packed into two bytearray arenas, one for words and
+		one for definitions, with array("Q") tables of end offsets, and
+		a bytearray with one byte of defiFormat per entry (0 means default
+		defiFormat). words of an entry are encoded in utf-8 and separated
+		with b"\\xff", which is never used in utf-8. an empty list of words
+		is stored as b"\\xfe" (also never used in utf-8) to tell it apart
+		from [""].
+		Entry objects are created while iterating, and sorting permutes
+		an array of entry indexes.
+
+		if glos.rawEntryCompress is enabled, definitions are compressed
+		with a preset dictionary (zdict), built from definitions of the
+		first entries, so that small definitions compress well.
+		words are not compressed, so sort keys can be computed without
+		decompressing definitions.
+	"""
+
+	# size of definitions collected before building zdict
+	zdictSampleSize = 256 * 1024
+	# deflate can not use more than 32 KiB of zdict
+	zdictSize = 32 * 1024
+	# size of each piece of a sampled definition added to zdict
+	zdictPieceSize = 512
+	compressLevel = 3
+	# smaller hash table than default (8), makes copying compressor faster
+	# with the same compression ratio for small definitions
+	compressMemLevel = 6
+
 	def __init__(self, glos):
-		self._l = []
 		self._glos = glos
 		self._sortKey = None
+		self._clearArenas()
+
+	def _clearArenas(self):
+		self._wordData = bytearray()
+		self._wordEnds = array("Q")
+		self._defiData = bytearray()
+		self._defiEnds = array("Q")
+		self._formats = bytearray()
+		# entry indexes in iteration order, None means insertion order
+		self._order = None
+		self._zdict = None
+		# compressor with zdict loaded, copied for each entry
+		self._compressor = None
+
+	def _getWords(self, index: int) -> "List[str]":
+		start = self._wordEnds[index - 1] if index > 0 else 0
+		end = self._wordEnds[index]
+		b_words = self._wordData[start:end]
+		if b_words == b"\xfe":
+			return []
+		return [
+			b_word.decode("utf-8", errors="surrogatepass")
+			for b_word in b_words.split(b"\xff")
+		]
+
+	def _getDefi(self, index: int) -> bytes:
+		start = self._defiEnds[index - 1] if index > 0 else 0
+		return bytes(self._defiData[start:self._defiEnds[index]])
+
+	def _buildZdict(self) -> bytes:
+		"""
+			joins evenly spaced pieces of definitions added so far
+		"""
+		b_dataFormat = ord("b")
+		indexes = [
+			index for index, defiFormat in enumerate(self._formats)
+			if defiFormat != b_dataFormat
+		]
+		step = max(1, len(indexes) * self.zdictPieceSize // self.zdictSize)
+		return b"".join(
+			self._getDefi(index)[:self.zdictPieceSize]
+			for index in indexes[::step]
+		)[-self.zdictSize:]
+
+	def _startCompression(self):
+		zdict = self._buildZdict()
+		self._compressor = zlib.compressobj(
+			self.compressLevel,
+			zlib.DEFLATED,
+			-zlib.MAX_WBITS,
+			self.compressMemLevel,
+			zlib.Z_DEFAULT_STRATEGY,
+			zdict,
+		)
+		self._zdict = zdict
+		defiData = self._defiData
+		defiEnds = self._defiEnds
+		self._defiData = bytearray()
+		self._defiEnds = array("Q")
+		start = 0
+		for end in defiEnds:
+			self._addDefi(self._compressDefi(defiData[start:end]))
+			start = end
+		log.debug(
+			f"Compressing definitions with a {len(zdict)} bytes zdict"
+		)
+
+	def _compressDefi(self, b_defi: bytes) -> bytes:
+		compressor = self._compressor.copy()
+		return compressor.compress(b_defi) + compressor.flush()
+
+	def _decompressDefi(self, data: bytes) -> bytes:
+		decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self._zdict)
+		return decompressor.decompress(data)
+
+	def _addDefi(self, data: bytes) -> None:
+		self._defiData += data
+		self._defiEnds.append(len(self._defiData))
+
+	def _add(self, entry) -> int:
+		"""
+			adds entry to arenas, returns its index
+		"""
+		rawEntry = entry.getRaw(self._glos)
+		words = rawEntry[0]
+		if isinstance(words, str):
+			words = [words]
+		if words:
+			self._wordData += b"\xff".join([
+				word.encode("utf-8", errors="surrogatepass") for word in words
+			])
+		else:
+			self._wordData += b"\xfe"
+		self._wordEnds.append(len(self._wordData))
+		b_defi = rawEntry[1]
+		if self._compressor is not None:
+			b_defi = self._compressDefi(b_defi)
+		self._addDefi(b_defi)
+		self._formats.append(ord(rawEntry[2]) if len(rawEntry) > 2 else 0)
+		if (
+			self._compressor is None and
+			self._glos.rawEntryCompress and
+			len(self._defiData) >= self.zdictSampleSize
+		):
+			self._startCompression()
+		return len(self._formats) - 1
 
 	def append(self, entry):
-		self._l.append(entry.getRaw(self._glos))
+		index = self._add(entry)
+		if self._order is not None:
+			self._order.append(index)
 
 	def insert(self, pos, entry):
-		self._l.insert(pos, entry.getRaw(self._glos))
+		index = self._add(entry)
+		if self._order is None:
+			self._order = array("L", range(index))
+		self._order.insert(pos, index)
 
 	def clear(self):
-		self._l.clear()
+		self._clearArenas()
 
 	def __len__(self):
-		return len(self._l)
+		return len(self._formats)
+
+	def _getRawEntry(self, index: int) -> "RawEntryType":
+		b_defi = self._getDefi(index)
+		if self._zdict is not None:
+			b_defi = self._decompressDefi(b_defi)
+		defiFormat = self._formats[index]
+		if defiFormat:
+			return (self._getWords(index), b_defi, chr(defiFormat))
+		return (self._getWords(index), b_defi)
 
 	def __iter__(self):
 		glos = self._glos
-		for rawEntry in self._l:
+		order = self._order
+		if order is None:
+			order = range(len(self._formats))
+		for index in order:
 			yield Entry.fromRaw(
-				glos, rawEntry,
+				glos, self._getRawEntry(index),
 				defaultDefiFormat=glos._defaultDefiFormat,
 			)
 
-	def _getLocaleSortKey(
-		self,
-		namedSortKey: "NamedSortKey",
-		sortLocale: str,
-		writeOptions: "Dict[str, Any]",
-	) -> "sortKey":
-		from icu import Locale, Collator
-
-		if namedSortKey.locale is None:
-			raise ValueError(
-				f"locale-sorting is not supported "
-				f"for sortKey={namedSortKey.name}"
-			)
-
-		localeObj = Locale(sortLocale)
-		if not localeObj.getISO3Language():
-			raise ValueError(f"invalid locale {sortLocale!r}")
-
-		log.info(f"Sorting based on locale {localeObj.getName()}")
-
-		collator = Collator.createInstance(localeObj)
-
-		return namedSortKey.locale(collator, **writeOptions)
-
 	def setSortKey(
 		self,
 		namedSortKey: "NamedSortKey",
@@ -91,16 +261,26 @@ class EntryList(object):
 		sortLocale: "Optional[str]",
 		writeOptions: "Dict[str, Any]",
 	):
-		if sortLocale:
-			sortKey = self._getLocaleSortKey(namedSortKey, sortLocale, writeOptions)
-		else:
-			sortKey = namedSortKey.normal(sortEncoding, **writeOptions)
-		self._sortKey = Entry.getRawEntrySortKey(self._glos, sortKey)
+		self._sortKey = getSortKey(
+			namedSortKey,
+			sortEncoding,
+			sortLocale,
+			writeOptions,
+		)
 
 	def sort(self):
 		if self._sortKey is None:
 			raise ValueError("EntryList.sort: sortKey is not set")
-		self._l.sort(key=self._sortKey)
+		order = self._order
+		if order is None:
+			order = range(len(self._formats))
+		sortKey = self._sortKey
+		getWords = self._getWords
+		keys = [sortKey(getWords(index)) for index in order]
+		# list.sort is stable, so is this
+		positions = sorted(range(len(keys)), key=keys.__getitem__)
+		del keys
+		self._order = array("L", [order[pos] for pos in positions])
 
 	def close(self):
 		pass
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import re
+from html.parser import HTMLParser
 
 import logging
 log = logging.getLogger("pyglossary")
@@ -368,5 +369,60 @@ def unescape_unicode(text):
 	return re_entity.sub(_sub_unescape_unicode, text)
 
 
+class HtmlTextExtractor(HTMLParser):
+	"""
+		extracts text of an html string, removing all tags and comments
+		and unescaping entities, like BeautifulSoup(html, "lxml").text
+		but without any third-party dependency
+		the content of <script>, <style> and <template> is not text
+		and is removed too (same as bs4 >= 4.9)
+
+		one instance can be used for any number of strings:
+			extractor = HtmlTextExtractor()
+			text = extractor.getText(html)
+	"""
+
+	skipTags = frozenset([
+		"script",
+		"style",
+		"template",
+	])
+
+	def __init__(self) -> None:
+		HTMLParser.__init__(self, convert_charrefs=True)
+		self._parts = []
+		self._skipDepth = 0
+
+	def reset(self) -> None:
+		HTMLParser.reset(self)
+		self._parts = []
+		self._skipDepth = 0
+
+	def handle_starttag(self, tag: str, attrs: "List[Tuple[str, str]]") -> None:
+		if tag in self.skipTags:
+			self._skipDepth += 1
+
+	def handle_startendtag(self, tag: str, attrs: "List[Tuple[str, str]]") -> None:
+		pass
+
+	def handle_endtag(self, tag: str) -> None:
+		if tag in self.skipTags and self._skipDepth > 0:
+			self._skipDepth -= 1
+
+	def handle_data(self, data: str) -> None:
+		if self._skipDepth == 0:
+			self._parts.append(data)
+
+	def getText(self, html: str) -> str:
+		if "<" not in html and "&" not in html:
+			return html
+		self.reset()
+		self.feed(html)
+		self.close()
+		text = "".join(self._parts)
+		self.reset()
+		return text
+
+
 if __name__ == "__main__":
 	build_name2codepoint_dict()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2008-2022 Saeed Rasooli <saeed.gnu@gmail.com> (ilius)
+# This file is part of PyGlossary project, https://github.com/ilius/pyglossary
+#
+# This program is a free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. Or on Debian systems, from /usr/share/common-licenses/GPL
+# If not, see <http://www.gnu.org/licenses/gpl.txt>.
+
+import sys
+import os
+import threading
+import tracemalloc
+
+import logging
+log = logging.getLogger("pyglossary")
+
+_pageSizeKiB = 4
+if hasattr(os, "sysconf"):
+	try:
+		_pageSizeKiB = os.sysconf("SC_PAGE_SIZE") // 1024
+	except (ValueError, OSError):
+		pass
+
+_statmPath = "/proc/self/statm"
+_hasStatm = os.path.isfile(_statmPath)
+
+
+def getRssKiB() -> "Optional[int]":
+	"""
+		returns current resident set size of this process in KiB
+		or None if it can not be found
+
+		reading /proc/self/statm is much cheaper than psutil, so
+		this can be called frequently
+		psutil is only used where /proc is not available (Windows and Mac)
+	"""
+	if _hasStatm:
+		with open(_statmPath, "rb") as _file:
+			return int(_file.read().split()[1]) * _pageSizeKiB
+	try:
+		import psutil
+	except ModuleNotFoundError:
+		return None
+	return psutil.Process(os.getpid()).memory_info().rss // 1024
+
+
+def getMaxRssKiB() -> "Optional[int]":
+	"""
+		returns peak resident set size of this process in KiB
+		or None if it can not be found
+	"""
+	try:
+		import resource
+	except ModuleNotFoundError:
+		return None
+	maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin":
+		# in bytes on Mac, and in KiB on Linux and BSD
+		return maxrss // 1024
+	return maxrss
+
+
+class MemoryProfiler(object):
+	"""
+		samples RSS (resident set size) on a background thread and
+		keeps the peak of each phase of conversion
+		(like "read", "filter", "sort", "write" and "finish")
+
+		if tracemalloc is tracing (python -X tracemalloc or
+		PYTHONTRACEMALLOC=1), a tracemalloc snapshot is also taken
+		when RSS reaches a new peak, and the top allocations of the last
+		snapshot are shown in summary
+
+		usage:
+			profiler = MemoryProfiler()
+			profiler.start()
+			profiler.setPhase("read")
+			...
+			profiler.stop()
+			profiler.logSummary()
+	"""
+
+	# seconds between each two samples
+	interval = 0.05
+
+	# take a new tracemalloc snapshot when RSS grows by this ratio
+	# since the last snapshot
+	snapshotGrowth = 1.1
+
+	# number of allocation sites to show from tracemalloc snapshot
+	snapshotTop = 10
+
+	def __init__(self, interval: "Optional[float]" = None) -> None:
+		if interval is not None:
+			self.interval = interval
+		self.phase = ""
+		self._phaseOrder = []
+		self._phasePeak = {}  # type: Dict[str, int]
+		self._peak = 0
+		self._peakPhase = ""
+		self._sampleCount = 0
+		self._snapshot = None
+		self._snapshotRss = 0
+		self._lock = threading.Lock()
+		self._stopEvent = threading.Event()
+		self._thread = None
+
+	def setPhase(self, phase: str) -> None:
+		"""
+			setting `profiler.phase` attribute directly is also fine
+			(and cheaper), this also takes a sample at the beginning
+			of the phase
+		"""
+		self.phase = phase
+		self.sample()
+
+	def sample(self) -> None:
+		rss = getRssKiB()
+		if rss is None:
+			return
+		phase = self.phase
+		with self._lock:
+			self._sampleCount += 1
+			if phase not in self._phasePeak:
+				self._phaseOrder.append(phase)
+				self._phasePeak[phase] = 0
+			if rss > self._phasePeak[phase]:
+				self._phasePeak[phase] = rss
+			if rss <= self._peak:
+				return
+			self._peak = rss
+			self._peakPhase = phase
+			if (
+				tracemalloc.is_tracing() and
+				rss >= self._snapshotRss * self.snapshotGrowth
+			):
+				self._snapshot = tracemalloc.take_snapshot()
+				self._snapshotRss = rss
+
+	def _run(self) -> None:
+		while not self._stopEvent.wait(self.interval):
+			self.sample()
+
+	def start(self) -> None:
+		if getRssKiB() is None:
+			log.warning("Memory profiling is not supported on this system")
+			return
+		self._stopEvent.clear()
+		self._thread = threading.Thread(
+			target=self._run,
+			name="MemoryProfiler",
+			daemon=True,
+		)
+		self._thread.start()
+
+	def stop(self) -> None:
+		if self._thread is None:
+			return
+		self._stopEvent.set()
+		self._thread.join()
+		self._thread = None
+		self.sample()
+
+	@property
+	def peak(self) -> int:
+		"""
+			peak sampled RSS in KiB
+		"""
+		return self._peak
+
+	@property
+	def peakPhase(self) -> str:
+		return self._peakPhase
+
+	def phasePeaks(self) -> "List[Tuple[str, int]]":
+		"""
+			returns a list of (phase, peakRssKiB) tuples
+			in the order of phases
+		"""
+		return [
+			(phase, self._phasePeak[phase])
+			for phase in self._phaseOrder
+		]
+
+	def summary(self) -> str:
+		lines = [
+			f"Memory usage (peak RSS of {self._sampleCount} samples):",
+		]
+		for phase, peak in self.phasePeaks():
+			if not peak:
+				continue
+			lines.append(f"    {phase or '-':10s} {peak / 1024:10.1f} MiB")
+		lines.append(
+			f"    Peak: {self._peak / 1024:.1f} MiB"
+			f" during {self._peakPhase or '-'!r}"
+		)
+		maxRss = getMaxRssKiB()
+		if maxRss:
+			lines.append(f"    Max RSS of process: {maxRss / 1024:.1f} MiB")
+		if self._snapshot is not None:
+			lines.append(
+				f"    Top allocations at {self._snapshotRss / 1024:.1f} MiB RSS:"
+			)
+			snapshot = self._snapshot.filter_traces((
+				tracemalloc.Filter(False, tracemalloc.__file__),
+				tracemalloc.Filter(False, __file__),
+			))
+			for stat in snapshot.statistics("lineno")[:self.snapshotTop]:
+				lines.append(f"        {stat}")
+		return "\n".join(lines)
+
+	def logSummary(self) -> None:
+		log.info(self.summary())
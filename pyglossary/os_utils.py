@@ -2,6 +2,7 @@ import os
 import shutil
 import logging
 from pyglossary import core
+from pyglossary.memory_profile import getRssKiB
 
 log = logging.getLogger("pyglossary")
 
@@ -38,26 +39,6 @@ class indir(object):
 		self.oldpwd = None
 
 
-def runDictzip(filename: str) -> None:
-	import shutil
-	import subprocess
-	dictzipCmd = shutil.which("dictzip")
-	if not dictzipCmd:
-		log.warning("dictzip command was not found. Make sure it's in your $PATH")
-		return False
-	(out, err) = subprocess.Popen(
-		[dictzipCmd, filename],
-		stdout=subprocess.PIPE
-	).communicate()
-	log.debug(f"dictzip command: {dictzipCmd!r}")
-	if err:
-		err = err.replace('\n', ' ')
-		log.error(f"dictzip error: {err}")
-	if out:
-		out = out.replace('\n', ' ')
-		log.error(f"dictzip error: {out}")
-
-
 def _rmtreeError(func, direc, exc_info):
 	exc_type, exc_val, exc_tb = exc_info
 	log.error(exc_val)
@@ -80,11 +61,9 @@ def rmtree(direc):
 def showMemoryUsage():
 	if log.level > core.TRACE:
 		return
-	try:
-		import psutil
-	except ModuleNotFoundError:
+	usage = getRssKiB()
+	if usage is None:
 		return
-	usage = psutil.Process(os.getpid()).memory_info().rss // 1024
 	log.trace(f"Memory Usage: {usage} kB")
 
 
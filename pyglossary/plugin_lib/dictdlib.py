@@ -18,9 +18,10 @@
 
 import sys
 import string
-import gzip
 import os
 
+from .dictzip import openDictzip, DictzipWriter
+
 b64_list = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
 url_headword = "00-database-url"
 short_headword = "00-database-short"
@@ -80,7 +81,7 @@ def sortKey(x):
 
 
 class DictDB:
-	def __init__(self, basename, mode='read', quiet=0):
+	def __init__(self, basename, mode='read', quiet=0, dictzip=0):
 		#, url = 'unknown', shortname = 'unknown',
 		#		 longinfo = 'unknown', quiet = 0):
 		"""Initialize a DictDB object.
@@ -89,13 +90,14 @@ class DictDB:
 
 		read -- read-only access
 
-		write -- write-only access, truncates existing files, does not work
-		with .dz.  dict created if nonexistent.
+		write -- write-only access, truncates existing files.  dict
+		created if nonexistent.  If dictzip is nonzero, dict.dz is
+		written instead, compressing while writing.
 
 		update -- read/write access, dict created if nonexistent.  Does not
 		work with .dz.
 
-		Read can read dict or dict.dz files.  Write and update will NOT work
+		Read can read dict or dict.dz files.  Update will NOT work
 		with dict.dz files.
 
 		If quiet is nonzero, status messages
@@ -110,6 +112,8 @@ class DictDB:
 		self.indexfilename = self.basename + ".index"
 		if mode == 'read' and os.path.isfile(self.basename + ".dict.dz"):
 			self.usecompression = 1
+		elif mode == 'write' and dictzip:
+			self.usecompression = 1
 		else:
 			self.usecompression = 0
 
@@ -121,14 +125,14 @@ class DictDB:
 		if mode == 'read':
 			self.indexfile = open(self.indexfilename, "rt")
 			if self.usecompression:
-				self.dictfile = gzip.GzipFile(self.dictfilename, "rb")
+				self.dictfile = openDictzip(self.dictfilename)
 			else:
 				self.dictfile = open(self.dictfilename, "rb")
 			self._initindex()
 		elif mode == 'write':
 			self.indexfile = open(self.indexfilename, "wt")
 			if self.usecompression:
-				raise ValueError("'write' mode incompatible with .dz files")
+				self.dictfile = DictzipWriter(self.dictfilename)
 			else:
 				self.dictfile = open(self.dictfilename, "wb")
 		elif mode == 'update':
@@ -138,7 +142,7 @@ class DictDB:
 				self.indexfile = open(self.indexfilename, "w+b")
 			if self.usecompression:
 				# Open it read-only since we don't support mods.
-				self.dictfile = gzip.GzipFile(self.dictfilename, "rb")
+				self.dictfile = openDictzip(self.dictfilename)
 			else:
 				try:
 					self.dictfile = open(self.dictfilename, "r+b")
@@ -239,7 +243,8 @@ class DictDB:
 		headwords is a list specifying one or more words under which this
 		definition should be indexed.  This function always adds \\n
 		to the end of defstr."""
-		self.dictfile.seek(0, 2)        # Seek to end of file
+		if self.mode == 'update':
+			self.dictfile.seek(0, 2)        # Seek to end of file
 		start = self.dictfile.tell()
 		defstr += b"\n"
 		self.dictfile.write(defstr)
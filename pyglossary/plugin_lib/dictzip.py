@@ -0,0 +1,569 @@
+# -*- coding: utf-8 -*-
+# dictzip.py
+#
+# Copyright © 2022 Saeed Rasooli <saeed.gnu@gmail.com> (ilius)
+# This file is part of PyGlossary project, https://github.com/ilius/pyglossary
+#
+# This program is a free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. Or on Debian systems, from /usr/share/common-licenses/GPL
+# If not, see <http://www.gnu.org/licenses/gpl.txt>.
+
+"""
+dictzip is a gzip file (RFC 1952) that is compressed in fixed-size chunks,
+each chunk is ended with a full flush, so it can be decompressed without
+the previous chunks. The size of compressed chunks are stored in the
+"RA" (random access) sub-field of gzip header's extra field:
+
+	SI1 = "R", SI2 = "A", LEN (2 bytes)
+	VER (2 bytes) = 1
+	CHLEN (2 bytes): length of uncompressed chunks
+	CHCNT (2 bytes): number of chunks
+	CHCNT x 2 bytes: size of compressed chunks
+
+All integers are little-endian.
+See `man dictzip` for more information.
+
+Since the extra field can not be larger than 64 KiB, a dictzip file
+can have at most about 32760 chunks (1.7 GiB of uncompressed data
+with the default chunk length).
+"""
+
+import os
+import struct
+import zlib
+from collections import OrderedDict, deque
+
+import logging
+log = logging.getLogger("pyglossary")
+
+FTEXT = 1
+FHCRC = 2
+FEXTRA = 4
+FNAME = 8
+FCOMMENT = 16
+
+# default chunk length of dictzip command, chosen so that a compressed
+# chunk of incompressible data still fits in 2 bytes
+defaultChunkLen = 58315
+
+# max size of gzip extra field
+maxExtraLen = 0xffff
+
+# the largest RA sub-field that fits in the extra field, while leaving
+# room for a padding sub-field (see DictzipWriter)
+maxChunkCount = (maxExtraLen - 4 - 6 - 4) // 2
+
+# gzip sub-field that fills the unused space of the reserved header
+paddingSubId = b"PD"
+
+# an empty final (BFINAL=1) deflate block with fixed Huffman codes
+emptyFinalBlock = b"\x03\x00"
+
+
+def _readRandomAccessInfo(
+	_file: "io.BufferedReader",
+) -> "Optional[Tuple[int, List[int]]]":
+	"""
+		reads gzip header from the beginning of the file
+		returns (chunkLen, chunkSizes), or None if it's not a dictzip file
+		leaves the file position at the beginning of compressed data
+	"""
+	header = _file.read(10)
+	if len(header) < 10:
+		return None
+	if header[:3] != b"\x1f\x8b\x08":
+		return None
+	flags = header[3]
+	if not flags & FEXTRA:
+		return None
+	xlen, = struct.unpack("<H", _file.read(2))
+	extra = _file.read(xlen)
+	chunkLen = 0
+	chunkSizes = []
+	pos = 0
+	while pos + 4 <= len(extra):
+		subId = extra[pos:pos + 2]
+		subLen, = struct.unpack("<H", extra[pos + 2:pos + 4])
+		subData = extra[pos + 4:pos + 4 + subLen]
+		pos += 4 + subLen
+		if subId != b"RA":
+			continue
+		ver, _chunkLen, chunkCount = struct.unpack("<HHH", subData[:6])
+		if ver != 1:
+			log.warning(f"unsupported dictzip version {ver}")
+			return None
+		if chunkLen and _chunkLen != chunkLen:
+			log.warning("dictzip: different chunk length in RA sub-fields")
+			return None
+		chunkLen = _chunkLen
+		chunkSizes += struct.unpack(
+			f"<{chunkCount}H",
+			subData[6:6 + 2 * chunkCount],
+		)
+	if not chunkLen:
+		return None
+
+	if flags & FNAME:
+		while _file.read(1) not in (b"\x00", b""):
+			pass
+	if flags & FCOMMENT:
+		while _file.read(1) not in (b"\x00", b""):
+			pass
+	if flags & FHCRC:
+		_file.read(2)
+
+	return chunkLen, chunkSizes
+
+
+def _decompressChunk(data: bytes) -> bytes:
+	# chunks (except the last one) are not ended, so zlib.decompress
+	# would fail with "incomplete or truncated stream"
+	return zlib.decompressobj(-zlib.MAX_WBITS).decompress(data)
+
+
+def isDictzip(filename: str) -> bool:
+	with open(filename, "rb") as _file:
+		return _readRandomAccessInfo(_file) is not None
+
+
+class DictzipReader(object):
+	"""
+		read-only, seekable file object for a dictzip file
+		that only decompresses the chunks it needs,
+		and keeps the last `cacheSize` decompressed chunks in memory
+	"""
+
+	def __init__(self, filename: str, cacheSize: int = 32) -> None:
+		self.name = filename
+		self._file = open(filename, "rb")
+		info = _readRandomAccessInfo(self._file)
+		if info is None:
+			self._file.close()
+			raise ValueError(f"not a dictzip file: {filename}")
+		self._chunkLen, chunkSizes = info
+		self._chunkSizes = chunkSizes
+		# offset of each compressed chunk in file
+		self._chunkOffsets = []
+		offset = self._file.tell()
+		for size in chunkSizes:
+			self._chunkOffsets.append(offset)
+			offset += size
+		self._cacheSize = max(1, cacheSize)
+		self._cache = OrderedDict()  # type: OrderedDict[int, bytes]
+		self._pos = 0
+		self._size = None  # type: Optional[int]
+
+	def __enter__(self) -> "DictzipReader":
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+		self.close()
+
+	@property
+	def closed(self) -> bool:
+		return self._file.closed
+
+	def close(self) -> None:
+		self._file.close()
+		self._cache.clear()
+
+	def readable(self) -> bool:
+		return True
+
+	def seekable(self) -> bool:
+		return True
+
+	def writable(self) -> bool:
+		return False
+
+	@property
+	def chunkLen(self) -> int:
+		return self._chunkLen
+
+	@property
+	def chunkCount(self) -> int:
+		return len(self._chunkSizes)
+
+	@property
+	def size(self) -> int:
+		"""
+			size of uncompressed data
+		"""
+		if self._size is None:
+			count = len(self._chunkSizes)
+			if count == 0:
+				self._size = 0
+			else:
+				self._size = (count - 1) * self._chunkLen + \
+					len(self._getChunk(count - 1))
+		return self._size
+
+	def _getChunk(self, index: int) -> bytes:
+		cache = self._cache
+		chunk = cache.get(index)
+		if chunk is not None:
+			cache.move_to_end(index)
+			return chunk
+		self._file.seek(self._chunkOffsets[index])
+		data = self._file.read(self._chunkSizes[index])
+		chunk = _decompressChunk(data)
+		cache[index] = chunk
+		if len(cache) > self._cacheSize:
+			cache.popitem(last=False)
+		return chunk
+
+	def tell(self) -> int:
+		return self._pos
+
+	def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+		if whence == os.SEEK_SET:
+			pos = offset
+		elif whence == os.SEEK_CUR:
+			pos = self._pos + offset
+		elif whence == os.SEEK_END:
+			pos = self.size + offset
+		else:
+			raise ValueError(f"invalid {whence=}")
+		if pos < 0:
+			raise ValueError(f"negative seek position {pos}")
+		self._pos = pos
+		return pos
+
+	def read(self, size: int = -1) -> bytes:
+		if size is None or size < 0:
+			size = max(0, self.size - self._pos)
+		return self.readAt(self._pos, size, move=True)
+
+	def readAt(self, offset: int, size: int, move: bool = False) -> bytes:
+		"""
+			read `size` bytes of uncompressed data starting at `offset`
+			if `move` is False, the current position is not changed
+		"""
+		chunkLen = self._chunkLen
+		chunkCount = len(self._chunkSizes)
+		parts = []
+		pos = offset
+		while size > 0:
+			index, start = divmod(pos, chunkLen)
+			if index >= chunkCount:
+				break
+			part = self._getChunk(index)[start:start + size]
+			if not part:
+				break
+			parts.append(part)
+			pos += len(part)
+			size -= len(part)
+		if move:
+			self._pos = pos
+		if len(parts) == 1:
+			return parts[0]
+		return b"".join(parts)
+
+
+def openDictzip(filename: str, cacheSize: int = 32) -> "io.IOBase":
+	"""
+		opens a .dz file for reading
+		returns a DictzipReader if the file has random access info,
+		or a gzip file object otherwise
+	"""
+	if isDictzip(filename):
+		return DictzipReader(filename, cacheSize=cacheSize)
+	import gzip
+	log.debug(f"no random access info in {filename}, using gzip")
+	return gzip.open(filename, mode="rb")
+
+
+def _compressChunk(data: bytes, level: int, final: bool) -> bytes:
+	"""
+		compresses one chunk as a raw deflate stream that does not
+		depend on previous chunks
+	"""
+	comp = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+	if final:
+		return comp.compress(data) + comp.flush(zlib.Z_FINISH)
+	return comp.compress(data) + comp.flush(zlib.Z_FULL_FLUSH)
+
+
+def _gzipHeader(extra: bytes, level: int) -> bytes:
+	if level >= 9:
+		xfl = 2
+	elif level == 1:
+		xfl = 4
+	else:
+		xfl = 0
+	return b"\x1f\x8b\x08" + bytes([FEXTRA]) + struct.pack(
+		"<IBBH",
+		0,  # mtime
+		xfl,
+		3,  # OS = Unix
+		len(extra),
+	) + extra
+
+
+class DictzipWriter(object):
+	"""
+		write-only file object that compresses data into a dictzip file
+
+		Chunks are compressed on a thread pool (zlib releases the GIL) while
+		data is being written. Compressed chunks are kept in memory until
+		their total size reaches `bufferSize`, after that a header with
+		enough room for the largest RA sub-field is reserved at the beginning
+		of the file and chunks are written to the file as soon as they are
+		compressed. The header is written (or overwritten) when closing.
+
+		If data is too large for dictzip format (more than `maxChunkCount`
+		chunks), the compressed data is converted to a plain file
+		(filename without ".dz"), and the rest of data is written uncompressed.
+		`tell()` returns the uncompressed position in both cases.
+	"""
+
+	def __init__(
+		self,
+		filename: str,
+		chunkLen: int = defaultChunkLen,
+		level: int = 9,
+		workers: int = 0,
+		bufferSize: int = 8 * 1024 * 1024,
+	) -> None:
+		"""
+			workers: number of compression threads, 0 means number of CPUs
+		"""
+		if not 0 < chunkLen <= 0xffff:
+			raise ValueError(f"invalid {chunkLen=}")
+		if workers <= 0:
+			workers = os.cpu_count() or 1
+		self.name = filename
+		self._file = open(filename, "wb")
+		self._chunkLen = chunkLen
+		self._level = level
+		self._bufferSize = bufferSize
+		self._buffer = bytearray()
+		self._crc = 0
+		self._size = 0
+		self._submitCount = 0
+		self._chunkSizes = []  # type: List[int]
+		self._heldChunks = []  # type: List[bytes]
+		self._heldSize = 0
+		self._headerReserved = False
+		self._plainFile = None  # type: Optional[io.BufferedWriter]
+		self._pending = deque()  # type: Deque[Future]
+		self._maxPending = workers * 2
+		self._executor = None
+		if workers > 1:
+			from concurrent.futures import ThreadPoolExecutor
+			self._executor = ThreadPoolExecutor(max_workers=workers)
+
+	def __enter__(self) -> "DictzipWriter":
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+		self.close()
+
+	@property
+	def closed(self) -> bool:
+		return self._file.closed
+
+	def readable(self) -> bool:
+		return False
+
+	def seekable(self) -> bool:
+		return False
+
+	def writable(self) -> bool:
+		return True
+
+	def tell(self) -> int:
+		"""
+			returns the size of uncompressed data written so far
+		"""
+		return self._size
+
+	def write(self, data: bytes) -> int:
+		size = len(data)
+		self._size += size
+		if self._plainFile is not None:
+			return self._plainFile.write(data)
+		self._crc = zlib.crc32(data, self._crc)
+		buf = self._buffer
+		buf += data
+		chunkLen = self._chunkLen
+		if len(buf) < chunkLen:
+			return size
+		pos = 0
+		while len(buf) - pos >= chunkLen:
+			# the last chunk is added by close()
+			if self._submitCount >= maxChunkCount - 1:
+				self._switchToPlain(bytes(buf[pos:]))
+				return size
+			self._submit(bytes(buf[pos:pos + chunkLen]))
+			pos += chunkLen
+		del buf[:pos]
+		return size
+
+	def _submit(self, chunk: bytes) -> None:
+		self._submitCount += 1
+		if self._executor is None:
+			self._storeChunk(_compressChunk(chunk, self._level, False))
+			return
+		pending = self._pending
+		pending.append(self._executor.submit(
+			_compressChunk,
+			chunk,
+			self._level,
+			False,
+		))
+		if len(pending) > self._maxPending:
+			self._storeChunk(pending.popleft().result())
+
+	def _flushPending(self) -> None:
+		pending = self._pending
+		while pending:
+			self._storeChunk(pending.popleft().result())
+
+	def _storeChunk(self, comp: bytes) -> None:
+		if len(comp) > 0xffff:
+			raise ValueError(
+				f"compressed chunk is too large ({len(comp)} bytes)"
+				f", use a smaller chunk length",
+			)
+		self._chunkSizes.append(len(comp))
+		if self._headerReserved:
+			self._file.write(comp)
+			return
+		self._heldChunks.append(comp)
+		self._heldSize += len(comp)
+		if self._heldSize < self._bufferSize:
+			return
+		self._file.write(b"\x00" * self._reservedHeaderSize())
+		for heldComp in self._heldChunks:
+			self._file.write(heldComp)
+		self._heldChunks = []
+		self._heldSize = 0
+		self._headerReserved = True
+
+	@staticmethod
+	def _reservedHeaderSize() -> int:
+		return len(_gzipHeader(b"", 9)) + maxExtraLen
+
+	def _makeExtra(self, padTo: int = 0) -> bytes:
+		sizes = self._chunkSizes
+		ra = struct.pack("<HHH", 1, self._chunkLen, len(sizes)) + \
+			struct.pack(f"<{len(sizes)}H", *sizes)
+		extra = b"RA" + struct.pack("<H", len(ra)) + ra
+		if padTo:
+			padLen = padTo - len(extra) - 4
+			extra += paddingSubId + struct.pack("<H", padLen) + b"\x00" * padLen
+		return extra
+
+	def _switchToPlain(self, rest: bytes) -> None:
+		plainFilename = self.name[:-3] if self.name.endswith(".dz") \
+			else self.name + ".raw"
+		log.warning(
+			f"Data is too large for dictzip format (more than "
+			f"{maxChunkCount * self._chunkLen} bytes)"
+			f", writing uncompressed file {plainFilename}",
+		)
+		self._flushPending()
+		plainFile = open(plainFilename, "wb")
+		if self._headerReserved:
+			self._file.close()
+			with open(self.name, "rb") as dzFile:
+				dzFile.seek(self._reservedHeaderSize())
+				for size in self._chunkSizes:
+					plainFile.write(_decompressChunk(dzFile.read(size)))
+		for comp in self._heldChunks:
+			plainFile.write(_decompressChunk(comp))
+		plainFile.write(rest)
+		self._heldChunks = []
+		self._buffer = bytearray()
+		self._plainFile = plainFile
+
+	def close(self) -> None:
+		if self._file.closed and self._plainFile is None:
+			return
+		try:
+			if self._plainFile is not None:
+				self._closePlain()
+			else:
+				self._finish()
+		finally:
+			if self._executor is not None:
+				self._executor.shutdown(wait=True)
+				self._executor = None
+
+	def _closePlain(self) -> None:
+		self._plainFile.close()
+		self._plainFile = None
+		self._file.close()
+		os.remove(self.name)
+
+	def _finish(self) -> None:
+		self._flushPending()
+		if self._buffer or not self._chunkSizes:
+			self._storeChunk(_compressChunk(
+				bytes(self._buffer),
+				self._level,
+				True,
+			))
+			self._buffer = bytearray()
+		else:
+			# data size is a multiple of chunkLen, add an empty final block
+			# to the last chunk instead of adding an empty chunk
+			self._chunkSizes[-1] += len(emptyFinalBlock)
+			if self._headerReserved:
+				self._file.write(emptyFinalBlock)
+			else:
+				self._heldChunks[-1] += emptyFinalBlock
+
+		trailer = struct.pack("<II", self._crc, self._size & 0xffffffff)
+		_file = self._file
+		if self._headerReserved:
+			_file.write(trailer)
+			_file.seek(0)
+			_file.write(_gzipHeader(
+				self._makeExtra(padTo=maxExtraLen),
+				self._level,
+			))
+		else:
+			_file.write(_gzipHeader(self._makeExtra(), self._level))
+			for comp in self._heldChunks:
+				_file.write(comp)
+			_file.write(trailer)
+			self._heldChunks = []
+		_file.close()
+
+
+def compressFile(
+	filename: str,
+	dzFilename: str = "",
+	chunkLen: int = defaultChunkLen,
+	level: int = 9,
+	workers: int = 0,
+) -> None:
+	"""
+		compresses an existing file into a dictzip file
+		dzFilename defaults to filename + ".dz"
+	"""
+	if not dzFilename:
+		dzFilename = filename + ".dz"
+	with open(filename, "rb") as inFile, DictzipWriter(
+		dzFilename,
+		chunkLen=chunkLen,
+		level=level,
+		workers=workers,
+	) as outFile:
+		while True:
+			data = inFile.read(chunkLen * 64)
+			if not data:
+				break
+			outFile.write(data)
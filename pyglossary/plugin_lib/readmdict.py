@@ -22,6 +22,8 @@ log = logging.getLogger(__name__)
 
 from struct import pack, unpack
 from io import BytesIO
+from bisect import bisect_right
+from collections import OrderedDict
 import re
 import sys
 
@@ -93,11 +95,30 @@ class MDict(object):
 	Base class which reads in header and key block.
 	It has no public methods and serves only as code sharing base class.
 	"""
+	# max number of decoded record blocks kept in memory by lookup
+	block_cache_size = 16
+
+	# number of threads for decoding record blocks in items()
+	# 1 means decoding in the calling thread
+	record_block_workers = 1
+
+	# max total size of decoded record blocks that are prefetched by threads
+	record_block_prefetch_size = 64 * 1024 * 1024
+
 	def __init__(self, fname, encoding='', passcode=None):
 		self._fname = fname
 		self._encoding = encoding.upper()
 		self._encrypted_key = None
 
+		# used by lookup, loaded on first call
+		self._key_index = None
+		self._record_block_info = None
+		self._record_block_starts = None
+		self._block_cache = OrderedDict()
+
+		# seek index of gzip-compressed file, shared by all opened files
+		self._gzip_checkpoints = []
+
 		self.header = self._read_header()
 
 		# decrypt regcode to get the encrypted key
@@ -132,6 +153,18 @@ class MDict(object):
 	def filename(self):
 		return self._fname
 
+	def _open(self):
+		"""
+		open the file for reading
+		gzip-compressed files (like FILE.mdx.gz) are decompressed on the fly,
+		with a seek index so they are not decompressed from the beginning
+		on every seek
+		"""
+		if not self._fname.lower().endswith('.gz'):
+			return open(self._fname, 'rb')
+		from pyglossary.compression import seekableGzipOpen
+		return seekableGzipOpen(self._fname, self._gzip_checkpoints)
+
 	def __len__(self):
 		return self._num_entries
 
@@ -170,7 +203,7 @@ class MDict(object):
 		# adler checksum of the block data used as the encryption key if none given
 		adler32 = unpack('>I', block[4:8])[0]
 		encrypted_key = self._encrypted_key
-		if encrypted_key is None:
+		if encrypted_key is None and encryption_method != 0:
 			encrypted_key = ripemd128(block[4:8])
 
 		# block data
@@ -306,7 +339,7 @@ class MDict(object):
 		return key_list
 
 	def _read_header(self):
-		f = open(self._fname, 'rb')
+		f = self._open()
 		# number of bytes of header text
 		header_bytes_size = unpack('>I', f.read(4))[0]
 		header_bytes = f.read(header_bytes_size)
@@ -383,7 +416,7 @@ class MDict(object):
 				return self._read_keys_v1v2()
 
 	def _read_keys_v3(self):
-		f = open(self._fname, 'rb')
+		f = self._open()
 		f.seek(self._key_block_offset)
 
 		# find all blocks offset
@@ -429,7 +462,7 @@ class MDict(object):
 		return key_list
 
 	def _read_keys_v1v2(self):
-		f = open(self._fname, 'rb')
+		f = self._open()
 		f.seek(self._key_block_offset)
 
 		# the following numbers could be encrypted
@@ -477,7 +510,7 @@ class MDict(object):
 		return key_list
 
 	def _read_keys_brutal(self):
-		f = open(self._fname, 'rb')
+		f = self._open()
 		f.seek(self._key_block_offset)
 
 		# the following numbers could be encrypted, disregard them!
@@ -527,97 +560,200 @@ class MDict(object):
 		return self._read_records()
 
 	def _read_records(self):
-		if self._version >= 3:
-			yield from self._read_records_v3()
-		else:
-			yield from self._read_records_v1v2()
-
-	def _read_records_v3(self):
-		f = open(self._fname, 'rb')
-		f.seek(self._record_block_offset)
-
+		if self._record_block_info is None:
+			self._read_record_block_info()
+		key_list = self._key_list
 		offset = 0
 		i = 0
-		size_counter = 0
-
-		num_record_blocks = self._read_int32(f)
-		num_bytes = self._read_number(f)
-		for j in range(num_record_blocks):
-			decompressed_size = self._read_int32(f)
-			compressed_size = self._read_int32(f)
-			record_block = self._decode_block(f.read(compressed_size), decompressed_size)
-
+		for (_, _, decompressed_size), record_block in zip(
+			self._record_block_info,
+			self._decode_record_blocks(),
+		):
+			if record_block is None:
+				# skip records of the block that could not be decoded
+				while i < len(key_list) and key_list[i][0] - offset < decompressed_size:
+					i += 1
+				offset += decompressed_size
+				continue
 			# split record block according to the offset info from key block
-			while i < len(self._key_list):
-				record_start, key_text = self._key_list[i]
+			while i < len(key_list):
+				record_start, key_text = key_list[i]
 				# reach the end of current record block
 				if record_start - offset >= len(record_block):
 					break
 				# record end index
-				if i < len(self._key_list)-1:
-					record_end = self._key_list[i+1][0]
+				if i < len(key_list)-1:
+					record_end = key_list[i+1][0]
 				else:
 					record_end = len(record_block) + offset
 				i += 1
 				data = record_block[record_start-offset:record_end-offset]
 				yield key_text, self._treat_record_data(data)
 			offset += len(record_block)
-			size_counter += compressed_size
 
-	def _read_records_v1v2(self):
-		f = open(self._fname, 'rb')
+	def _try_decode_block(self, block, decompressed_size):
+		try:
+			return self._decode_block(block, decompressed_size)
+		except zlib.error:
+			log.error("zlib decompress error")
+			log.debug(f"record_block_compressed = {block!r}")
+			return None
+
+	def _decode_record_blocks(self):
+		"""
+		Return a generator of decoded record blocks (or None for blocks that
+		could not be decompressed) in their original order.
+		If record_block_workers > 1, the next blocks are decoded in a thread
+		pool while the current one is being used, as long as the total
+		decompressed size of pending blocks is below record_block_prefetch_size
+		"""
+		f = self._open()
+		try:
+			if self.record_block_workers > 1:
+				yield from self._decode_record_blocks_parallel(f)
+				return
+			for file_offset, compressed_size, decompressed_size in self._record_block_info:
+				f.seek(file_offset)
+				yield self._try_decode_block(f.read(compressed_size), decompressed_size)
+		finally:
+			f.close()
+
+	def _decode_record_blocks_parallel(self, f):
+		from collections import deque
+		from concurrent.futures import ThreadPoolExecutor
+
+		workers = self.record_block_workers
+		max_size = self.record_block_prefetch_size
+		pending = deque()  # (future, decompressed_size)
+		pending_size = 0
+		executor = ThreadPoolExecutor(max_workers=workers)
+		try:
+			for file_offset, compressed_size, decompressed_size in self._record_block_info:
+				while pending and (
+					len(pending) >= workers * 2 or
+					pending_size + decompressed_size > max_size
+				):
+					future, size = pending.popleft()
+					pending_size -= size
+					yield future.result()
+				f.seek(file_offset)
+				pending.append((executor.submit(
+					self._try_decode_block,
+					f.read(compressed_size),
+					decompressed_size,
+				), decompressed_size))
+				pending_size += decompressed_size
+			while pending:
+				future, _ = pending.popleft()
+				yield future.result()
+		finally:
+			for future, _ in pending:
+				future.cancel()
+			executor.shutdown(wait=True)
+
+	def _treat_record_data(self, data):
+		return data
+
+	def _normalize_key(self, key):
+		if isinstance(key, unicode):
+			key = key.encode('utf-8')
+		return key.strip()
+
+	def _read_record_block_info(self):
+		"""
+		read size of all record blocks, without reading the blocks
+		set self._record_block_info to a list of
+			(file_offset, compressed_size, decompressed_size)
+		and self._record_block_starts to the offset of each block
+			in decompressed record data
+		"""
+		info = []
+		f = self._open()
 		f.seek(self._record_block_offset)
+		if self._version >= 3:
+			num_record_blocks = self._read_int32(f)
+			num_bytes = self._read_number(f)
+			for j in range(num_record_blocks):
+				decompressed_size = self._read_int32(f)
+				compressed_size = self._read_int32(f)
+				info.append((f.tell(), compressed_size, decompressed_size))
+				f.seek(compressed_size, 1)
+		else:
+			num_record_blocks = self._read_number(f)
+			num_entries = self._read_number(f)
+			assert(num_entries == self._num_entries)
+			record_block_info_size = self._read_number(f)
+			record_block_size = self._read_number(f)
+			sizes = []
+			for j in range(num_record_blocks):
+				compressed_size = self._read_number(f)
+				decompressed_size = self._read_number(f)
+				sizes.append((compressed_size, decompressed_size))
+			assert(self._number_width * 2 * num_record_blocks == record_block_info_size)
+			file_offset = f.tell()
+			for compressed_size, decompressed_size in sizes:
+				info.append((file_offset, compressed_size, decompressed_size))
+				file_offset += compressed_size
+		f.close()
 
-		num_record_blocks = self._read_number(f)
-		num_entries = self._read_number(f)
-		assert(num_entries == self._num_entries)
-		record_block_info_size = self._read_number(f)
-		record_block_size = self._read_number(f)
-
-		# record block info section
-		record_block_info_list = []
-		size_counter = 0
-		for i in range(num_record_blocks):
-			compressed_size = self._read_number(f)
-			decompressed_size = self._read_number(f)
-			record_block_info_list += [(compressed_size, decompressed_size)]
-			size_counter += self._number_width * 2
-		assert(size_counter == record_block_info_size)
-
-		# actual record block
+		starts = []
 		offset = 0
-		i = 0
-		size_counter = 0
-		for compressed_size, decompressed_size in record_block_info_list:
-			record_block_compressed = f.read(compressed_size)
-			try:
-				record_block = self._decode_block(record_block_compressed, decompressed_size)
-			except zlib.error:
-				log.error("zlib decompress error")
-				log.debug(f"record_block_compressed = {record_block_compressed!r}")
-				continue
-			# split record block according to the offset info from key block
-			while i < len(self._key_list):
-				record_start, key_text = self._key_list[i]
-				# reach the end of current record block
-				if record_start - offset >= len(record_block):
-					break
-				# record end index
-				if i < len(self._key_list)-1:
-					record_end = self._key_list[i+1][0]
-				else:
-					record_end = len(record_block) + offset
-				i += 1
-				data = record_block[record_start-offset:record_end-offset]
-				yield key_text, self._treat_record_data(data)
-			offset += len(record_block)
-			size_counter += compressed_size
-		#assert(size_counter == record_block_size)
+		for _, _, decompressed_size in info:
+			starts.append(offset)
+			offset += decompressed_size
+		self._record_block_info = info
+		self._record_block_starts = starts
 
-		f.close()
+	def _get_record_block(self, index):
+		"""
+		return the decoded record block, using an LRU cache
+		"""
+		cache = self._block_cache
+		block = cache.get(index)
+		if block is not None:
+			cache.move_to_end(index)
+			return block
+		file_offset, compressed_size, decompressed_size = self._record_block_info[index]
+		with self._open() as f:
+			f.seek(file_offset)
+			block = self._decode_block(f.read(compressed_size), decompressed_size)
+		cache[index] = block
+		if len(cache) > self.block_cache_size:
+			cache.popitem(last=False)
+		return block
+
+	def _read_record(self, i):
+		"""
+		decode the record of i-th key, only decompressing the block containing it
+		"""
+		if self._record_block_info is None:
+			self._read_record_block_info()
+		record_start = self._key_list[i][0]
+		# binary search for the block that contains the record
+		j = bisect_right(self._record_block_starts, record_start) - 1
+		block = self._get_record_block(j)
+		block_start = self._record_block_starts[j]
+		if i < len(self._key_list)-1:
+			record_end = self._key_list[i+1][0]
+		else:
+			record_end = block_start + len(block)
+		return self._treat_record_data(block[record_start-block_start:record_end-block_start])
 
-	def _treat_record_data(self, data):
-		return data
+	def lookup(self, key):
+		"""
+		Return a list of records (content) for given key, only decoding
+		the record blocks that contain them.
+		The key index is built on the first call.
+		"""
+		if self._key_index is None:
+			key_index = {}
+			for i, (_, key_text) in enumerate(self._key_list):
+				key_index.setdefault(self._normalize_key(key_text), []).append(i)
+			self._key_index = key_index
+		indexes = self._key_index.get(self._normalize_key(key))
+		if not indexes:
+			return []
+		return [self._read_record(i) for i in indexes]
 
 
 class MDD(MDict):
@@ -632,6 +768,25 @@ class MDD(MDict):
 	def __init__(self, fname, passcode=None):
 		MDict.__init__(self, fname, encoding='UTF-16', passcode=passcode)
 
+	def _normalize_key(self, key):
+		"""
+		file names are case-insensitive, and start with a backslash
+		"""
+		key = MDict._normalize_key(self, key).replace(b'/', b'\\').lower()
+		if not key.startswith(b'\\'):
+			key = b'\\' + key
+		return key
+
+	def lookup(self, path):
+		"""
+		Return content of the file with given path (like "images/a.png"),
+		or None if it's not found
+		"""
+		records = MDict.lookup(self, path)
+		if not records:
+			return None
+		return records[0]
+
 
 class MDX(MDict):
 	"""
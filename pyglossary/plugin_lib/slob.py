@@ -1,7 +1,9 @@
 # pylint: disable=C0111,C0103,C0302,R0903,R0904,R0914,R0201
 import encodings
 import functools
+import heapq
 import io
+import mmap
 import os
 import pickle
 import sys
@@ -9,13 +11,14 @@ import tempfile
 import warnings
 
 from abc import abstractmethod
-from bisect import bisect_left
+from bisect import bisect_left, bisect_right
 from builtins import open as fopen
-from collections import namedtuple
+from collections import deque, namedtuple, OrderedDict
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from functools import lru_cache
-from struct import pack, unpack, calcsize
+from struct import pack, unpack, unpack_from, calcsize
 from threading import RLock
 from types import MappingProxyType
 from uuid import uuid4, UUID
@@ -81,7 +84,7 @@ def init_compressions():
 			warnings.warn('%s is not available' % name)
 		else:
 			compressions[name] = Compression(
-				lambda x: m.compress(x, 9), m.decompress)
+				lambda x, m=m: m.compress(x, 9), m.decompress)
 
 	try:
 		import lzma
@@ -171,6 +174,12 @@ def sortkey(strength, maxlength=None):
 
 
 class MultiFileReader(io.BufferedIOBase):
+	"""
+	Read-only file object over one or more files (parts of a split slob)
+	that are memory-mapped. Besides read and seek, read_at and unpack_at
+	read from any offset without changing the position, and read_at
+	returns a memoryview (no copy) when the data is in a single part.
+	"""
 
 	def __init__(self, *args):
 		filenames = []
@@ -180,20 +189,22 @@ class MultiFileReader(io.BufferedIOBase):
 			else:
 				for name in arg:
 					filenames.append(name)
-		files = []
-		ranges = []
+		maps = []
+		starts = []
 		offset = 0
 		for name in filenames:
-			size = os.stat(name).st_size
-			ranges.append(range(offset, offset + size))
-			files.append(fopen(name, 'rb'))
+			with fopen(name, 'rb') as f:
+				size = os.fstat(f.fileno()).st_size
+				if size > 0:
+					maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+				else:
+					maps.append(b'')
+			starts.append(offset)
 			offset += size
 		self.size = offset
-		self._ranges = ranges
-		self._files = files
-		self._fcount = len(self._files)
-		self._offset = -1
-		self.seek(0)
+		self._maps = maps
+		self._starts = starts
+		self._offset = 0
 
 	def __enter__(self):
 		return self
@@ -203,13 +214,19 @@ class MultiFileReader(io.BufferedIOBase):
 		return False
 
 	def close(self):
-		for f in self._files:
-			f.close()
-		self._files.clear()
-		self._ranges.clear()
+		for m in self._maps:
+			if isinstance(m, mmap.mmap):
+				try:
+					m.close()
+				except BufferError:
+					# a memoryview of it is still alive, the map is
+					# closed when it is garbage collected
+					pass
+		self._maps.clear()
+		self._starts.clear()
 
 	def closed(self):
-		return len(self._ranges) == 0
+		return len(self._maps) == 0
 
 	def isatty(self):
 		return False
@@ -237,32 +254,37 @@ class MultiFileReader(io.BufferedIOBase):
 	def writable(self):
 		return False
 
+	def read_at(self, offset, n):
+		"""
+		read n bytes (or less at the end of file) from offset
+		returns a memoryview if data is in one part, otherwise bytes
+		"""
+		n = max(0, min(n, self.size - offset))
+		if n == 0 or offset < 0:
+			return b''
+		index = bisect_right(self._starts, offset) - 1
+		start = offset - self._starts[index]
+		m = self._maps[index]
+		if start + n <= len(m):
+			return memoryview(m)[start:start + n]
+		parts = []
+		while n > 0 and index < len(self._maps):
+			m = self._maps[index]
+			part = m[start:start + n]
+			parts.append(part)
+			n -= len(part)
+			index += 1
+			start = 0
+		return b''.join(parts)
+
+	def unpack_at(self, fmt, offset):
+		return unpack(fmt, self.read_at(offset, calcsize(fmt)))
+
 	def read(self, n=-1):
-		file_index = -1
-		actual_offset = 0
-		for i, r in enumerate(self._ranges):
-			if self._offset in r:
-				file_index = i
-				actual_offset = self._offset - r.start
-				break
-		result = b''
 		if (n == -1 or n is None):
-			to_read = self.size
-		else:
-			to_read = n
-		while -1 < file_index < self._fcount:
-			f = self._files[file_index]
-			f.seek(actual_offset)
-			read = f.read(to_read)
-			read_count = len(read)
-			self._offset += read_count
-			result += read
-			to_read -= read_count
-			if to_read > 0:
-				file_index += 1
-				actual_offset = 0
-			else:
-				break
+			n = self.size
+		result = bytes(self.read_at(self._offset, n))
+		self._offset += len(result)
 		return result
 
 
@@ -351,6 +373,14 @@ class Blob(object):
 		return f'<{self.__class__.__module__}.{self.__class__.__name__} {self.key}>'
 
 
+def decode_text(byte_string, max_len, encoding):
+	if len(byte_string) == max_len:
+		terminator = bytes(byte_string).find(0)
+		if terminator > -1:
+			byte_string = byte_string[:terminator]
+	return str(byte_string, encoding)
+
+
 def read_byte_string(f, len_spec):
 	length = unpack(len_spec, f.read(calcsize(len_spec)))[0]
 	return f.read(length)
@@ -534,7 +564,10 @@ def unmeld_ints(c):
 
 class Slob(Sequence):
 
-	def __init__(self, file_or_filenames):
+	def __init__(self, file_or_filenames, bin_cache_size=16):
+		"""
+		bin_cache_size: max number of decompressed bins kept in memory
+		"""
 		self._f = MultiFileReader(file_or_filenames)
 
 		try:
@@ -553,12 +586,12 @@ class Slob(Sequence):
 			offset=self._header.refs_offset,
 		)
 
-		self._g = MultiFileReader(file_or_filenames)
 		self._store = Store(
-			self._g,
+			self._f,
 			self._header.store_offset,
 			COMPRESSIONS[self._header.compression].decompress,
 			self._header.content_types,
+			bin_cache_size=bin_cache_size,
 		)
 
 	def __enter__(self):
@@ -628,7 +661,6 @@ class Slob(Sequence):
 
 	def close(self):
 		self._f.close()
-		self._g.close()
 
 
 def find_parts(fname):
@@ -642,11 +674,11 @@ def find_parts(fname):
 	return sorted(candidates)
 
 
-def open(file_or_filenames):
+def open(file_or_filenames, bin_cache_size=16):
 	if isinstance(file_or_filenames, str):
 		if not os.path.exists(file_or_filenames):
 			file_or_filenames = find_parts(file_or_filenames)
-	return Slob(file_or_filenames)
+	return Slob(file_or_filenames, bin_cache_size=bin_cache_size)
 
 
 class BinMemWriter:
@@ -667,19 +699,30 @@ class BinMemWriter:
 	def __len__(self):
 		return len(self.item_dir)
 
-	def finalize(self, fout: 'output file', compress: 'function'):
-		count = len(self)
-		fout.write(pack(U_INT, count))
-		for content_type_id in self.content_type_ids:
-			fout.write(pack(U_CHAR, content_type_id))
-		content = b''.join(self.item_dir + self.items)
-		compressed = compress(content)
-		fout.write(pack(U_INT, len(compressed)))
-		fout.write(compressed)
+	def header(self):
+		return pack(U_INT, len(self)) + b''.join(
+			pack(U_CHAR, content_type_id)
+			for content_type_id in self.content_type_ids
+		)
+
+	def content(self):
+		return b''.join(self.item_dir + self.items)
+
+	def clear(self):
 		self.content_type_ids.clear()
 		self.item_dir.clear()
 		self.items.clear()
 
+	def finalize(self, fout: 'output file', compress: 'function'):
+		write_bin(fout, self.header(), compress(self.content()))
+		self.clear()
+
+
+def write_bin(fout: 'output file', header: bytes, compressed: bytes):
+	fout.write(header)
+	fout.write(pack(U_INT, len(compressed)))
+	fout.write(compressed)
+
 
 class ItemList(Sequence):
 	def __init__(
@@ -738,6 +781,35 @@ class RefList(ItemList):
 			U_LONG_LONG,
 			cache_size=512,
 		)
+		self.encoding = encoding
+
+	def pos(self, i):
+		return self._file.unpack_at(
+			self.pos_spec,
+			self.pos_offset + self.pos_size * i,
+		)[0]
+
+	def read(self, pos):
+		# f is a MultiFileReader, reading from it does not need a lock
+		f = self._file
+		offset = self.data_offset + pos
+		key_len = f.unpack_at(U_SHORT, offset)[0]
+		offset += U_SHORT_SIZE
+		key = decode_text(f.read_at(offset, key_len), MAX_TEXT_LEN, self.encoding)
+		offset += key_len
+		bin_index, item_index, fragment_len = f.unpack_at('>IHB', offset)
+		offset += U_INT_SIZE + U_SHORT_SIZE + U_CHAR_SIZE
+		fragment = decode_text(
+			f.read_at(offset, fragment_len),
+			MAX_TINY_TEXT_LEN,
+			self.encoding,
+		)
+		return Ref(
+			key=key,
+			bin_index=bin_index,
+			item_index=item_index,
+			fragment=fragment,
+		)
 
 	def _read_item(self):
 		key = self._file.read_text()
@@ -780,7 +852,14 @@ StoreItem = namedtuple('StoreItem', 'content_type_ids compressed_content')
 
 class Store(ItemList):
 
-	def __init__(self, file_, offset, decompress, content_types):
+	def __init__(
+		self,
+		file_,
+		offset,
+		decompress,
+		content_types,
+		bin_cache_size=16,
+	):
 		super().__init__(
 			StructReader(file_),
 			offset,
@@ -790,6 +869,46 @@ class Store(ItemList):
 		)
 		self.decompress = decompress
 		self.content_types = content_types
+		# LRU cache of decompressed bins:
+		# bin_index -> (content_type_ids, content)
+		self._bin_cache = OrderedDict()
+		self._bin_cache_size = max(1, bin_cache_size)
+
+	def pos(self, i):
+		return self._file.unpack_at(
+			self.pos_spec,
+			self.pos_offset + self.pos_size * i,
+		)[0]
+
+	def _read_bin(self, bin_index):
+		"""
+		returns (content_type_ids, compressed_content)
+		content_type_ids is bytes, compressed_content is a memoryview
+		of the mapped file (or bytes if bin is in 2 parts of the file)
+		"""
+		f = self._file
+		offset = self.data_offset + self.pos(bin_index)
+		bin_item_count = f.unpack_at(U_INT, offset)[0]
+		offset += U_INT_SIZE
+		content_type_ids = bytes(f.read_at(offset, bin_item_count))
+		offset += bin_item_count
+		content_length = f.unpack_at(U_INT, offset)[0]
+		offset += U_INT_SIZE
+		return content_type_ids, f.read_at(offset, content_length)
+
+	def read(self, pos):
+		f = self._file
+		offset = self.data_offset + pos
+		bin_item_count = f.unpack_at(U_INT, offset)[0]
+		offset += U_INT_SIZE
+		content_type_ids = list(f.read_at(offset, bin_item_count))
+		offset += bin_item_count
+		content_length = f.unpack_at(U_INT, offset)[0]
+		offset += U_INT_SIZE
+		return StoreItem(
+			content_type_ids=content_type_ids,
+			compressed_content=bytes(f.read_at(offset, content_length)),
+		)
 
 	def _read_item(self):
 		bin_item_count = self._file.read_int()
@@ -805,27 +924,54 @@ class Store(ItemList):
 			compressed_content=content,
 		)
 
-	def _content_type(self, bin_index, item_index):
-		store_item = self[bin_index]
-		content_type_id = store_item.content_type_ids[item_index]
-		content_type = self.content_types[content_type_id]
-		return content_type, store_item
+	def _get_bin(self, bin_index):
+		"""
+		returns (content_type_ids, decompressed_content) of a bin,
+		using the LRU cache of decompressed bins
+		"""
+		cache = self._bin_cache
+		with self.lock:
+			item = cache.get(bin_index)
+			if item is not None:
+				cache.move_to_end(bin_index)
+				return item
+		content_type_ids, compressed = self._read_bin(bin_index)
+		content = self.decompress(compressed)
+		if not isinstance(content, bytes):
+			# identity decompression returns the view of mapped file
+			content = bytes(content)
+		del compressed
+		item = (content_type_ids, content)
+		with self.lock:
+			cache[bin_index] = item
+			if len(cache) > self._bin_cache_size:
+				cache.popitem(last=False)
+		return item
 
 	def content_type(self, bin_index, item_index):
-		return self._content_type(bin_index, item_index)[0]
+		with self.lock:
+			item = self._bin_cache.get(bin_index)
+		if item is not None:
+			content_type_ids = item[0]
+		else:
+			content_type_ids = self._read_bin(bin_index)[0]
+		return self.content_types[content_type_ids[item_index]]
 
-	@lru_cache(maxsize=16)
 	def _decompress(self, bin_index):
-		store_item = self[bin_index]
-		return self.decompress(store_item.compressed_content)
+		return self._get_bin(bin_index)[1]
 
 	def get(self, bin_index, item_index):
-		content_type, store_item = self._content_type(bin_index, item_index)
-		content = self._decompress(bin_index)
-		count = len(store_item.content_type_ids)
-		store_bin = Bin(count, content)
-		content = store_bin[item_index]
-		return (content_type, content)
+		content_type_ids, content = self._get_bin(bin_index)
+		count = len(content_type_ids)
+		if item_index >= count or item_index < 0:
+			raise IndexError('index out of range')
+		content_type = self.content_types[content_type_ids[item_index]]
+		# content is a Bin: item positions, then (length, bytes) items
+		pos = unpack_from(U_INT, content, U_INT_SIZE * item_index)[0]
+		offset = U_INT_SIZE * count + pos
+		content_len = unpack_from(U_INT, content, offset)[0]
+		offset += U_INT_SIZE
+		return (content_type, content[offset:offset + content_len])
 
 
 WriterEvent = namedtuple('WriterEvent', 'name data')
@@ -838,6 +984,26 @@ class KeyTooLongException(Exception):
 		return self.args[0]
 
 
+# approximate memory used by a (key, pos) tuple in a sort run, besides the key
+SORT_ITEM_OVERHEAD = 120
+# key length and ref position
+SORT_RUN_ITEM_HEADER = '>IQ'
+SORT_RUN_ITEM_HEADER_SIZE = calcsize(SORT_RUN_ITEM_HEADER)
+
+
+def read_sort_run(path):
+	"""
+	yields (key, pos) tuples from a sort run file written by Writer
+	"""
+	with fopen(path, 'rb', buffering=1024 * 1024) as f:
+		while True:
+			header = f.read(SORT_RUN_ITEM_HEADER_SIZE)
+			if not header:
+				break
+			key_len, ref_pos = unpack(SORT_RUN_ITEM_HEADER, header)
+			yield f.read(key_len), ref_pos
+
+
 class Writer(object):
 
 	def __init__(
@@ -849,6 +1015,8 @@ class Writer(object):
 		min_bin_size=512 * 1024,
 		max_redirects=5,
 		observer=None,
+		workers=1,
+		sort_buffer_size=64 * 1024 * 1024,
 	):
 		self.filename = filename
 		self.observer = observer
@@ -896,9 +1064,21 @@ class Writer(object):
 		self.content_types = {}
 
 		self.min_bin_size = min_bin_size
+		# approximate memory used for sorting refs, see _sort
+		self.sort_buffer_size = sort_buffer_size
 
 		self.current_bin = None
 
+		# bins are compressed by a thread pool when workers > 1
+		# (bz2, zlib and lzma release the GIL while compressing),
+		# and written in the order they were filled, so the output
+		# is identical to the output of serial mode
+		self.workers = workers
+		self._executor = None
+		self._pending_bins = deque()
+		if workers > 1 and compression:
+			self._executor = ThreadPoolExecutor(max_workers=workers)
+
 		self.blob_count = 0
 		self.ref_count = 0
 		self.bin_count = 0
@@ -1001,9 +1181,32 @@ class Writer(object):
 			self.observer(WriterEvent(name, data))
 
 	def _write_current_bin(self):
-		self.f_store_positions.write_long(self.f_store.tell())
-		self.current_bin.finalize(self.f_store, self.compress)
+		current_bin = self.current_bin
 		self.current_bin = None
+		if self._executor is None:
+			self.f_store_positions.write_long(self.f_store.tell())
+			current_bin.finalize(self.f_store, self.compress)
+			return
+		self._pending_bins.append((
+			current_bin.header(),
+			self._executor.submit(self.compress, current_bin.content()),
+		))
+		current_bin.clear()
+		# limit the number of uncompressed bins kept in memory
+		while len(self._pending_bins) > 2 * self.workers:
+			self._write_pending_bin()
+
+	def _write_pending_bin(self):
+		header, future = self._pending_bins.popleft()
+		self.f_store_positions.write_long(self.f_store.tell())
+		write_bin(self.f_store, header, future.result())
+
+	def _write_pending_bins(self):
+		while self._pending_bins:
+			self._write_pending_bin()
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
 
 	def _write_ref(self, key, bin_index, item_index, fragment=''):
 		self.f_ref_positions.write_long(self.f_refs.tell())
@@ -1014,6 +1217,13 @@ class Writer(object):
 		self.ref_count += 1
 
 	def _sort(self):
+		"""
+		sorts ref positions by collation key of ref keys
+
+		collation keys are computed once per ref, and sorted in runs
+		that fit in sort_buffer_size, if there is more than one run,
+		runs are written to tmpdir and merged
+		"""
 		self._fire_event('begin_sort')
 		f_ref_positions_sorted = self._wbfopen('ref-positions-sorted')
 		self.f_refs.flush()
@@ -1021,12 +1231,36 @@ class Writer(object):
 		with MultiFileReader(self.f_ref_positions.name, self.f_refs.name) as f:
 			ref_list = RefList(f, self.encoding, count=self.ref_count)
 			sortkey_func = sortkey(IDENTICAL)
-			for i in sorted(
-				range(len(ref_list)),
-				key=lambda j: sortkey_func(ref_list[j].key)
-			):
+			run = []
+			run_size = 0
+			run_paths = []
+			for i in range(len(ref_list)):
 				ref_pos = ref_list.pos(i)
+				key = sortkey_func(ref_list.read(ref_pos).key)
+				# ref positions are increasing, so sorting (key, pos) tuples
+				# keeps the order of refs with equal keys, like a stable sort
+				run.append((key, ref_pos))
+				run_size += len(key) + SORT_ITEM_OVERHEAD
+				if run_size >= self.sort_buffer_size:
+					run_paths.append(self._write_sort_run(run, len(run_paths)))
+					run = []
+					run_size = 0
+			if run_paths:
+				if run:
+					run_paths.append(self._write_sort_run(run, len(run_paths)))
+				run = None
+				self._fire_event('merge_sort_runs', str(len(run_paths)))
+				sorted_items = heapq.merge(*[
+					read_sort_run(path) for path in run_paths
+				])
+			else:
+				run.sort()
+				sorted_items = run
+			for _, ref_pos in sorted_items:
 				f_ref_positions_sorted.write_long(ref_pos)
+			run = sorted_items = None
+		for path in run_paths:
+			os.remove(path)
 		f_ref_positions_sorted.close()
 		os.remove(self.f_ref_positions.name)
 		os.rename(f_ref_positions_sorted.name, self.f_ref_positions.name)
@@ -1035,6 +1269,15 @@ class Writer(object):
 			encoding=self.encoding)
 		self._fire_event('end_sort')
 
+	def _write_sort_run(self, run, run_index):
+		run.sort()
+		path = os.path.join(self.tmpdir.name, 'sort-run-%d' % run_index)
+		with fopen(path, 'wb') as f:
+			for key, ref_pos in run:
+				f.write(pack(SORT_RUN_ITEM_HEADER, len(key), ref_pos))
+				f.write(key)
+		return path
+
 	def _resolve_aliases(self):
 		self._fire_event('begin_resolve_aliases')
 		self.f_aliases.finalize()
@@ -1112,6 +1355,7 @@ class Writer(object):
 		self._fire_event('begin_finalize')
 		if self.current_bin is not None:
 			self._write_current_bin()
+		self._write_pending_bins()
 
 		self._sort()
 		if self.max_redirects:
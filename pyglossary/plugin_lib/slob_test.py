@@ -164,6 +164,46 @@ class TestSort(BaseTest):
 		self.tmpdir.cleanup()
 
 
+class TestExternalSort(BaseTest):
+	def setUp(self):
+		self.tmpdir = tempfile.TemporaryDirectory(prefix='test')
+
+	def tearDown(self):
+		self.tmpdir.cleanup()
+
+	def write(self, name, sort_buffer_size):
+		path = os.path.join(self.tmpdir.name, name)
+		events = []
+		rand = random.Random(0)
+		with self.create(
+			path,
+			observer=lambda event: events.append(event.name),
+			sort_buffer_size=sort_buffer_size,
+		) as w:
+			for i in range(500):
+				key = ''.join(rand.choice('абвгдeЁёAaBb ') for _ in range(3))
+				w.add(f'{key} {i}'.encode(UTF8), key)
+		with open(path) as r:
+			items = [(blob.key, blob.content) for blob in r]
+		return items, events
+
+	def test_same_order(self):
+		items, events = self.write('1.slob', 1000)
+		self.assertIn('merge_sort_runs', events)
+		expected, events = self.write('2.slob', 64 * 1024 * 1024)
+		self.assertNotIn('merge_sort_runs', events)
+		self.assertEqual(items, expected)
+		keys = [key for key, _ in items]
+		self.assertEqual(keys, sorted(keys, key=sortkey(IDENTICAL)))
+		# refs with equal keys keep their order
+		for (key1, content1), (key2, content2) in zip(items, items[1:]):
+			if key1 == key2:
+				self.assertLess(
+					int(content1.split()[-1]),
+					int(content2.split()[-1]),
+				)
+
+
 class TestFind(BaseTest):
 
 	def setUp(self):
@@ -442,6 +482,93 @@ class TestMultiFileReader(BaseTest):
 			m.seek(-2, whence=io.SEEK_CUR)
 			self.assertEqual(m.read(3), content[2:5])
 
+			m.seek(0)
+			self.assertEqual(bytes(m.read_at(5, 3)), content[5:8])
+			self.assertEqual(bytes(m.read_at(2, 4)), content[2:6])
+			self.assertEqual(bytes(m.read_at(3, 100)), content[3:])
+			self.assertEqual(m.unpack_at('>B', 4), (content[4],))
+			self.assertEqual(m.tell(), 0)
+
+
+class TestBinCache(BaseTest):
+	def setUp(self):
+		self.tmpdir = tempfile.TemporaryDirectory(prefix='test')
+		self.path = os.path.join(self.tmpdir.name, 'test.slob')
+		with self.create(self.path, min_bin_size=100) as w:
+			for i in range(200):
+				w.add(f'content {i}'.encode(UTF8), f'key{i:03d}')
+
+	def tearDown(self):
+		self.tmpdir.cleanup()
+
+	def test_bin_cache(self):
+		with open(self.path, bin_cache_size=2) as r:
+			self.assertGreater(r._store.count, 2)
+			decompressed = []
+			decompress = r._store.decompress
+
+			def counting_decompress(data):
+				decompressed.append(1)
+				return decompress(data)
+
+			r._store.decompress = counting_decompress
+			blobs = list(r)
+			self.assertEqual(
+				[blob.content for blob in blobs],
+				[f'content {i}'.encode(UTF8) for i in range(200)],
+			)
+			self.assertEqual(len(decompressed), r._store.count)
+			self.assertLessEqual(len(r._store._bin_cache), 2)
+
+
+class TestParallelCompression(BaseTest):
+	def setUp(self):
+		self.tmpdir = tempfile.TemporaryDirectory(prefix='test')
+
+	def tearDown(self):
+		self.tmpdir.cleanup()
+
+	def write(self, name, compression, workers):
+		path = os.path.join(self.tmpdir.name, name)
+		with self.create(
+			path,
+			compression=compression,
+			min_bin_size=200,
+			workers=workers,
+		) as w:
+			for i in range(300):
+				w.add(
+					f'content {i} '.encode(UTF8) * (i % 7 + 1),
+					f'key{i:03d}',
+					content_type=('text/plain', 'text/html')[i % 2],
+				)
+		with open(path) as r:
+			header = r._header
+			self.assertEqual(
+				[blob.content for blob in r],
+				[
+					f'content {i} '.encode(UTF8) * (i % 7 + 1)
+					for i in range(300)
+				],
+			)
+		with fopen(path, 'rb') as f:
+			f.seek(header.refs_offset)
+			return f.read()
+
+	def test_same_output(self):
+		for compression in ('zlib', 'bz2', 'lzma2'):
+			self.assertEqual(
+				self.write(f'{compression}-4.slob', compression, 4),
+				self.write(f'{compression}-1.slob', compression, 1),
+			)
+
+	def test_no_threads(self):
+		# like the workers config, 0 or 1 means no threads
+		for workers in (0, 1):
+			path = os.path.join(self.tmpdir.name, f'{workers}.slob')
+			with self.create(path, workers=workers) as w:
+				self.assertIsNone(w._executor)
+
 
 class TestFormatErrors(BaseTest):
 	def setUp(self):
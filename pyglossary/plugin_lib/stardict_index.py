@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# stardict_index.py
+#
+# Copyright © 2022 Saeed Rasooli <saeed.gnu@gmail.com> (ilius)
+# This file is part of PyGlossary project, https://github.com/ilius/pyglossary
+#
+# This program is a free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. Or on Debian systems, from /usr/share/common-licenses/GPL
+# If not, see <http://www.gnu.org/licenses/gpl.txt>.
+
+"""
+Compact indexes for StarDict .idx and .syn files
+
+Both files are a sequence of records: a NUL-terminated utf-8 word followed
+by fixed-size big-endian integers. Since integers can contain NUL bytes,
+records can not be split by NUL bytes alone, so the end position of all
+records is found with one regex scan (done in C by `re` and `array`),
+and stored in an `array`. Words and integers are read from the file
+buffer (usually a mmap) only when they are needed.
+"""
+
+import re
+import mmap
+import struct
+from array import array
+
+import logging
+log = logging.getLogger("pyglossary")
+
+
+def _recordEnds(buf: "Union[bytes, mmap.mmap]", tailSize: int) -> "array":
+	"""
+		returns the end position of all records in buf
+		each record is a NUL-terminated string followed by `tailSize` bytes
+	"""
+	pattern = re.compile(b"[^\x00]*\x00.{%d}" % tailSize, re.DOTALL)
+	typecode = "I" if len(buf) <= 0xffffffff else "Q"
+	return array(typecode, map(re.Match.end, pattern.finditer(buf)))
+
+
+def openBuffer(filename: str) -> "Union[bytes, mmap.mmap]":
+	"""
+		returns a read-only memory map of the file,
+		or bytes if the file is empty
+	"""
+	with open(filename, "rb") as _file:
+		try:
+			return mmap.mmap(_file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:  # empty file
+			return b""
+
+
+class _RecordIndex(object):
+	def __init__(
+		self,
+		buf: "Union[bytes, mmap.mmap]",
+		tailSize: int,
+	) -> None:
+		self._buf = buf
+		self._tailSize = tailSize
+		self._ends = _recordEnds(buf, tailSize)
+		end = self._ends[-1] if self._ends else 0
+		if end != len(buf):
+			log.error(
+				f"{self._fileDesc} is corrupted"
+				f", {len(buf) - end} bytes at the end are ignored"
+			)
+
+	def __len__(self) -> int:
+		return len(self._ends)
+
+	def close(self) -> None:
+		if isinstance(self._buf, mmap.mmap):
+			self._buf.close()
+		self._buf = b""
+		self._ends = array("I")
+
+	def _recordStart(self, index: int) -> int:
+		if index == 0:
+			return 0
+		return self._ends[index - 1]
+
+
+class IdxIndex(_RecordIndex):
+	"""
+		index of a .idx file, each record is:
+			word, NUL, offset (4 or 8 bytes), size (4 bytes)
+		in this index, entries are accessed as (b_word, offset, size) tuples
+	"""
+
+	_fileDesc = "Index file"
+
+	def __init__(
+		self,
+		buf: "Union[bytes, mmap.mmap]",
+		offsetBits: int = 32,
+	) -> None:
+		if offsetBits == 64:
+			self._tailStruct = struct.Struct(">QI")
+		else:
+			self._tailStruct = struct.Struct(">II")
+		_RecordIndex.__init__(self, buf, self._tailStruct.size)
+
+	def __getitem__(self, index: int) -> "Tuple[bytes, int, int]":
+		end = self._ends[index]
+		tailPos = end - self._tailSize
+		offset, size = self._tailStruct.unpack_from(self._buf, tailPos)
+		return self._buf[self._recordStart(index):tailPos - 1], offset, size
+
+	def __iter__(self) -> "Iterator[Tuple[bytes, int, int]]":
+		buf = self._buf
+		tailSize = self._tailSize
+		unpack_from = self._tailStruct.unpack_from
+		start = 0
+		for end in self._ends:
+			tailPos = end - tailSize
+			offset, size = unpack_from(buf, tailPos)
+			yield buf[start:tailPos - 1], offset, size
+			start = end
+
+
+class SynIndex(_RecordIndex):
+	"""
+		index of a .syn file, each record is:
+			alternate word, NUL, entry index (4 bytes)
+		alternates of each entry are kept as a linked list of record indexes
+		in two arrays, in their original order
+	"""
+
+	_fileDesc = "Synonym file"
+
+	def __init__(
+		self,
+		buf: "Union[bytes, mmap.mmap]",
+		wordCount: int,
+	) -> None:
+		_RecordIndex.__init__(self, buf, 4)
+		ends = self._ends
+		# first record of each entry, and the next record of each record
+		head = array("i", [-1]) * wordCount
+		_next = array("i", [-1]) * len(ends)
+		unpack_from = struct.Struct(">I").unpack_from
+		for recordIndex in range(len(ends) - 1, -1, -1):
+			entryIndex, = unpack_from(buf, ends[recordIndex] - 4)
+			if entryIndex >= wordCount:
+				log.error(
+					f"Corrupted synonym file. " +
+					f"Word {self._getAlt(recordIndex)} references invalid item"
+				)
+				continue
+			_next[recordIndex] = head[entryIndex]
+			head[entryIndex] = recordIndex
+		self._head = head
+		self._next = _next
+
+	def _getAlt(self, recordIndex: int) -> bytes:
+		return self._buf[
+			self._recordStart(recordIndex):self._ends[recordIndex] - 5
+		]
+
+	def getAlts(
+		self,
+		entryIndex: int,
+		unicode_errors: str = "strict",
+	) -> "List[str]":
+		alts = []
+		recordIndex = self._head[entryIndex]
+		while recordIndex >= 0:
+			alts.append(self._getAlt(recordIndex).decode(
+				"utf-8",
+				errors=unicode_errors,
+			))
+			recordIndex = self._next[recordIndex]
+		return alts
+
+	def close(self) -> None:
+		_RecordIndex.close(self)
+		self._head = array("i")
+		self._next = array("i")
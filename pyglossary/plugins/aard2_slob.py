@@ -39,6 +39,9 @@ optionsProp = {
 	"word_title": BoolOption(
 		comment="add headwords title to beginning of definition",
 	),
+	"workers": IntOption(
+		comment="Number of threads for compressing, 0 means workers config",
+	),
 }
 
 extraDocs = [
@@ -197,6 +200,7 @@ class Writer(object):
 	_file_size_approx: int = 0
 	_separate_alternates: bool = False
 	_word_title: bool = False
+	_workers: int = 0
 
 	resourceMimeTypes = {
 		"png": "image/png",
@@ -237,6 +241,8 @@ class Writer(object):
 			log.warning(f"renamed existing {filename!r} to {filename+'.bak'!r}")
 		kwargs = {}
 		kwargs["compression"] = self._compression
+		# 0 or 1 (from either option or config) means no threads
+		kwargs["workers"] = self._workers or self._glos.getConfig("workers", 0)
 		self._slobWriter = slobWriter = slob.Writer(
 			filename,
 			observer=self._slobObserver,
@@ -190,8 +190,13 @@ class FileOffS(file):
 	file. offset parameter of the constructor specifies the offset of the first
 	byte of the modeled file.
 	"""
+	# GzipFile takes mode from its fileobj, and mode of BufferedReader
+	# is the mode of underlying file, which is an int for GzipFile
+	# (when .bgl file itself is compressed)
+	mode = "rb"
+
 	def __init__(self, filename, offset=0):
-		fileObj = open(filename, "rb")
+		fileObj = compressionOpen(filename, mode="rb")
 		file.__init__(self, fileObj)
 		self._fileObj = fileObj
 		self.offset = offset
@@ -275,6 +280,10 @@ class DefinitionFields(object):
 
 
 class BglReader(object):
+	# the whole file is read sequentially twice (see readInfo), so
+	# it can be read from a compressed file without a temp file
+	compressions = stdCompressions
+
 	_default_encoding_overwrite: str = ""
 	_source_encoding_overwrite: str = ""
 	_target_encoding_overwrite: str = ""
@@ -380,7 +389,7 @@ class BglReader(object):
 		return True
 
 	def openGzip(self):
-		with open(self._filename, "rb") as bglFile:
+		with compressionOpen(self._filename, mode="rb") as bglFile:
 			if not bglFile:
 				log.error(f"file pointer empty: {bglFile}")
 				return False
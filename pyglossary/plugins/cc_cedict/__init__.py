@@ -30,6 +30,8 @@ class Reader:
 		"lxml": "lxml",
 	}
 
+	compressions = stdCompressions
+
 	_encoding: str = "utf-8"
 	_traditional_title: bool = False
 
@@ -45,7 +47,7 @@ class Reader:
 		self._glos.sourceLangName = "Chinese"
 		self._glos.targetLangName = "English"
 
-		self.file = open(filename, "r", encoding=self._encoding)
+		self.file = compressionOpen(filename, mode="rt", encoding=self._encoding)
 		for line in self.file:
 			match = entry_count_reg.match(line)
 			if match is not None:
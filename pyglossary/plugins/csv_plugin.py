@@ -71,6 +71,7 @@ class Reader(object):
 		self._fileSize = 0
 		self._leadingLinesCount = 0
 		self._wordCount = None
+		self._lenEstimate = None
 		self._pos = -1
 		self._csvReader = None
 		self._resDir = ""
@@ -81,19 +82,12 @@ class Reader(object):
 		self,
 		filename: str,
 	) -> None:
-		from pyglossary.text_reader import TextFilePosWrapper
+		from pyglossary.text_reader import openTextFilePos
 		self._filename = filename
-		cfile = compressionOpen(filename, mode="rt", encoding=self._encoding)
-
-		if cfile.seekable():
-			cfile.seek(0, 2)
-			self._fileSize = cfile.tell()
-			cfile.seek(0)
-			# self._glos.setInfo("input_file_size", f"{self._fileSize}")
-		else:
-			log.warning("CSV Reader: file is not seekable")
-
-		self._file = TextFilePosWrapper(cfile, self._encoding)
+		self._file = openTextFilePos(filename, self._encoding)
+		# compressed size for compressed files, see TextFilePosWrapper.tell
+		self._fileSize = os.path.getsize(filename)
+		# self._glos.setInfo("input_file_size", f"{self._fileSize}")
 		self._csvReader = csv.reader(
 			self._file,
 			dialect="excel",
@@ -125,14 +119,16 @@ class Reader(object):
 		self.clear()
 
 	def __len__(self) -> int:
-		from pyglossary.file_utils import fileCountLines
-		if self._wordCount is None:
-			if hasattr(self._file, "compression"):
+		from pyglossary.file_utils import fileEstimateLines
+		if self._wordCount is not None:
+			return self._wordCount + len(self._resFileNames)
+		if self._lenEstimate is None:
+			# entries have byteProgress, so this is rarely needed
+			if self._file is None or getattr(self._file.fileobj, "compression", ""):
 				return 0
-			log.debug("Try not to use len(reader) as it takes extra time")
-			self._wordCount = fileCountLines(self._filename) - \
+			self._lenEstimate = fileEstimateLines(self._filename) - \
 				self._leadingLinesCount
-		return self._wordCount + len(self._resFileNames)
+		return self._lenEstimate + len(self._resFileNames)
 
 	def _iterRows(self):
 		if self._bufferRow:
@@ -203,7 +199,12 @@ class Writer(object):
 
 	def open(self, filename: str):
 		self._filename = filename
-		self._file = compressionOpen(filename, mode="wt", encoding=self._encoding)
+		self._file = compressionOpen(
+			filename,
+			mode="wt",
+			encoding=self._encoding,
+			workers=self._glos.getConfig("workers", 0),
+		)
 		self._resDir = resDir = filename + "_res"
 		self._csvWriter = csv.writer(
 			self._file,
@@ -135,10 +135,7 @@ class Writer(object):
 		self._dictdb = None
 
 	def finish(self):
-		from pyglossary.os_utils import runDictzip
 		self._dictdb.finish(dosort=1)
-		if self._dictzip:
-			runDictzip(f"{self._filename}.dict")
 		if self._install:
 			installToDictd(
 				self._filename,
@@ -151,7 +148,7 @@ class Writer(object):
 		filename_nox, ext = splitext(filename)
 		if ext.lower() == ".index":
 			filename = filename_nox
-		self._dictdb = DictDB(filename, "write", 1)
+		self._dictdb = DictDB(filename, "write", 1, dictzip=self._dictzip)
 		self._filename = filename
 
 	def write(self) -> "Generator[None, BaseEntry, None]":
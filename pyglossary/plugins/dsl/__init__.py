@@ -24,7 +24,7 @@ import html.entities
 from xml.sax.saxutils import escape, quoteattr
 
 from pyglossary.plugins.formats_common import *
-from pyglossary.text_reader import TextFilePosWrapper
+from pyglossary.text_reader import openTextFilePos
 
 from . import layer
 from . import tag
@@ -333,22 +333,10 @@ class Reader(object):
 		encoding = self._encoding
 		if not encoding:
 			encoding = self.detectEncoding()
-		cfile = compressionOpen(
-			filename,
-			dz=True,
-			mode="rt",
-			encoding=encoding,
-		)
-
-		if cfile.seekable():
-			cfile.seek(0, 2)
-			self._fileSize = cfile.tell()
-			cfile.seek(0)
-			# self._glos.setInfo("input_file_size", f"{self._fileSize}")
-		else:
-			log.warning("DSL Reader: file is not seekable")
-
-		self._file = TextFilePosWrapper(cfile, encoding)
+		self._file = openTextFilePos(filename, encoding, dz=True)
+		# compressed size for compressed files, see TextFilePosWrapper.tell
+		self._fileSize = os.path.getsize(filename)
+		# self._glos.setInfo("input_file_size", f"{self._fileSize}")
 
 		# read header
 		for line in self._file:
@@ -57,6 +57,9 @@ optionsProp = {
 	"cover_path": StrOption(
 		comment="Path to cover file",
 	),
+	"workers": IntOption(
+		comment="Number of threads for compressing, 0 means workers config",
+	),
 }
 
 
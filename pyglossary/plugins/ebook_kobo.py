@@ -23,13 +23,13 @@
 # SOFTWARE.
 
 from pyglossary.plugins.formats_common import *
-from itertools import groupby
 from pathlib import Path
 import unicodedata
 import re
-from pickle import dumps, loads
-from gzip import compress, decompress
-from operator import itemgetter
+from pickle import dump, load, HIGHEST_PROTOCOL
+import heapq
+
+from pyglossary.os_utils import rmtree
 
 enable = True
 lname = "kobo"
@@ -82,6 +82,34 @@ def fixFilename(fname: str) -> str:
 	return Path(fname.replace("/", "2F").replace("\\", "5C")).name
 
 
+def writeRun(path: str, items: "List[Any]", chunkSize: int = 1000) -> None:
+	"""
+		writes sorted `items` to a temporary run file
+		items are pickled in chunks, which is much faster than one by one
+	"""
+	with open(path, "wb") as _file:
+		for start in range(0, len(items), chunkSize):
+			dump(items[start:start + chunkSize], _file, protocol=HIGHEST_PROTOCOL)
+
+
+def readRun(path: str) -> "Iterator[Any]":
+	with open(path, "rb") as _file:
+		while True:
+			try:
+				chunk = load(_file)
+			except EOFError:
+				break
+			yield from chunk
+
+
+def uniqueSorted(words: "Iterable[str]") -> "Iterator[str]":
+	last = None
+	for word in words:
+		if word != last:
+			yield word
+			last = word
+
+
 class Writer:
 	WORDS_FILE_NAME = "words"
 
@@ -89,10 +117,24 @@ class Writer:
 		"marisa_trie": "marisa-trie",
 	}
 
+	# approximate size (in bytes) of entries and words to keep in memory,
+	# when reached, they are sorted and written to temporary run files,
+	# which are merged after all entries are received
+	sortBufferSize = 64 * 1024 * 1024
+
+	# approximate memory used by each record or word other than its text
+	itemOverhead = 150
+
 	def __init__(self, glos, **kwargs):
 		self._glos = glos
 		self._filename = None
-		self._words = []
+		self._tmpDir = None
+		# (prefix, index, headword, variants, defi) tuples
+		self._records = []
+		self._recordRunPaths = []
+		self._words = set()
+		self._wordRunPaths = []
+		self._bufferSize = 0
 		self._img_pattern = re.compile(
 			'<img src="([^<>"]*?)"( [^<>]*?)?>',
 			re.DOTALL,
@@ -135,33 +177,70 @@ class Writer:
 		defi = self._img_pattern.sub("[Image: \\1]", defi)
 		return defi
 
+	def _newRunPath(self, name: str) -> str:
+		import tempfile
+		if self._tmpDir is None:
+			tmpDir = join(cacheDir, "tmp")
+			os.makedirs(tmpDir, mode=0o700, exist_ok=True)
+			self._tmpDir = tempfile.mkdtemp(prefix="kobo-", dir=tmpDir)
+		return join(self._tmpDir, name)
+
+	def _flushBuffer(self) -> None:
+		recordsPath = self._newRunPath(f"records{len(self._recordRunPaths)}")
+		log.debug(f"Kobo: writing {len(self._records)} records to {recordsPath}")
+		self._records.sort()
+		writeRun(recordsPath, self._records)
+		self._recordRunPaths.append(recordsPath)
+		self._records = []
+
+		wordsPath = self._newRunPath(f"words{len(self._wordRunPaths)}")
+		writeRun(wordsPath, sorted(self._words))
+		self._wordRunPaths.append(wordsPath)
+		self._words = set()
+
+		self._bufferSize = 0
+
+	def _iterRecords(self) -> "Iterator[Tuple[str, int, str, List[str], str]]":
+		"""
+			yields all records sorted by prefix, keeping the order of
+			entries for each prefix
+			(index is unique, so the rest of tuple is never compared)
+		"""
+		self._records.sort()
+		if not self._recordRunPaths:
+			return iter(self._records)
+		log.info(f"Kobo: merging {len(self._recordRunPaths) + 1} sorted runs")
+		return heapq.merge(
+			*[readRun(path) for path in self._recordRunPaths],
+			self._records,
+		)
+
+	def _iterWords(self) -> "Iterator[str]":
+		"""
+			yields all words sorted, without duplicates
+		"""
+		return uniqueSorted(heapq.merge(
+			*[readRun(path) for path in self._wordRunPaths],
+			sorted(self._words),
+		))
+
+	def _cleanup(self) -> None:
+		self._records = []
+		self._recordRunPaths = []
+		self._words = set()
+		self._wordRunPaths = []
+		self._bufferSize = 0
+		if self._tmpDir is not None:
+			rmtree(self._tmpDir)
+			self._tmpDir = None
+
 	def write_groups(self):
 		import gzip
 		from collections import OrderedDict
-		from pyglossary.entry import Entry
 
-		glos = self._glos
 		dataEntryCount = 0
-
-		htmlHeader = "<?xml version=\"1.0\" encoding=\"utf-8\"?><html>\n"
-
-		groupCounter = 0
-		htmlContents = htmlHeader
-
-		def writeGroup(lastPrefix):
-			nonlocal htmlContents
-			group_fname = fixFilename(lastPrefix)
-			htmlContents += "</html>"
-			log.trace(
-				f"writeGroup: {lastPrefix!r}, "
-				f"{group_fname!r}, count={groupCounter}"
-			)
-			with gzip.open(group_fname + ".html", mode="wb") as gzipFile:
-				gzipFile.write(htmlContents.encode("utf-8"))
-			htmlContents = htmlHeader
-
-		allWords = []
-		data = []
+		itemOverhead = self.itemOverhead
+		index = 0
 
 		while True:
 			entry = yield
@@ -171,7 +250,7 @@ class Writer:
 				dataEntryCount += 1
 				continue
 			l_word = entry.l_word
-			allWords += l_word
+			self._words.update(l_word)
 			wordsByPrefix = OrderedDict()
 			for word in l_word:
 				prefix = self.get_prefix(word)
@@ -186,40 +265,61 @@ class Writer:
 				headword, *variants = p_words
 				if headword != mainHeadword:
 					headword = f"{mainHeadword}, {headword}"
-				data.append((
+				self._records.append((
 					prefix,
-					compress(dumps((
-						headword,
-						variants,
-						defi,
-					)))
+					index,
+					headword,
+					variants,
+					defi,
 				))
+				index += 1
+				self._bufferSize += len(defi) + itemOverhead
+			self._bufferSize += sum(len(word) for word in l_word) * 2 + \
+				itemOverhead * len(l_word)
+			if self._bufferSize >= self.sortBufferSize:
+				self._flushBuffer()
 			del entry
 
-		log.info(f"Kobo: sorting entries...")
-		data.sort(key=itemgetter(0))
-
 		log.info(f"Kobo: writing entries...")
 
+		htmlHeader = "<?xml version=\"1.0\" encoding=\"utf-8\"?><html>\n"
+		groupFile = None
+		groupCounter = 0
 		lastPrefix = ""
-		for prefix, row in data:
-			headword, variants, defi = loads(decompress(row))
-			if lastPrefix and prefix != lastPrefix:
-				writeGroup(lastPrefix)
+
+		def closeGroup():
+			log.trace(
+				f"writeGroup: {lastPrefix!r}, "
+				f"{fixFilename(lastPrefix)!r}, count={groupCounter}"
+			)
+			groupFile.write(b"</html>")
+			groupFile.close()
+
+		# each group is written while merging, only one group file is open
+		for prefix, _, headword, variants, defi in self._iterRecords():
+			if prefix != lastPrefix:
+				if groupFile is not None:
+					closeGroup()
+				groupFile = gzip.open(fixFilename(prefix) + ".html", mode="wb")
+				groupFile.write(htmlHeader.encode("utf-8"))
 				groupCounter = 0
-			lastPrefix = prefix
+				lastPrefix = prefix
 
 			htmlVariants = "".join(
 				f'<variant name="{v.strip().lower()}"/>'
 				for v in variants
 			)
 			body = f"<div><b>{headword}</b><var>{htmlVariants}</var><br/>{defi}</div>"
-			htmlContents += f"<w><a name=\"{headword}\" />{body}</w>\n"
+			groupFile.write(
+				f"<w><a name=\"{headword}\" />{body}</w>\n".encode("utf-8")
+			)
 			groupCounter += 1
-		del data
 
-		if groupCounter > 0:
-			writeGroup(lastPrefix)
+		if groupFile is not None:
+			closeGroup()
+
+		self._records = []
+		self._recordRunPaths = []
 
 		if dataEntryCount > 0:
 			log.warning(
@@ -227,8 +327,6 @@ class Writer:
 				" and replaced '<img ...' tags in definitions with placeholders"
 			)
 
-		self._words = allWords
-
 	def open(self, filename: str) -> None:
 		self._filename = filename
 
@@ -238,7 +336,10 @@ class Writer:
 
 	def finish(self) -> None:
 		import marisa_trie
-		with indir(self._filename, create=False):
-			trie = marisa_trie.Trie(self._words)
-			trie.save(self.WORDS_FILE_NAME)
+		try:
+			with indir(self._filename, create=False):
+				trie = marisa_trie.Trie(self._iterWords())
+				trie.save(self.WORDS_FILE_NAME)
+		finally:
+			self._cleanup()
 		self._filename = None
@@ -58,6 +58,10 @@ optionsProp = {
 	"keep": BoolOption(
 		comment="Keep temp files",
 	),
+	"workers": IntOption(
+		disabled=True,
+		comment="Number of threads for compressing, 0 means workers config",
+	),
 	"include_index_page": BoolOption(
 		disabled=True,
 		comment="Include index page",
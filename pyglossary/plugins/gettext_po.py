@@ -25,6 +25,8 @@ class Reader(object):
 		"polib": "polib",
 	}
 
+	compressions = stdCompressions
+
 	def __init__(self, glos: GlossaryType):
 		self._glos = glos
 		self.clear()
@@ -32,13 +34,18 @@ class Reader(object):
 	def clear(self):
 		self._filename = ""
 		self._file = None
+		self._fileSize = 0
 		self._wordCount = None
+		self._lenEstimate = None
 		self._resDir = ""
 		self._resFileNames = []
 
 	def open(self, filename):
+		from pyglossary.text_reader import openTextFilePos
 		self._filename = filename
-		self._file = open(filename)
+		self._file = openTextFilePos(filename, "utf-8")
+		# compressed size for compressed files, see TextFilePosWrapper.tell
+		self._fileSize = os.path.getsize(filename)
 		self._resDir = filename + "_res"
 		if isdir(self._resDir):
 			self._resFileNames = os.listdir(self._resDir)
@@ -52,14 +59,25 @@ class Reader(object):
 		self.clear()
 
 	def __len__(self):
-		from pyglossary.file_utils import fileCountLines
-		if self._wordCount is None:
-			log.debug("Try not to use len(reader) as it takes extra time")
-			self._wordCount = fileCountLines(
+		from pyglossary.file_utils import fileEstimateLines
+		if self._wordCount is not None:
+			return self._wordCount
+		if self._lenEstimate is None:
+			# entries have byteProgress, so this is rarely needed
+			if self._file is None or getattr(self._file.fileobj, "compression", ""):
+				return 0
+			self._lenEstimate = fileEstimateLines(
 				self._filename,
 				newline="\nmsgid",
 			)
-		return self._wordCount
+		return self._lenEstimate
+
+	def _newEntry(self, word: str, defi: str) -> "BaseEntry":
+		return self._glos.newEntry(
+			word,
+			defi,
+			byteProgress=(self._file.tell(), self._fileSize),
+		)
 
 	def __iter__(self):
 		try:
@@ -79,7 +97,7 @@ class Reader(object):
 				continue
 			if line.startswith("msgid "):
 				if word:
-					yield self._glos.newEntry(word, defi)
+					yield self._newEntry(word, defi)
 					wordCount += 1
 					word = ""
 					defi = ""
@@ -100,7 +118,7 @@ class Reader(object):
 				else:
 					word += po_unescape(line)
 		if word:
-			yield self._glos.newEntry(word, defi)
+			yield self._newEntry(word, defi)
 			wordCount += 1
 		self._wordCount = wordCount
 
@@ -3,11 +3,11 @@
 from pyglossary.plugins.formats_common import *
 from pyglossary.text_utils import (
 	escapeNTB,
-	unescapeNTB,
 )
 import html
 import os
-import json
+from itertools import groupby
+from operator import itemgetter
 
 enable = True
 lname = "html_dir"
@@ -66,9 +66,8 @@ h6 {{ font-size: 1.0em;}}
 
 
 class Writer(object):
-	depends = {
-		"cachetools": "cachetools",
-	}
+	# number of rows to insert into links database at once
+	insertBatchSize = 10000
 
 	_encoding: str = "utf-8"
 	_resources: bool = True
@@ -89,8 +88,6 @@ class Writer(object):
 		self._filenameList = []
 
 	def open(self, filename: str):
-		from cachetools import LRUCache
-
 		self._filename = filename
 		self._resDir = resDir = join(filename, "res")
 		if not isdir(filename):
@@ -128,127 +125,97 @@ class Writer(object):
 		)
 		return self._fileObj
 
-	def fixLinks(self, linkTargetSet):
-		import gc
-		from cachetools import LRUCache
+	def openLinksDB(self):
+		"""
+			creates a temporary database in output directory with 2 tables:
+				words: first (fileIndex, entryIndex) of each headword
+				links: position of each link placeholder in output files
+		"""
+		from sqlite3 import connect
+		con = connect(join(self._filename, "links.db"))
+		for pragma in (
+			"PRAGMA journal_mode=OFF",
+			"PRAGMA synchronous=OFF",
+			"PRAGMA cache_size=-16384",
+		):
+			con.execute(pragma)
+		con.execute(
+			"CREATE TABLE words ("
+			"word TEXT PRIMARY KEY, fileIndex INTEGER, entryIndex INTEGER"
+			") WITHOUT ROWID"
+		)
+		con.execute(
+			"CREATE TABLE links ("
+			"fileIndex INTEGER, offset INTEGER, width INTEGER,"
+			" target TEXT, broken TEXT"
+			")"
+		)
+		return con
 
-		gc.collect()
+	def fixLinks(self, con):
+		"""
+			writes the href of each link into its placeholder
+			only the placeholders are written, not the whole file
+		"""
 		dirn = self._filename
-
+		encoding = self._encoding
 		filenameList = self._filenameList
 
-		fileByWord = {}
-		for line in open(join(dirn, "index.txt"), encoding="utf-8"):
-			line = line.rstrip("\n")
-			if not line:
-				continue
-			entryIndex, wordEsc, filename, _ = line.split("\t")
-			entryIndex = int(entryIndex)
-			# entryId = f"entry{entryIndex}"
-			word = unescapeNTB(wordEsc)
-			if word not in linkTargetSet:
-				continue
-			if word in fileByWord:
-				# log.info(f'fileByWord[{word}]={fileByWord[word]}, filename={filename}')
-				fileByWord[word].append((filename, entryIndex))
-			else:
-				fileByWord[word] = [(filename, entryIndex)]
-
-		linksByFile = LRUCache(maxsize=100)
-
-		# with open(join(dirn, "fileByWord.json"), "w") as fileByWordFile:
-		# 	json.dump(fileByWord, fileByWordFile, ensure_ascii=False, indent="\t")
-
-		def getLinksByFile(fileIndex):
-			_file = linksByFile.get(fileIndex)
-			if _file is not None:
-				return _file
-			_file = open(
-				join(dirn, f"links{fileIndex}"),
-				mode="a",
-				encoding="utf-8",
-			)
-			linksByFile[fileIndex] = _file
-			return _file
-
-		log.info("")
-		for line in open(join(dirn, "links.txt"), encoding="utf-8"):
-			line = line.rstrip("\n")
-			if not line:
-				continue
-			target, fileIndex, x_start, x_size = line.split("\t")
-			target = unescapeNTB(target)
-			if target not in fileByWord:
-				targetNew = ""
-			else:
-				targetFilename, targetEntryIndex = fileByWord[target][0]
-				if targetFilename == filename:
-					continue
-				targetNew = f"{targetFilename}#entry{targetEntryIndex}"
-			_file = getLinksByFile(int(fileIndex))
-			_file.write(
-				f"{x_start}\t{x_size}\t{targetNew}\n"
-			)
-			_file.flush()
-
-		for _, _file in linksByFile.items():
-			_file.close()
-		del linksByFile
-
-		linkTargetSet.clear()
-		del fileByWord, linkTargetSet
-		gc.collect()
-
-		entry_url_fmt = self._glos.getInfo("entry_url")
-
-		re_href = re.compile(
-			b' href="[^<>"]*?"',
-			re.I,
+		cur = con.execute(
+			"SELECT links.fileIndex, links.offset, links.width, links.broken,"
+			" words.fileIndex, words.entryIndex"
+			" FROM links LEFT JOIN words ON words.word = links.target"
+			" ORDER BY links.rowid"
 		)
-
-		for fileIndex, filename in enumerate(filenameList):
-			if not isfile(join(dirn, f"links{fileIndex}")):
-				continue
-			with open(join(dirn, filename), mode="rb") as inFile:
-				with open(join(dirn, f"{filename}.new"), mode="wb") as outFile:
-					for linkLine in open(join(dirn, f"links{fileIndex}"), "rb"):
-						outFile.flush()
-						linkLine = linkLine.rstrip(b"\n")
-						x_start, x_size, target = linkLine.split(b"\t")
-						outFile.write(inFile.read(
-							int(x_start, 16) - inFile.tell()
-						))
-						curLink = inFile.read(int(x_size, 16))
-
-						if target:
-							outFile.write(re_href.sub(
-								b' href="./' + target + b'"',
-								curLink,
-							))
-							continue
-
-						if not entry_url_fmt:
-							outFile.write(curLink.replace(
-								b' href="#',
-								b' class="broken" href="#',
-							))
-							continue
-
-						_st = curLink.decode("utf-8")
-						i = _st.find('href="#')
-						j = _st.find('"', i + 7)
-						word = _st[i + 7:j]
-						url = entry_url_fmt.format(word=word)
-						outFile.write((
-							_st[:i] +
-							f'class="broken" href="{url}"' +
-							_st[j + 1:]
-						).encode("utf-8"))
-
-					outFile.write(inFile.read())
-
-			os.rename(join(dirn, f"{filename}.new"), join(dirn, filename))
-			os.remove(join(dirn, f"links{fileIndex}"))
+		brokenCount = 0
+		for fileIndex, rows in groupby(cur, key=itemgetter(0)):
+			filename = filenameList[fileIndex]
+			overflow = []
+			with open(join(dirn, filename), mode="r+b") as _file:
+				for _, offset, width, broken, targetFileIndex, targetEntryIndex in rows:
+					if targetFileIndex is None:
+						brokenCount += 1
+						attr = broken
+					else:
+						attr = (
+							f' href="./{filenameList[targetFileIndex]}'
+							f'#entry{targetEntryIndex}"'
+						)
+					b_attr = attr.encode(encoding)
+					if len(b_attr) > width:
+						overflow.append((offset, width, b_attr))
+						continue
+					_file.seek(offset)
+					_file.write(b_attr.ljust(width))
+			if overflow:
+				self.fixLinksOverflow(filename, overflow)
+
+		if brokenCount:
+			log.info(f"{brokenCount} links to missing entries")
+
+	def fixLinksOverflow(self, filename, overflow):
+		"""
+			rewrites a file for links that did not fit in their placeholder
+			which only happens with more than 10^8 entries or 10^6 files
+			(see resolvedWidth in write), or a very long filename_format
+			overflow: list of (offset, width, b_attr) tuples
+		"""
+		fpath = join(self._filename, filename)
+		log.warning(
+			f"Rewriting {filename} for {len(overflow)} links"
+			", positions of its entries in index.txt are not exact anymore"
+		)
+		with open(fpath, mode="rb") as _file:
+			data = _file.read()
+		parts = []
+		pos = 0
+		for offset, width, b_attr in overflow:
+			parts.append(data[pos:offset])
+			parts.append(b_attr)
+			pos = offset + width
+		parts.append(data[pos:])
+		with open(fpath, mode="wb") as _file:
+			_file.write(b"".join(parts))
 
 	def writeInfo(self, filename, header):
 		glos = self._glos
@@ -315,11 +282,24 @@ class Writer(object):
 			mode="w",
 			encoding="utf-8",
 		)
-		linksTxtFileObj = open(
-			join(filename, "links.txt"),
-			mode="w",
-			encoding="utf-8",
-		)
+		linksDB = self.openLinksDB()
+		wordRows = []
+		linkRows = []
+		linkCount = 0
+
+		def flushRows():
+			linksDB.executemany(
+				"INSERT OR IGNORE INTO words(word, fileIndex, entryIndex)"
+				" VALUES (?, ?, ?)",
+				wordRows,
+			)
+			linksDB.executemany(
+				"INSERT INTO links(fileIndex, offset, width, target, broken)"
+				" VALUES (?, ?, ?, ?, ?)",
+				linkRows,
+			)
+			wordRows.clear()
+			linkRows.clear()
 
 		title = glos.getInfo("name")
 		style = ""
@@ -377,32 +357,66 @@ class Writer(object):
 			re.I,
 		)
 
-		linkTargetSet = set()
-
 		def replaceBword(text) -> str:
 			return text.replace(
 				' href="bword://',
 				' href="#',
 			)
 
+		def getBrokenLinkAttr(href: str) -> str:
+			if not entry_url_fmt:
+				return f' class="broken" href="#{href}"'
+			url = entry_url_fmt.format(word=href)
+			return f' class="broken" href="{url}"'
+
+		# placeholders have a fixed width, so a link from the first entries
+		# to any entry (up to 10^8 entries in 10^6 files) fits in it
+		resolvedWidth = len((
+			' href="./'
+			f'{filename_format.format(n=999999)}'
+			f'#entry{99999999}"'
+		).encode(encoding))
+
 		def addLinks(text: str, pos: int) -> str:
+			"""
+				replaces href attribute of each link to another entry with
+				spaces, and adds its position to links table, to be filled
+				after all entries are written and link targets are known
+				returns the new text
+			"""
+			nonlocal linkCount
+			fileIndex = len(self._filenameList) - 1
+			parts = []
+			lastEnd = 0
+			b_pos = pos
 			for m in re_fixed_link.finditer(text):
 				if ' class="entry_link"' in m.group(0):
 					continue
 				if m.group(0).count("href=") != 1:
 					log.error(f"unexpected match: {m.group(0)}")
-				target = html.unescape(m.group(1))
-				linkTargetSet.add(target)
-				start = m.start()
-				b_start = len(text[:start].encode(encoding))
-				b_size = len(text[start:m.end()].encode(encoding))
-				linksTxtFileObj.write(
-					f"{escapeNTB(target)}\t"
-					f"{len(self._filenameList)-1}\t"
-					f"{hex(pos+b_start)[2:]}\t"
-					f"{hex(b_size)[2:]}\n"
-				)
-				linksTxtFileObj.flush()
+				href = m.group(1)
+				# start of ' href="#...' to the closing quote
+				start = m.start(1) - 8
+				before = text[lastEnd:start]
+				b_pos += len(before.encode(encoding))
+				broken = getBrokenLinkAttr(href)
+				width = max(resolvedWidth, len(broken.encode(encoding)))
+				parts.append(before)
+				parts.append(" " * width)
+				linkRows.append((
+					fileIndex,
+					b_pos,
+					width,
+					html.unescape(href),
+					broken,
+				))
+				b_pos += width
+				lastEnd = m.end(1) + 1
+			if not parts:
+				return text
+			linkCount += len(parts) // 2
+			parts.append(text[lastEnd:])
+			return "".join(parts)
 
 		self.writeInfo(filename, header)
 
@@ -476,6 +490,7 @@ class Writer(object):
 					))
 					fileObj.write(navBar())
 			pos = fileObj.tell()
+			fileIndex = len(self._filenameList) - 1
 			tmpFilename = escapeNTB(self._filenameList[-1])
 			for word in entry.l_word:
 				indexTxtFileObj.write(
@@ -484,18 +499,23 @@ class Writer(object):
 					f"{tmpFilename}\t"
 					f"{pos}\n"
 				)
+				wordRows.append((word, fileIndex, entryIndex))
 			del tmpFilename
 			text = replaceBword(text)
-			addLinks(text, pos)
+			text = addLinks(text, pos)
 			fileObj.write(text)
+			if len(wordRows) + len(linkRows) >= self.insertBatchSize:
+				flushRows()
 
 		fileObj.close()
 		self._fileObj = None
 		indexTxtFileObj.close()
 
-		if linkTargetSet:
-			log.info(f"{len(linkTargetSet)} link targets found")
+		flushRows()
+		if linkCount:
+			log.info(f"{linkCount} links found")
 			log.info("Fixing links, please wait...")
-			self.fixLinks(linkTargetSet)
+			self.fixLinks(linksDB)
 
-		os.remove(join(filename, "links.txt"))
+		linksDB.close()
+		os.remove(join(filename, "links.db"))
@@ -3,7 +3,7 @@
 from pyglossary.plugins.formats_common import *
 from pyglossary.text_reader import TextGlossaryReader
 from pyglossary.text_utils import splitByBar
-from pyglossary.file_utils import fileCountLines
+from pyglossary.file_utils import fileEstimateLines
 
 enable = True
 lname = "lingoes_ldf"
@@ -28,14 +28,22 @@ optionsProp = {
 class Reader(TextGlossaryReader):
 	compressions = stdCompressions
 
+	def __init__(self, glos: GlossaryType, hasInfo: bool = True):
+		TextGlossaryReader.__init__(self, glos, hasInfo=hasInfo)
+		self._lenEstimate = None
+
 	def __len__(self):
-		if self._wordCount is None:
-			log.debug("Try not to use len(reader) as it takes extra time")
-			self._wordCount = fileCountLines(
+		if self._wordCount:
+			return self._wordCount
+		if self._lenEstimate is None:
+			# entries have byteProgress, so this is rarely needed
+			if self._file is None or getattr(self._file.fileobj, "compression", ""):
+				return 0
+			self._lenEstimate = fileEstimateLines(
 				self._filename,
 				newline="\n\n",
-			) - self._leadingLinesCount
-		return self._wordCount
+			)
+		return self._lenEstimate
 
 	def isInfoWord(self, word):
 		if isinstance(word, str):
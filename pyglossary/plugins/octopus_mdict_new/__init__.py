@@ -21,6 +21,7 @@ from pyglossary.plugins.formats_common import *
 import os
 import sys
 import gc
+from struct import pack, unpack
 from os.path import splitext, isfile, isdir, extsep, basename, dirname
 
 enable = True
@@ -47,6 +48,12 @@ optionsProp = {
 	"audio": BoolOption(
 		comment="Enable audio objects",
 	),
+	"single_pass": BoolOption(
+		comment="Decompress MDX file once, keep entries in a temp file",
+	),
+	"workers": IntOption(
+		comment="Number of threads for decompressing, 0 means workers config",
+	),
 }
 
 extraDocs = [
@@ -59,10 +66,16 @@ then try to install [LZO library and Python binding](./doc/lzo.md)."""
 
 
 class Reader(object):
+	# gzip-compressed files are read with a seek index, see readmdict.MDict._open
+	# other compressions are uncompressed to a temp file by Glossary.read
+	compressions = ("gz",)
+
 	_encoding: str = ""
 	_substyle: bool = True
 	_same_dir_data_files: bool = False
 	_audio: bool = False
+	_single_pass: bool = False
+	_workers: int = 0
 
 	def __init__(self, glos):
 		self._glos = glos
@@ -82,10 +95,13 @@ class Reader(object):
 		# dict of mainWord -> newline-separated alternatives
 		self._linksDict = {}  # type: Dict[str, str]
 
+		# path of temp file that keeps (non-link) entries in single_pass mode
+		self._spoolPath = ""
+
 	def open(self, filename):
-		from pyglossary.plugin_lib.readmdict import MDX, MDD
+		from pyglossary.plugin_lib.readmdict import MDD
 		self._filename = filename
-		self._mdx = MDX(filename, self._encoding, self._substyle)
+		self._mdx = self._newMDX()
 
 		"""
 			multiple MDD files are supported with this naming schema:
@@ -97,13 +113,19 @@ class Reader(object):
 		"""
 
 		filenameNoExt, ext = splitext(self._filename)
+		if ext.lower() == ".gz":
+			filenameNoExt, ext = splitext(filenameNoExt)
 		mddBase = "".join([filenameNoExt, extsep])
 		for fname in (f"{mddBase}mdd", f"{mddBase}1.mdd"):
-			if isfile(fname):
-				self._mdd.append(MDD(fname))
+			fname = self._findFile(fname)
+			if fname:
+				self._mdd.append(self._setWorkers(MDD(fname)))
 		mddN = 2
-		while isfile(f"{mddBase}{mddN}.mdd"):
-			self._mdd.append(MDD(f"{mddBase}{mddN}.mdd"))
+		while True:
+			fname = self._findFile(f"{mddBase}{mddN}.mdd")
+			if not fname:
+				break
+			self._mdd.append(self._setWorkers(MDD(fname)))
 			mddN += 1
 
 		dataEntryCount = 0
@@ -130,9 +152,39 @@ class Reader(object):
 
 		self.loadLinks()
 
-	def loadLinks(self):
+	@staticmethod
+	def _findFile(fname: str) -> str:
+		"""
+			returns fname or its gzip-compressed version (fname.gz)
+			if either exists, or empty string
+		"""
+		if isfile(fname):
+			return fname
+		if isfile(fname + ".gz"):
+			return fname + ".gz"
+		return ""
+
+	def _setWorkers(self, mdict: "MDict") -> "MDict":
+		# 0 or 1 (from either option or config) means no threads
+		mdict.record_block_workers = (
+			self._workers or
+			self._glos.getConfig("workers", 0)
+		)
+		return mdict
+
+	def _newMDX(self) -> "MDX":
 		from pyglossary.plugin_lib.readmdict import MDX
+		return self._setWorkers(MDX(
+			self._filename,
+			self._encoding,
+			self._substyle,
+		))
+
+	def loadLinks(self):
 		log.info("extracting links...")
+		spoolFile = None
+		if self._single_pass:
+			spoolFile = self._openSpool()
 		linksDict = {}
 		word = ""
 		wordCount = 0
@@ -150,6 +202,10 @@ class Reader(object):
 					linksDict[mainWord] = word
 				continue
 			wordCount += 1
+			if spoolFile is not None:
+				spoolFile.write(pack(">II", len(b_word), len(b_defi)))
+				spoolFile.write(b_word)
+				spoolFile.write(b_defi)
 
 		log.info(
 			"extracting links done, "
@@ -158,7 +214,36 @@ class Reader(object):
 		log.info(f"{wordCount = }")
 		self._linksDict = linksDict
 		self._wordCount = wordCount
-		self._mdx = MDX(self._filename, self._encoding, self._substyle)
+		if spoolFile is not None:
+			spoolFile.close()
+			self._mdx = None
+			return
+		self._mdx = self._newMDX()
+
+	def _openSpool(self) -> "io.BufferedWriter":
+		import uuid
+		tmpDir = join(cacheDir, "tmp")
+		os.makedirs(tmpDir, mode=0o700, exist_ok=True)
+		self._spoolPath = join(tmpDir, f"mdx-{uuid.uuid1().hex}")
+		log.info(f"Keeping MDX entries in {self._spoolPath}")
+		return open(self._spoolPath, "wb", buffering=1024 * 1024)
+
+	def _readSpool(self) -> "Iterator[Tuple[bytes, bytes]]":
+		with open(self._spoolPath, "rb", buffering=1024 * 1024) as spoolFile:
+			while True:
+				header = spoolFile.read(8)
+				if not header:
+					break
+				wordLen, defiLen = unpack(">II", header)
+				yield spoolFile.read(wordLen), spoolFile.read(defiLen)
+		self._removeSpool()
+
+	def _removeSpool(self) -> None:
+		if not self._spoolPath:
+			return
+		if isfile(self._spoolPath):
+			os.remove(self._spoolPath)
+		self._spoolPath = ""
 
 	def fixDefi(self, defi: str) -> str:
 		defi = self._re_internal_link.sub(r'href=\1bword://', defi)
@@ -182,13 +267,17 @@ class Reader(object):
 		return defi
 
 	def __iter__(self):
-		if self._mdx is None:
+		if self._spoolPath:
+			items = self._readSpool()
+		elif self._mdx is not None:
+			items = self._mdx.items()
+		else:
 			log.error("trying to iterate on a closed MDX file")
 			return
 
 		glos = self._glos
 		linksDict = self._linksDict
-		for b_word, b_defi in self._mdx.items():
+		for b_word, b_defi in items:
 			word = b_word.decode("utf-8")
 			defi = b_defi.decode("utf-8").strip()
 			if defi.startswith("@@@LINK="):
@@ -232,4 +321,5 @@ class Reader(object):
 		return self._wordCount + self._dataEntryCount
 
 	def close(self):
+		self._removeSpool()
 		self.clear()
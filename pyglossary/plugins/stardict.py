@@ -19,6 +19,12 @@ from pyglossary.text_utils import (
 )
 
 from pyglossary.plugins.formats_common import *
+from pyglossary.plugin_lib.dictzip import openDictzip, DictzipWriter
+from pyglossary.plugin_lib.stardict_index import (
+	IdxIndex,
+	SynIndex,
+	openBuffer,
+)
 
 enable = True
 lname = "stardict"
@@ -119,20 +125,14 @@ class Reader(object):
 		self._xdxfTr = None
 
 		"""
-		indexData format
-		indexData[i] - i-th record in index file,
-						a tuple (previously a list) of length 3
+		indexData: IdxIndex
+		indexData[i] - i-th record in index file, a tuple of length 3
 		indexData[i][0] - b_word (bytes)
 		indexData[i][1] - definition block offset in dict file (int)
 		indexData[i][2] - definition block size in dict file (int)
-		REMOVED:
-			indexData[i][3] - list of definitions
-			indexData[i][3][j][0] - definition data
-			indexData[i][3][j][1] - definition type - "h", "m" or "x"
-			indexData[i][4] - list of synonyms (strings)
-
-		synDict:
-			a dict { entryIndex -> altList }
+
+		synIndex: SynIndex, or None if there is no .syn file
+		synIndex.getAlts(entryIndex) - list of alternates (strings)
 		"""
 
 	def xdxf_setup(self):
@@ -147,13 +147,17 @@ class Reader(object):
 	def close(self) -> None:
 		if self._dictFile:
 			self._dictFile.close()
+		if self._indexData is not None:
+			self._indexData.close()
+		if self._synIndex is not None:
+			self._synIndex.close()
 		self.clear()
 
 	def clear(self) -> None:
 		self._dictFile = None
 		self._filename = ""  # base file path, no extension
-		self._indexData = []
-		self._synDict = {}
+		self._indexData = None
+		self._synIndex = None
 		self._sametypesequence = ""
 		self._resDir = ""
 		self._resFileNames = []
@@ -172,10 +176,10 @@ class Reader(object):
 			raise LookupError(f"Invalid {sametypesequence = }")
 		self._indexData = self.readIdxFile()
 		self._wordCount = len(self._indexData)
-		self._synDict = self.readSynFile()
+		self._synIndex = self.readSynFile()
 		self._sametypesequence = sametypesequence
 		if isfile(self._filename + ".dict.dz"):
-			self._dictFile = gzip.open(self._filename + ".dict.dz", mode="rb")
+			self._dictFile = openDictzip(self._filename + ".dict.dz")
 		else:
 			self._dictFile = open(self._filename + ".dict", mode="rb")
 		self._resDir = join(dirname(self._filename), "res")
@@ -210,34 +214,17 @@ class Reader(object):
 					continue
 				self._glos.setInfo(key, value)
 
-	def readIdxFile(self) -> "List[Tuple[bytes, int, int]]":
+	def readIdxFile(self) -> "IdxIndex":
+		offsetBits = 32
+		if self._glos.getInfo("idxoffsetbits") == "64":
+			offsetBits = 64
 		if isfile(self._filename + ".idx.gz"):
 			with gzip.open(self._filename + ".idx.gz") as idxFile:
-				idxBytes = idxFile.read()
-		else:
-			with open(self._filename + ".idx", "rb") as idxFile:
-				idxBytes = idxFile.read()
-
-		indexData = []
-		pos = 0
-		while pos < len(idxBytes):
-			beg = pos
-			pos = idxBytes.find(b"\x00", beg)
-			if pos < 0:
-				log.error("Index file is corrupted")
-				break
-			b_word = idxBytes[beg:pos]
-			pos += 1
-			if pos + 8 > len(idxBytes):
-				log.error("Index file is corrupted")
-				break
-			offset = uint32FromBytes(idxBytes[pos:pos + 4])
-			pos += 4
-			size = uint32FromBytes(idxBytes[pos:pos + 4])
-			pos += 4
-			indexData.append((b_word, offset, size))
-
-		return indexData
+				return IdxIndex(idxFile.read(), offsetBits=offsetBits)
+		return IdxIndex(
+			openBuffer(self._filename + ".idx"),
+			offsetBits=offsetBits,
+		)
 
 	def decodeRawDefiPart(
 		self,
@@ -337,7 +324,7 @@ class Reader(object):
 
 	def __iter__(self) -> "Iterator[BaseEntry]":
 		indexData = self._indexData
-		synDict = self._synDict
+		synIndex = self._synIndex
 		sametypesequence = self._sametypesequence
 		dictFile = self._dictFile
 		unicode_errors = self._unicode_errors
@@ -377,12 +364,10 @@ class Reader(object):
 				continue
 
 			word = b_word.decode("utf-8", errors=unicode_errors)
-			try:
-				alts = synDict[entryIndex]
-			except KeyError:  # synDict is dict
-				pass
-			else:
-				word = [word] + alts
+			if synIndex is not None:
+				alts = synIndex.getAlts(entryIndex, unicode_errors)
+				if alts:
+					word = [word] + alts
 
 			defi, defiFormat = self.renderRawDefiList(
 				rawDefiList,
@@ -402,47 +387,13 @@ class Reader(object):
 						_file.read(),
 					)
 
-	def readSynFile(self) -> "Dict[int, List[str]]":
-		"""
-		return synDict, a dict { entryIndex -> altList }
-		"""
+	def readSynFile(self) -> "Optional[SynIndex]":
 		if not isfile(self._filename + ".syn"):
-			return {}
-		unicode_errors = self._unicode_errors
-
-		with open(self._filename + ".syn", "rb") as synFile:
-			synBytes = synFile.read()
-		synBytesLen = len(synBytes)
-		synDict = {}
-		pos = 0
-		while pos < synBytesLen:
-			beg = pos
-			pos = synBytes.find(b"\x00", beg)
-			if pos < 0:
-				log.error("Synonym file is corrupted")
-				break
-			b_alt = synBytes[beg:pos]  # b_alt is bytes
-			pos += 1
-			if pos + 4 > len(synBytes):
-				log.error("Synonym file is corrupted")
-				break
-			entryIndex = uint32FromBytes(synBytes[pos:pos + 4])
-			pos += 4
-			if entryIndex >= self._wordCount:
-				log.error(
-					f"Corrupted synonym file. " +
-					f"Word {b_alt} references invalid item"
-				)
-				continue
-
-			s_alt = b_alt.decode("utf-8", errors=unicode_errors)
-			# s_alt is str
-			try:
-				synDict[entryIndex].append(s_alt)
-			except KeyError:
-				synDict[entryIndex] = [s_alt]
-
-		return synDict
+			return None
+		return SynIndex(
+			openBuffer(self._filename + ".syn"),
+			self._wordCount,
+		)
 
 	def parseDefiBlockCompact(
 		self,
@@ -613,7 +564,6 @@ class Writer(object):
 					self._sametypesequence = "h"
 
 	def write(self) -> "Generator[None, BaseEntry, None]":
-		from pyglossary.os_utils import runDictzip
 		if self._sametypesequence:
 			if self._merge_syns:
 				yield from self.writeCompactMergeSyns(self._sametypesequence)
@@ -624,8 +574,15 @@ class Writer(object):
 				yield from self.writeGeneralMergeSyns()
 			else:
 				yield from self.writeGeneral()
+
+	def openDictFile(self) -> "io.IOBase":
+		"""
+			opens .dict file for writing, or .dict.dz file if dictzip is enabled
+			in which case the data is compressed while being written
+		"""
 		if self._dictzip:
-			runDictzip(f"{self._filename}.dict")
+			return DictzipWriter(self._filename + ".dict.dz")
+		return open(self._filename + ".dict", "wb")
 
 	def fixDefi(self, defi: str, defiFormat: str) -> str:
 		# for StarDict 3.0:
@@ -664,7 +621,7 @@ class Writer(object):
 		dictMark = 0
 		altIndexList = []  # list of tuples (b"alternate", entryIndex)
 
-		dictFile = open(self._filename + ".dict", "wb")
+		dictFile = self.openDictFile()
 		idxFile = open(self._filename + ".idx", "wb")
 
 		t0 = now()
@@ -725,7 +682,7 @@ class Writer(object):
 		dictMark = 0
 		altIndexList = []  # list of tuples (b"alternate", entryIndex)
 
-		dictFile = open(self._filename + ".dict", "wb")
+		dictFile = self.openDictFile()
 		idxFile = open(self._filename + ".idx", "wb")
 
 		t0 = now()
@@ -830,7 +787,7 @@ class Writer(object):
 		idxBlockList = []  # list of tuples (b"word", startAndLength)
 		altIndexList = []  # list of tuples (b"alternate", entryIndex)
 
-		dictFile = open(self._filename + ".dict", "wb")
+		dictFile = self.openDictFile()
 
 		t0 = now()
 		if not isdir(self._resDir):
@@ -885,7 +842,7 @@ class Writer(object):
 		idxBlockList = []  # list of tuples (b"word", startAndLength)
 		altIndexList = []  # list of tuples (b"alternate", entryIndex)
 
-		dictFile = open(self._filename + ".dict", "wb")
+		dictFile = self.openDictFile()
 
 		t0 = now()
 		wordCount = 0
@@ -218,6 +218,7 @@ class Writer(object):
 			self._filename,
 			mode="w",
 			encoding=self._encoding,
+			workers=self._glos.getConfig("workers", 0),
 		)
 
 	def finish(self):
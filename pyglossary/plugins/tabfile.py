@@ -34,6 +34,33 @@ optionsProp = {
 }
 
 
+def parseLine(
+	line: str,
+	alts: bool,
+) -> "Optional[Tuple[Union[str, List[str]], str]]":
+	"""
+		line is not empty, and has no newline
+		this runs in worker processes in parallel mode
+	"""
+	word, tab, defi = line.partition("\t")
+	if not tab:
+		log.error(
+			f"Warning: line starting with {line[:10]!r} has no tab!"
+		)
+		return
+	###
+	if alts:
+		word = splitByBarUnescapeNTB(word)
+		if len(word) == 1:
+			word = word[0]
+	else:
+		word = unescapeNTB(word, bar=False)
+	###
+	defi = unescapeNTB(defi)
+	###
+	return word, defi
+
+
 class Reader(TextGlossaryReader):
 	def __init__(self, glos: GlossaryType, hasInfo: bool = True):
 		TextGlossaryReader.__init__(self, glos, hasInfo=hasInfo)
@@ -63,6 +90,10 @@ class Reader(TextGlossaryReader):
 	def fixInfoWord(self, word: str) -> str:
 		return word.lstrip("#")
 
+	def parallelLineParser(self) -> "Callable":
+		from functools import partial
+		return partial(parseLine, alts=self._glos.alts)
+
 	def nextBlock(self) -> "Optional[Tuple[str, str, None]]":
 		if not self._file:
 			raise StopIteration
@@ -72,23 +103,10 @@ class Reader(TextGlossaryReader):
 		line = line.rstrip("\n")
 		if not line:
 			return
-		###
-		word, tab, defi = line.partition("\t")
-		if not tab:
-			log.error(
-				f"Warning: line starting with {line[:10]!r} has no tab!"
-			)
+		result = parseLine(line, self._glos.alts)
+		if result is None:
 			return
-		###
-		if self._glos.alts:
-			word = splitByBarUnescapeNTB(word)
-			if len(word) == 1:
-				word = word[0]
-		else:
-			word = unescapeNTB(word, bar=False)
-		###
-		defi = unescapeNTB(defi)
-		###
+		word, defi = result
 		return word, defi, None
 
 
@@ -6,6 +6,9 @@ from pyglossary.text_utils import (
 	joinByBar,
 )
 
+# number of rows inserted with one executemany call
+INSERT_BATCH_SIZE = 10000
+
 
 class Writer(object):
 	def __init__(self, glos):
@@ -24,6 +27,12 @@ class Writer(object):
 		self._filename = filename
 		self._con = connect(filename)
 		self._cur = self._con.cursor()
+		# the file is written from scratch, and is useless if writing fails
+		# so there is no need for a rollback journal or fsync
+		self._con.execute("PRAGMA journal_mode=OFF")
+		self._con.execute("PRAGMA synchronous=OFF")
+		self._con.execute("PRAGMA cache_size=-65536")
+		self._con.execute("PRAGMA temp_store=MEMORY")
 		self._con.execute(
 			"CREATE TABLE dict ("
 			"word TEXT,"
@@ -33,12 +42,19 @@ class Writer(object):
 			"defiFormat CHAR(1),"
 			"bindata BLOB)"
 		)
-		self._con.execute(
-			"CREATE INDEX dict_sortkey ON dict(wordlower, word);"
+
+	def _insert(self, rows):
+		self._cur.executemany(
+			"insert into dict("
+			"word, wordlower, alts, "
+			"defi, defiFormat, bindata)"
+			" values (?, ?, ?, ?, ?, ?)",
+			rows,
 		)
+		self._con.commit()
 
 	def write(self):
-		count = 0
+		rows = []
 		while True:
 			entry = yield
 			if entry is None:
@@ -50,20 +66,20 @@ class Writer(object):
 			bindata = None
 			if entry.isData():
 				bindata = entry.data
-			self._cur.execute(
-				"insert into dict("
-				"word, wordlower, alts, "
-				"defi, defiFormat, bindata)"
-				" values (?, ?, ?, ?, ?, ?)",
-				(
-					word, word.lower(), alts,
-					defi, defiFormat, bindata,
-				),
-			)
-			count += 1
-			if count % 1000 == 0:
-				self._con.commit()
+			rows.append((
+				word, word.lower(), alts,
+				defi, defiFormat, bindata,
+			))
+			if len(rows) >= INSERT_BATCH_SIZE:
+				self._insert(rows)
+				rows = []
 
+		if rows:
+			self._insert(rows)
+		# building the index after inserting all rows is much faster
+		self._con.execute(
+			"CREATE INDEX dict_sortkey ON dict(wordlower, word);"
+		)
 		self._con.commit()
 
 	def finish(self):
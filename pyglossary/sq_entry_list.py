@@ -36,6 +36,18 @@ PICKLE_PROTOCOL = 4
 
 # https://docs.python.org/3/library/pickle.html
 
+# number of rows inserted with one executemany call
+INSERT_BATCH_SIZE = 10000
+
+# the database is a temporary cache, so we don't need a rollback journal
+# or fsync. cache_size is in KiB when negative
+SQLITE_PRAGMAS = (
+	"PRAGMA journal_mode=OFF",
+	"PRAGMA synchronous=OFF",
+	"PRAGMA cache_size=-65536",
+	"PRAGMA temp_store=MEMORY",
+)
+
 
 class SqEntryList(list):
 	def __init__(
@@ -57,6 +69,8 @@ class SqEntryList(list):
 		self._persist = persist
 		self._con = connect(filename)
 		self._cur = self._con.cursor()
+		for pragma in SQLITE_PRAGMAS:
+			self._con.execute(pragma)
 
 		if not filename:
 			raise ValueError(f"invalid {filename=}")
@@ -68,6 +82,8 @@ class SqEntryList(list):
 		self._create = create
 		self._sqliteSortKey = None
 		self._columnNames = ""
+		self._insertSQL = ""
+		self._batch = []
 
 	def _getLocaleSortKey(
 		self,
@@ -116,6 +132,10 @@ class SqEntryList(list):
 		self._columnNames = ",".join([
 			col[0] for col in sqliteSortKey
 		])
+		self._insertSQL = (
+			f"insert into data({self._columnNames}, pickle)"
+			f" values (?{', ?' * len(sqliteSortKey)})"
+		)
 		if self._create:
 			colDefs = ",".join([
 				f"{col[0]} {col[1]}"
@@ -133,7 +153,6 @@ class SqEntryList(list):
 	def append(self, entry):
 		rawEntry = entry.getRaw(self._glos)
 		self._len += 1
-		colCount = len(self._sqliteSortKey)
 		try:
 			values = [
 				col[2](entry.l_word) for col in self._sqliteSortKey
@@ -146,13 +165,17 @@ class SqEntryList(list):
 		except Exception:
 			log.critical(f"error in pickle.dumps for {rawEntry = }")
 			raise
-		self._cur.execute(
-			f"insert into data({self._columnNames}, pickle)"
-			f" values (?{', ?' * colCount})",
-			values + [pickleEntry],
-		)
-		if self._len % 1000 == 0:
-			self._con.commit()
+		values.append(pickleEntry)
+		self._batch.append(values)
+		if len(self._batch) >= INSERT_BATCH_SIZE:
+			self._flush()
+
+	def _flush(self):
+		if not self._batch:
+			return
+		self._cur.executemany(self._insertSQL, self._batch)
+		self._con.commit()
+		self._batch = []
 
 	def __iadd__(self, other):
 		for item in other:
@@ -171,7 +194,8 @@ class SqEntryList(list):
 			self._orderBy = ",".join([
 				f"{col[0]} DESC" for col in self._sqliteSortKey
 			])
-		self._con.commit()
+		self._flush()
+		# index is built once, after all rows are inserted
 		self._con.execute(
 			f"CREATE INDEX sortkey ON data({sortColumnNames});"
 		)
@@ -200,6 +224,7 @@ class SqEntryList(list):
 	def deleteAll(self):
 		if self._con is None:
 			return
+		self._batch = []
 		self._con.execute(
 			f"DELETE FROM data;"
 		)
@@ -212,6 +237,7 @@ class SqEntryList(list):
 	def close(self):
 		if self._con is None:
 			return
+		self._flush()
 		self._con.commit()
 		self._cur.close()
 		self._con.close()
@@ -228,6 +254,7 @@ class SqEntryList(list):
 
 	def __iter__(self):
 		glos = self._glos
+		self._flush()
 		query = f"SELECT pickle FROM data ORDER BY {self._orderBy}"
 		self._cur.execute(query)
 		for row in self._cur:
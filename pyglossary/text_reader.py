@@ -9,10 +9,14 @@ from pyglossary.glossary_type import GlossaryType
 
 import os
 from os.path import isfile
+from collections import deque
+import re
 
 import logging
 log = logging.getLogger("pyglossary")
 
+_lineEndPattern = re.compile(b"\r\n?|\n")
+
 nextBlockResultType = """Optional[
 	Tuple[
 		str,
@@ -22,25 +26,222 @@ nextBlockResultType = """Optional[
 ]"""
 
 
+def _parseLines(
+	filename: str,
+	encoding: str,
+	start: int,
+	end: int,
+	parseLine: "Callable[[str], Optional[Tuple[Union[str, List[str]], str]]]",
+) -> "List[Tuple[Union[str, List[str]], str, int]]":
+	"""
+		runs in a worker process
+		parses lines of file in byte range [start, end), which must
+		start and end at line boundaries
+		returns a list of (word, defi, pos) tuples, where pos is the
+		byte offset of end of line
+	"""
+	with open(filename, "rb") as _file:
+		_file.seek(start)
+		data = _file.read(end - start)
+	results = []
+	pos = start
+	for b_line in data.split(b"\n"):
+		pos += len(b_line) + 1
+		if not b_line:
+			continue
+		text = b_line.decode(encoding)
+		# "\r\n" and "\r" line endings, like TextFilePosWrapper
+		for line in text.split("\r") if "\r" in text else (text,):
+			if not line:
+				continue
+			result = parseLine(line)
+			if result is None:
+				continue
+			results.append((result[0], result[1], min(pos, end)))
+	return results
+
+
+def isAsciiCompatible(encoding: str) -> bool:
+	"""
+		returns True if lines of text in this encoding can be split on b"\\n"
+		(False for utf-16 and utf-32)
+	"""
+	return "\n\r".encode(encoding) == b"\n\r"
+
+
+def _rawFile(fileobj: "io.IOBase") -> "Optional[io.IOBase]":
+	"""
+		returns the underlying (compressed) file of gzip, bz2 or lzma file
+		object opened by compressionOpen, or None for uncompressed files
+	"""
+	if not getattr(fileobj, "compression", ""):
+		return None
+	# "fileobj" for gzip, "_fp" for bz2 and lzma
+	for attr in ("fileobj", "_fp"):
+		raw = getattr(fileobj, attr, None)
+		if raw is not None:
+			return raw
+	return None
+
+
 class TextFilePosWrapper(object):
-	def __init__(self, fileobj, encoding):
+	"""
+		iterates over decoded lines of a (possibly compressed) file that
+		is opened in binary mode, with an ASCII-compatible encoding
+
+		the file is read in blocks of about `blockSize` bytes (extended to
+		the next b"\\n"), and each block is decoded and split into lines at
+		once, so there is no per-line work in python other than adding
+		the newline. "\\r\\n" and "\\r" line endings are converted to "\\n",
+		like text mode does
+
+		`pos` (the byte offset of the end of last line, in uncompressed file)
+		is computed only when asked, from the number of lines consumed
+		from current block, and line lengths of raw bytes of the block
+		(which are computed once for each block, if needed)
+
+		tell() returns the offset in the underlying compressed file for
+		compressed files, to be compared with the (compressed) file size
+		given by os.path.getsize, and `pos` otherwise
+
+		iterating over iter(wrapper) (the generator) is cheaper than calling
+		next(wrapper)
+	"""
+
+	blockSize = 256 * 1024
+
+	def __init__(self, fileobj: "io.IOBase", encoding: str) -> None:
 		self.fileobj = fileobj
 		self._encoding = encoding
-		self.pos = 0
+		self._rawFile = _rawFile(fileobj)
+		self._gen = self._iterLines()
+		# raw bytes of current block, and offset of its start in file
+		self._block = b""
+		self._blockStart = 0
+		self._lineCount = 0
+		self._lineIter = iter(())
+		# cumulative byte lengths of lines of current block, see pos
+		self._lineEnds = None
+		# True if a "\r" line ending (without "\n") is seen
+		self.loneCR = False
+
+	def _iterLines(self) -> "Iterator[str]":
+		read = self.fileobj.read
+		readline = self.fileobj.readline
+		encoding = self._encoding
+		blockSize = self.blockSize
+		while True:
+			block = read(blockSize)
+			if not block:
+				return
+			if block[-1:] != b"\n":
+				if b"\n" in block or b"\r" not in block:
+					block += readline()
+				else:
+					block = self._readLineCR(block)
+			text = block.decode(encoding)
+			if "\r" in text:
+				text = text.replace("\r\n", "\n")
+				if "\r" in text:
+					self.loneCR = True
+					text = text.replace("\r", "\n")
+			lines = text.split("\n")
+			last = lines.pop()
+			lines = [line + "\n" for line in lines]
+			if last:
+				lines.append(last)
+			self._blockStart += len(self._block)
+			self._block = block
+			self._lineCount = len(lines)
+			self._lineEnds = None
+			self._lineIter = lineIter = iter(lines)
+			yield from lineIter
+
+	def _readLineCR(self, block: bytes) -> bytes:
+		"""
+			for files with "\\r" line endings (old Mac), reads the rest of
+			the last line of `block`, up to and including b"\\r"
+			(and the b"\\n" after it if any, so "\\r\\n" is not split)
+		"""
+		fileobj = self.fileobj
+		parts = [block]
+		char = block[-1:]
+		while char != b"\r":
+			char = fileobj.read(1)
+			if not char:
+				return b"".join(parts)
+			parts.append(char)
+		if fileobj.peek(1)[:1] == b"\n":
+			parts.append(fileobj.read(1))
+		return b"".join(parts)
 
-	def __iter__(self):
-		return self
+	@property
+	def pos(self) -> int:
+		remaining = self._lineIter.__length_hint__()
+		if remaining == 0:
+			return self._blockStart + len(self._block)
+		consumed = self._lineCount - remaining
+		if consumed == 0:
+			return self._blockStart
+		lineEnds = self._lineEnds
+		if lineEnds is None:
+			# lineEnds[i] is the offset of the end of line i in block
+			lineEnds = self._lineEnds = [
+				m.end() for m in _lineEndPattern.finditer(self._block)
+			]
+		return self._blockStart + lineEnds[consumed - 1]
 
-	def close(self):
+	def __iter__(self) -> "Iterator[str]":
+		return self._gen
+
+	def close(self) -> None:
 		self.fileobj.close()
 
-	def __next__(self):
-		line = self.fileobj.__next__()
+	def __next__(self) -> str:
+		return next(self._gen)
+
+	def tell(self) -> int:
+		if self._rawFile is not None:
+			return self._rawFile.tell()
+		return self.pos
+
+
+class WideTextFilePosWrapper(TextFilePosWrapper):
+	"""
+		for encodings that are not ASCII-compatible (like utf-16), where
+		lines can not be split on bytes, decodes in text mode and encodes
+		each line again to track `pos`
+	"""
+
+	pos = 0
+
+	def __init__(self, fileobj: "io.IOBase", encoding: str) -> None:
+		import io
+		TextFilePosWrapper.__init__(self, fileobj, encoding)
+		self._textFile = io.TextIOWrapper(fileobj, encoding=encoding)
+		self._gen = self
+
+	def close(self) -> None:
+		self._textFile.close()
+
+	def __next__(self) -> str:
+		line = next(self._textFile)
 		self.pos += len(line.encode(self._encoding))
 		return line
 
-	def tell(self):
-		return self.pos
+
+def openTextFilePos(
+	filename: str,
+	encoding: str,
+	dz: bool = False,
+) -> "TextFilePosWrapper":
+	"""
+		opens a (possibly compressed) text file for iterating over lines
+	"""
+	cfile = compressionOpen(filename, dz=dz, mode="rb")
+	if isAsciiCompatible(encoding):
+		return TextFilePosWrapper(cfile, encoding)
+	return WideTextFilePosWrapper(cfile, encoding)
 
 
 class TextGlossaryReader(object):
@@ -48,10 +249,20 @@ class TextGlossaryReader(object):
 
 	compressions = stdCompressions
 
+	# size of each chunk of file that is parsed by a worker process
+	# in parallel mode, see parallelLineParser
+	parallelChunkSize = 4 * 1024 * 1024
+
+	# number of chunks that are submitted to workers (per worker)
+	# but not yet consumed by the main process
+	parallelPendingPerWorker = 2
+
 	def __init__(self, glos: GlossaryType, hasInfo: bool = True):
 		self._glos = glos
 		self._filename = ""
 		self._file = None
+		# iter(self._file), calling next on it is cheaper
+		self._fileIter = None
 		self._hasInfo = hasInfo
 		self._pendingEntries = []
 		self._wordCount = 0
@@ -67,26 +278,21 @@ class TextGlossaryReader(object):
 			self._bufferLine = ""
 			return line
 		try:
-			return next(self._file)
+			return next(self._fileIter)
 		except StopIteration:
 			return ""
 
 	def _open(self, filename: str) -> None:
 		self._fileIndex += 1
 		log.info(f"Reading file: {filename}")
-		cfile = compressionOpen(filename, mode="rt", encoding=self._encoding)
+		self._file = openTextFilePos(filename, self._encoding)
+		self._fileIter = iter(self._file)
 
 		if not self._wordCount:
-			if cfile.seekable():
-				cfile.seek(0, 2)
-				self._fileSize = cfile.tell()
-				cfile.seek(0)
-				log.debug(f"File size of {filename}: {self._fileSize}")
-				self._glos.setInfo("input_file_size", f"{self._fileSize}")
-			else:
-				log.warning("TextGlossaryReader: file is not seekable")
-
-		self._file = TextFilePosWrapper(cfile, self._encoding)
+			# compressed size for compressed files, see TextFilePosWrapper.tell
+			self._fileSize = os.path.getsize(filename)
+			log.debug(f"File size of {filename}: {self._fileSize}")
+			self._glos.setInfo("input_file_size", f"{self._fileSize}")
 		if self._hasInfo:
 			self.loadInfo()
 
@@ -116,6 +322,7 @@ class TextGlossaryReader(object):
 		except Exception:
 			log.exception(f"error while closing file {self._filename!r}")
 		self._file = None
+		self._fileIter = None
 
 	def newEntry(self, word, defi) -> "BaseEntry":
 		byteProgress = None
@@ -159,7 +366,127 @@ class TextGlossaryReader(object):
 				self._fileCount = int(fileCountStr)
 				self._glos.setInfo("file_count", "")
 
+	def parallelLineParser(
+		self,
+	) -> "Optional[Callable[[str], Optional[Tuple[Union[str, List[str]], str]]]]":
+		"""
+			formats that have exactly one entry in each line (and no
+			resources in entries) can return a picklable function (like
+			a module-level function, or functools.partial of it) that parses
+			one line (without newline) and returns (word, defi) or None
+
+			then the file can be parsed in chunks by `workers` processes
+			(from config), see _iterParallel
+		"""
+		return None
+
+	def _canReadParallel(self) -> bool:
+		workers = self._glos.getConfig("workers", 0)
+		if workers < 2:
+			return False
+		if self._fileIndex != 0 or self._fileCount != 1:
+			return False
+		if self._bufferLine or self._file is None:
+			return False
+		if getattr(self._file.fileobj, "compression", ""):
+			log.info("Compressed file, not parsing in parallel")
+			return False
+		if self._file.loneCR:
+			# chunks are aligned on "\n", see _iterChunks
+			log.info("File has \"\\r\" line endings, not parsing in parallel")
+			return False
+		if not isAsciiCompatible(self._encoding):
+			log.info(
+				f"Encoding {self._encoding} is not ASCII-compatible"
+				", not parsing in parallel"
+			)
+			return False
+		if self._fileSize < 2 * self.parallelChunkSize:
+			return False
+		return True
+
+	def _iterChunks(self, start: int) -> "Iterator[Tuple[int, int]]":
+		"""
+			yields (start, end) byte ranges of file, aligned on line boundaries
+		"""
+		fileSize = self._fileSize
+		with open(self._filename, "rb") as _file:
+			while start < fileSize:
+				end = start + self.parallelChunkSize
+				if end >= fileSize:
+					yield start, fileSize
+					return
+				_file.seek(end)
+				_file.readline()
+				end = _file.tell()
+				yield start, end
+				start = end
+
+	def _iterParallel(
+		self,
+		parseLine: "Callable[[str], Optional[Tuple[Union[str, List[str]], str]]]",
+	) -> "Iterator[BaseEntry]":
+		"""
+			info lines (and the first entry) are already read by loadInfo
+			in main process, the rest of file is split into chunks that are
+			parsed in worker processes, and entries are yielded in the
+			original order
+		"""
+		from concurrent.futures import ProcessPoolExecutor
+
+		workers = self._glos.getConfig("workers", 0)
+		filename = self._filename
+		fileSize = self._fileSize
+		# offset of the first line that is not read yet (after info lines)
+		start = self._file.pos
+		log.info(
+			f"Parsing {filename} in chunks of {self.parallelChunkSize}"
+			f" bytes on {workers} worker processes"
+		)
+		count = len(self._pendingEntries)
+		yield from self._pendingEntries
+		self._pendingEntries = []
+		self.close()
+
+		newEntry = self._glos.newEntry
+		maxPending = workers * self.parallelPendingPerWorker
+		pending = deque()
+		executor = ProcessPoolExecutor(max_workers=workers)
+
+		def popPending() -> "Iterator[BaseEntry]":
+			nonlocal count
+			results = pending.popleft().result()
+			count += len(results)
+			for word, defi, pos in results:
+				yield newEntry(word, defi, byteProgress=(pos, fileSize))
+
+		try:
+			for chunkStart, chunkEnd in self._iterChunks(start):
+				pending.append(executor.submit(
+					_parseLines,
+					filename,
+					self._encoding,
+					chunkStart,
+					chunkEnd,
+					parseLine,
+				))
+				if len(pending) < maxPending:
+					continue
+				yield from popPending()
+			while pending:
+				yield from popPending()
+		finally:
+			for future in pending:
+				future.cancel()
+			executor.shutdown(wait=True)
+
+		self._wordCount = count
+
 	def __iter__(self) -> "Iterator[BaseEntry]":
+		parseLine = self.parallelLineParser()
+		if parseLine is not None and self._canReadParallel():
+			yield from self._iterParallel(parseLine)
+			return
 		resPathSet = set()
 		while True:
 			self._pos += 1
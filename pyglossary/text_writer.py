@@ -102,6 +102,7 @@ class TextGlossaryWriter(object):
 			mode="wt",
 			encoding=self._encoding,
 			newline=self._newline,
+			workers=self._glos.getConfig("workers", 0),
 		)
 		_file.write(self._head)
 		if self._writeInfo:
@@ -95,6 +95,43 @@ class UIBase(object):
 			),
 		)),
 
+		("external_sort", BoolOption(
+			hasFlag=True,
+			comment=(
+				"Sort with an external merge sort in temporary files\n"
+				"instead of SQLite, when direct mode is not possible"
+			),
+		)),
+		("external_sort_memory", IntOption(
+			hasFlag=True,
+			comment="Memory buffer for --external-sort in megabytes",
+		)),
+
+		("workers", IntOption(
+			hasFlag=True,
+			comment=(
+				"Number of worker processes for running entry filters\n"
+				"and parsing Tabfile input, and worker threads for\n"
+				"compressing output files\n"
+				"0 or 1 means no workers"
+			),
+		)),
+		("word_set", StrOption(
+			values=["memory", "hash", "disk"],
+			hasFlag=True,
+			comment=(
+				"How to keep seen headwords for skip_duplicate_headword\n"
+				"and renaming duplicate words: memory, hash or disk"
+			),
+		)),
+		("memory_profile", BoolOption(
+			hasFlag=True,
+			comment=(
+				"Sample memory usage while converting and show\n"
+				"peak memory usage of each phase at the end"
+			),
+		)),
+
 		("enable_alts", BoolOption(
 			hasFlag=True,
 			customFlag="alts",
@@ -164,6 +201,7 @@ class UIBase(object):
 
 	conflictingParams = [
 		("sqlite", "direct"),
+		("sqlite", "external_sort"),
 		("remove_html", "remove_html_all"),
 	]
 
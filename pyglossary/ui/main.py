@@ -124,6 +124,7 @@ def registerConfigOption(parser, key: str, option: "Option"):
 			f"--{flag}",
 			dest=key,
 			default=None,
+			type=int if option.typ == "int" else None,
 			help=option.comment,
 		)
 		return
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2008-2022 Saeed Rasooli <saeed.gnu@gmail.com> (ilius)
+# This file is part of PyGlossary project, https://github.com/ilius/pyglossary
+#
+# This program is a free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. Or on Debian systems, from /usr/share/common-licenses/GPL
+# If not, see <http://www.gnu.org/licenses/gpl.txt>.
+
+"""
+sets of words (headwords) that entry filters have already seen
+
+all classes have the same interface:
+	wordSet.add(word) -> bool
+		adds the word, returns True if it was not in the set
+	word in wordSet
+	len(wordSet)
+	wordSet.close()
+"""
+
+import os
+from os.path import join
+from array import array
+import weakref
+
+from .core import cacheDir
+
+import logging
+log = logging.getLogger("pyglossary")
+
+_mask64 = (1 << 64) - 1
+
+
+def _fingerprint(word: str) -> int:
+	# hash of str is randomized for each process (PYTHONHASHSEED),
+	# which is fine since the sets are never saved
+	# 0 is the empty slot in FingerprintWordSet
+	return (hash(word) & _mask64) or 1
+
+
+class MemoryWordSet(object):
+	"""
+		exact set of words, using a python set
+	"""
+
+	def __init__(self) -> None:
+		self._set = set()
+
+	def add(self, word: str) -> bool:
+		if word in self._set:
+			return False
+		self._set.add(word)
+		return True
+
+	def __contains__(self, word: str) -> bool:
+		return word in self._set
+
+	def __len__(self) -> int:
+		return len(self._set)
+
+	def close(self) -> None:
+		self._set = set()
+
+
+class FingerprintWordSet(object):
+	"""
+		set of 64-bit hashes of words, in an open addressing hash table
+		(linear probing) stored in an array, so each word takes 11 to 22
+		bytes no matter how long it is (python set of str takes about
+		100 bytes for each short word)
+
+		two different words may have the same hash, the probability of
+		any collision among n words is about n^2 / 2^65, which is
+		about 2.5e-5 for 30 million words
+	"""
+
+	def __init__(self, capacity: int = 1 << 16) -> None:
+		size = 1
+		while size < capacity:
+			size <<= 1
+		self._table = array("Q", bytes(8 * size))
+		self._mask = size - 1
+		self._len = 0
+
+	def _find(self, fp: int) -> int:
+		"""
+			returns the index of slot that contains `fp`
+			or the index of empty slot that `fp` should be placed in
+		"""
+		table = self._table
+		mask = self._mask
+		index = fp & mask
+		while True:
+			slot = table[index]
+			if slot == 0 or slot == fp:
+				return index
+			index = (index + 1) & mask
+
+	def _grow(self) -> None:
+		oldTable = self._table
+		size = len(oldTable) * 2
+		self._table = array("Q", bytes(8 * size))
+		self._mask = size - 1
+		table = self._table
+		for fp in oldTable:
+			if fp:
+				table[self._find(fp)] = fp
+
+	def add(self, word: str) -> bool:
+		fp = _fingerprint(word)
+		index = self._find(fp)
+		if self._table[index]:
+			return False
+		self._table[index] = fp
+		self._len += 1
+		if self._len * 4 >= len(self._table) * 3:
+			self._grow()
+		return True
+
+	def __contains__(self, word: str) -> bool:
+		fp = _fingerprint(word)
+		return self._table[self._find(fp)] == fp
+
+	def __len__(self) -> int:
+		return self._len
+
+	def close(self) -> None:
+		self._table = array("Q", bytes(8))
+		self._mask = 0
+		self._len = 0
+
+
+class BloomFilter(object):
+	"""
+		fixed size Bloom filter, with `2 ** bitCountLog` bits
+		and `hashCount` bit positions for each word (by double hashing)
+
+		false positive rate for n words is about (1 - e^(-k*n/m))^k
+		with m bits and k hashes. with default values (128 Mbit = 16 MiB,
+		k = 7), that is 1% for 13 million words, and 8% for 30 million
+	"""
+
+	def __init__(self, bitCountLog: int = 27, hashCount: int = 7) -> None:
+		self._bits = bytearray(1 << max(bitCountLog - 3, 0))
+		self._mask = (1 << bitCountLog) - 1
+		self._hashCount = hashCount
+
+	def _positions(self, word: str) -> "List[int]":
+		fp = _fingerprint(word)
+		h1 = fp & 0xffffffff
+		h2 = (fp >> 32) | 1
+		mask = self._mask
+		return [(h1 + i * h2) & mask for i in range(self._hashCount)]
+
+	def add(self, word: str) -> bool:
+		"""
+			returns True if word was definitely not in the filter
+		"""
+		bits = self._bits
+		new = False
+		for pos in self._positions(word):
+			byte = bits[pos >> 3]
+			bit = 1 << (pos & 7)
+			if not byte & bit:
+				bits[pos >> 3] = byte | bit
+				new = True
+		return new
+
+	def __contains__(self, word: str) -> bool:
+		bits = self._bits
+		for pos in self._positions(word):
+			if not bits[pos >> 3] & (1 << (pos & 7)):
+				return False
+		return True
+
+
+def _closeSqlite(con: "sqlite3.Connection", filename: str) -> None:
+	con.close()
+	try:
+		os.remove(filename)
+	except OSError:
+		log.exception(f"error removing {filename}")
+
+
+class DiskWordSet(object):
+	"""
+		exact set of words that keeps memory usage flat, with a fixed size
+		Bloom filter in memory, and all the words in an SQLite database
+		in a temporary file (with a fixed size page cache)
+
+		the database is only queried when Bloom filter gives a (possibly
+		false) positive, which is only for duplicate words and a small
+		percentage of other words
+	"""
+
+	insertBatchSize = 10000
+
+	sqlitePragmas = (
+		"PRAGMA journal_mode=OFF",
+		"PRAGMA synchronous=OFF",
+		"PRAGMA cache_size=-16384",
+	)
+
+	def __init__(self, bitCountLog: int = 27) -> None:
+		from sqlite3 import connect
+		import tempfile
+
+		tmpDir = join(cacheDir, "tmp")
+		os.makedirs(tmpDir, mode=0o700, exist_ok=True)
+		fd, self._filename = tempfile.mkstemp(
+			prefix="words-",
+			suffix=".db",
+			dir=tmpDir,
+		)
+		os.close(fd)
+		self._con = connect(self._filename)
+		for pragma in self.sqlitePragmas:
+			self._con.execute(pragma)
+		self._con.execute(
+			"CREATE TABLE words (word TEXT PRIMARY KEY) WITHOUT ROWID"
+		)
+		self._finalizer = weakref.finalize(
+			self,
+			_closeSqlite,
+			self._con,
+			self._filename,
+		)
+		self._bloom = BloomFilter(bitCountLog=bitCountLog)
+		self._pending = set()
+		self._len = 0
+		self._queryCount = 0
+
+	def _flush(self) -> None:
+		if not self._pending:
+			return
+		self._con.executemany(
+			"INSERT INTO words(word) VALUES (?)",
+			[(word,) for word in self._pending],
+		)
+		self._con.commit()
+		self._pending = set()
+
+	def _insert(self, word: str) -> None:
+		self._pending.add(word)
+		self._len += 1
+		if len(self._pending) >= self.insertBatchSize:
+			self._flush()
+
+	def _exists(self, word: str) -> bool:
+		if word in self._pending:
+			return True
+		self._queryCount += 1
+		return self._con.execute(
+			"SELECT 1 FROM words WHERE word = ?",
+			(word,),
+		).fetchone() is not None
+
+	def add(self, word: str) -> bool:
+		if not self._bloom.add(word) and self._exists(word):
+			return False
+		self._insert(word)
+		return True
+
+	def __contains__(self, word: str) -> bool:
+		return word in self._bloom and self._exists(word)
+
+	def __len__(self) -> int:
+		return self._len
+
+	def close(self) -> None:
+		self._pending = set()
+		self._finalizer()
+
+
+wordSetTypes = {
+	"memory": MemoryWordSet,
+	"hash": FingerprintWordSet,
+	"disk": DiskWordSet,
+}
+
+
+def newWordSet(kind: str) -> "Any":
+	"""
+		kind is "memory", "hash" or "disk"
+	"""
+	cls = wordSetTypes.get(kind)
+	if cls is None:
+		log.error(f"invalid word set type {kind!r}, using 'memory'")
+		cls = MemoryWordSet
+	return cls()
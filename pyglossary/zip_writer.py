@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2008-2022 Saeed Rasooli <saeed.gnu@gmail.com> (ilius)
+# This file is part of PyGlossary project, https://github.com/ilius/pyglossary
+#
+# This program is a free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. Or on Debian systems, from /usr/share/common-licenses/GPL
+# If not, see <http://www.gnu.org/licenses/gpl.txt>.
+
+import sys
+import zlib
+import struct
+import time
+from collections import deque
+from zipfile import ZIP_STORED, ZIP_DEFLATED
+
+import logging
+log = logging.getLogger("pyglossary")
+
+# same structs as in zipfile module
+_structFileHeader = "<4s2B4HL2L2H"
+_structCentralDir = "<4s4B4HL2L5H2L"
+_structEndArchive = "<4s4H2LH"
+
+_extractVersion = 20
+_createSystem = 0 if sys.platform == "win32" else 3
+# regular file with 0o644 permissions
+_externalAttr = 0o100644 << 16
+_utf8Flag = 0x800
+_maxSize = 0xFFFFFFFF
+
+
+def _compressEntry(data: bytes, compressType: int) -> "Tuple[int, bytes]":
+	"""
+		returns (crc32, compressedData)
+		runs in worker threads, zlib releases GIL for both
+	"""
+	crc = zlib.crc32(data)
+	if compressType == ZIP_STORED:
+		return crc, data
+	compressor = zlib.compressobj(
+		zlib.Z_DEFAULT_COMPRESSION,
+		zlib.DEFLATED,
+		-15,
+	)
+	return crc, compressor.compress(data) + compressor.flush()
+
+
+class _Done(object):
+	"""
+		a finished future, for entries that are not sent to workers
+	"""
+
+	def __init__(self, result: "Any") -> None:
+		self._result = result
+
+	def result(self) -> "Any":
+		return self._result
+
+
+class ZipStreamWriter(object):
+	"""
+		writes a zip file sequentially, entries are compressed in
+		`workers` threads (if workers > 1) and written in the same order
+		they are added
+
+		there is no zip64 support, so each entry and the whole file
+		must be less than 4 GiB
+
+		usage:
+			zipWriter = ZipStreamWriter(filename, workers=4)
+			zipWriter.add("mimetype", b"...", ZIP_STORED)
+			zipWriter.add("OEBPS/a.xhtml", b"...")
+			zipWriter.close()
+	"""
+
+	# entries smaller than this are compressed in the calling thread
+	minThreadedSize = 4096
+
+	def __init__(
+		self,
+		filename: str,
+		workers: int = 1,
+	) -> None:
+		self._file = open(filename, "wb")
+		self._workers = workers
+		self._executor = None
+		if workers > 1:
+			from concurrent.futures import ThreadPoolExecutor
+			self._executor = ThreadPoolExecutor(max_workers=workers)
+		# (name, compressType, dosTime, dosDate, fileSize, future) tuples
+		self._pending = deque()
+		# (name, compressType, dosTime, dosDate, crc,
+		# compressSize, fileSize, headerOffset) tuples
+		self._centralDir = []
+
+	def add(
+		self,
+		name: str,
+		data: bytes,
+		compressType: int = ZIP_DEFLATED,
+	) -> None:
+		t = time.localtime()
+		dosDate = (t[0] - 1980) << 9 | t[1] << 5 | t[2]
+		dosTime = t[3] << 11 | t[4] << 5 | (t[5] // 2)
+		if self._executor is None or len(data) < self.minThreadedSize:
+			future = _Done(_compressEntry(data, compressType))
+		else:
+			future = self._executor.submit(_compressEntry, data, compressType)
+		self._pending.append((
+			name,
+			compressType,
+			dosTime,
+			dosDate,
+			len(data),
+			future,
+		))
+		while len(self._pending) > 2 * self._workers:
+			self._writePending()
+
+	def _writePending(self) -> None:
+		name, compressType, dosTime, dosDate, fileSize, future = \
+			self._pending.popleft()
+		crc, compressed = future.result()
+		headerOffset = self._file.tell()
+		if max(headerOffset, len(compressed), fileSize) > _maxSize:
+			raise ValueError(f"zip file is too large, while adding {name!r}")
+		b_name = name.encode("utf-8")
+		flags = 0 if b_name.isascii() else _utf8Flag
+		self._file.write(struct.pack(
+			_structFileHeader,
+			b"PK\003\004",
+			_extractVersion,
+			0,
+			flags,
+			compressType,
+			dosTime,
+			dosDate,
+			crc,
+			len(compressed),
+			fileSize,
+			len(b_name),
+			0,
+		))
+		self._file.write(b_name)
+		self._file.write(compressed)
+		self._centralDir.append((
+			b_name,
+			flags,
+			compressType,
+			dosTime,
+			dosDate,
+			crc,
+			len(compressed),
+			fileSize,
+			headerOffset,
+		))
+
+	def close(self) -> None:
+		if self._file is None:
+			return
+		try:
+			while self._pending:
+				self._writePending()
+			self._writeCentralDir()
+		finally:
+			if self._executor is not None:
+				self._executor.shutdown()
+				self._executor = None
+			self._file.close()
+			self._file = None
+
+	def _writeCentralDir(self) -> None:
+		_file = self._file
+		start = _file.tell()
+		for (
+			b_name,
+			flags,
+			compressType,
+			dosTime,
+			dosDate,
+			crc,
+			compressSize,
+			fileSize,
+			headerOffset,
+		) in self._centralDir:
+			_file.write(struct.pack(
+				_structCentralDir,
+				b"PK\001\002",
+				_extractVersion,
+				_createSystem,
+				_extractVersion,
+				0,
+				flags,
+				compressType,
+				dosTime,
+				dosDate,
+				crc,
+				compressSize,
+				fileSize,
+				len(b_name),
+				0,
+				0,
+				0,
+				0,
+				_externalAttr,
+				headerOffset,
+			))
+			_file.write(b_name)
+		end = _file.tell()
+		count = len(self._centralDir)
+		if count > 0xFFFF or end > _maxSize:
+			raise ValueError("zip file is too large")
+		_file.write(struct.pack(
+			_structEndArchive,
+			b"PK\005\006",
+			0,
+			0,
+			count,
+			count,
+			end - start,
+			start,
+			0,
+		))
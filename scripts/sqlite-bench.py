@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+"""
+Benchmark insert rate of SqEntryList (--sqlite mode) and sdsqlite.Writer
+compared to inserting rows one by one with default sqlite settings
+(which is how both used to work)
+
+usage: sqlite-bench.py [ENTRY_COUNT]
+"""
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import tempfile
+from time import perf_counter as now
+from pickle import dumps
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.sq_entry_list import SqEntryList, PICKLE_PROTOCOL
+from pyglossary.sort_keys import namedSortKeyByName
+from pyglossary.sdsqlite import Writer as SdSqliteWriter
+from pyglossary.os_utils import rmtree
+
+Glossary.init()
+
+
+def newEntries(glos, count):
+	for index in range(count):
+		yield glos.newEntry(
+			[f"word{index * 7919 % count}", f"alt{index}"],
+			f"<b>definition of word {index}</b> " * 3,
+		)
+
+
+def benchOneByOne(glos, filename, count):
+	from sqlite3 import connect
+	sqliteSortKey = namedSortKeyByName["headword_lower"].sqlite("utf-8")
+	columnNames = ",".join([col[0] for col in sqliteSortKey])
+	colDefs = ",".join(
+		[f"{col[0]} {col[1]}" for col in sqliteSortKey] + ["pickle BLOB"]
+	)
+	con = connect(filename)
+	cur = con.cursor()
+	con.execute(f"CREATE TABLE data ({colDefs})")
+	t0 = now()
+	for index, entry in enumerate(newEntries(glos, count)):
+		values = [col[2](entry.l_word) for col in sqliteSortKey]
+		pickleEntry = dumps(entry.getRaw(glos), protocol=PICKLE_PROTOCOL)
+		cur.execute(
+			f"insert into data({columnNames}, pickle)"
+			f" values (?{', ?' * len(sqliteSortKey)})",
+			values + [pickleEntry],
+		)
+		if (index + 1) % 1000 == 0:
+			con.commit()
+	con.execute(f"CREATE INDEX sortkey ON data({columnNames});")
+	con.commit()
+	con.close()
+	return now() - t0
+
+
+def benchSqEntryList(glos, filename, count):
+	entryList = SqEntryList(glos, filename, create=True, persist=True)
+	entryList.setSortKey(
+		namedSortKey=namedSortKeyByName["headword_lower"],
+		sortEncoding="utf-8",
+		sortLocale=None,
+		writeOptions={},
+	)
+	t0 = now()
+	for entry in newEntries(glos, count):
+		entryList.append(entry)
+	entryList.sort()
+	entryList.close()
+	return now() - t0
+
+
+def benchSdSqliteWriter(glos, filename, count):
+	writer = SdSqliteWriter(glos)
+	writer.open(filename)
+	t0 = now()
+	gen = writer.write()
+	next(gen)
+	for entry in newEntries(glos, count):
+		gen.send(entry)
+	try:
+		gen.send(None)
+	except StopIteration:
+		pass
+	writer.finish()
+	return now() - t0
+
+
+def main():
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+	glos = Glossary()
+	glos.setRawEntryCompress(False)
+	tmpDir = tempfile.mkdtemp()
+	try:
+		for name, func in (
+			("one by one", benchOneByOne),
+			("SqEntryList", benchSqEntryList),
+			("sdsqlite.Writer", benchSdSqliteWriter),
+		):
+			filename = join(tmpDir, name.replace(" ", "_") + ".db")
+			seconds = func(glos, filename, count)
+			size = os.stat(filename).st_size
+			print(
+				f"{name:16s} {seconds:7.2f} s"
+				f"  {count / seconds:10.0f} entries/s"
+				f"  {size >> 20} MiB"
+			)
+	finally:
+		rmtree(tmpDir)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import gzip
+import bz2
+from struct import pack
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.os_utils import rmtree
+
+Glossary.init()
+
+
+def _block(blockType, data):
+	length = len(data)
+	if length + 4 < 16:
+		return bytes([((length + 4) << 4) | blockType]) + data
+	# length in next 2 bytes
+	return bytes([(1 << 4) | blockType]) + pack(">H", length) + data
+
+
+def writeBgl(filename, items):
+	"""
+		writes a minimal BGL file with only entry blocks (type 1)
+		items is a list of (word, defi) tuples
+	"""
+	blocks = []
+	for word, defi in items:
+		b_word = word.encode("latin-1")
+		b_defi = defi.encode("latin-1")
+		blocks.append(_block(
+			1,
+			bytes([len(b_word)]) + b_word + pack(">H", len(b_defi)) + b_defi,
+		))
+	with open(filename, "wb") as _file:
+		# signature, then offset of gzip header
+		_file.write(b"\x12\x34\x00\x01" + pack(">H", 6))
+		_file.write(gzip.compress(b"".join(blocks)))
+
+
+class TestBabylonBglReader(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.items = [
+			(f"word{index}", f"definition {index} " * (index % 5 + 1))
+			for index in range(500)
+		]
+		self.bglPath = join(self.tempDir, "test.bgl")
+		writeBgl(self.bglPath, self.items)
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def readEntries(self, filename):
+		glos = Glossary()
+		self.assertTrue(glos.read(filename, direct=True))
+		return [(entry.l_word, entry.defi) for entry in glos]
+
+	def test_read(self):
+		entries = self.readEntries(self.bglPath)
+		self.assertEqual(len(entries), len(self.items))
+		self.assertEqual(entries[3], (["word3"], self.items[3][1].strip()))
+
+	def test_read_compressed(self):
+		expected = self.readEntries(self.bglPath)
+		with open(self.bglPath, "rb") as _file:
+			data = _file.read()
+		os.remove(self.bglPath)
+		for ext, module in (("gz", gzip), ("bz2", bz2)):
+			fpath = f"{self.bglPath}.{ext}"
+			with module.open(fpath, "wb") as _file:
+				_file.write(data)
+			self.assertEqual(self.readEntries(fpath), expected, ext)
+			# read directly, without uncompressing to a file
+			self.assertEqual(os.listdir(self.tempDir), [f"test.bgl.{ext}"])
+			os.remove(fpath)
+
+
+if __name__ == "__main__":
+	unittest.main()
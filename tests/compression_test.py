@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import random
+import io
+import gzip
+import bz2
+import lzma
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.compression import (
+	SeekableGzipFile,
+	seekableGzipOpen,
+	ParallelCompressWriter,
+	compressionOpen,
+)
+from pyglossary.os_utils import rmtree
+
+
+class TestSeekableGzipFile(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		rand = random.Random(0)
+		self.data = b"".join(
+			b"line %d %s\n" % (
+				index,
+				bytes(rand.choice(b"abcdefgh ") for _ in range(rand.randint(0, 60))),
+			)
+			for index in range(20000)
+		)
+		self.fpath = join(self.tempDir, "test.gz")
+		half = len(self.data) // 2
+		with open(self.fpath, "wb") as _file:
+			# two members, with zero padding between them
+			_file.write(gzip.compress(self.data[:half]))
+			_file.write(b"\x00" * 8)
+			_file.write(gzip.compress(self.data[half:]))
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def open(self, checkpoints=None):
+		raw = SeekableGzipFile(self.fpath, checkpoints=checkpoints)
+		raw.checkpointSpan = 16 * 1024
+		raw.chunkSize = 4096
+		return io.BufferedReader(raw)
+
+	def test_read(self):
+		checkpoints = []
+		with self.open(checkpoints) as _file:
+			self.assertEqual(_file.read(), self.data)
+			self.assertEqual(_file.tell(), len(self.data))
+			self.assertEqual(_file.read(10), b"")
+		self.assertGreater(len(checkpoints), 20)
+
+	def test_seek(self):
+		rand = random.Random(1)
+		data = self.data
+		checkpoints = []
+		with self.open(checkpoints) as _file:
+			_file.seek(0, os.SEEK_END)
+			self.assertEqual(_file.tell(), len(data))
+			for _ in range(300):
+				pos = rand.randrange(len(data))
+				size = rand.randrange(3000)
+				self.assertEqual(_file.seek(pos), pos)
+				self.assertEqual(_file.read(size), data[pos:pos + size])
+			_file.seek(100)
+			_file.seek(50, os.SEEK_CUR)
+			self.assertEqual(_file.read(5), data[150:155])
+			_file.seek(-5, os.SEEK_END)
+			self.assertEqual(_file.read(), data[-5:])
+		# second file uses the checkpoints of first one
+		checkpointCount = len(checkpoints)
+		with self.open(checkpoints) as _file:
+			pos = len(data) - 1000
+			_file.seek(pos)
+			self.assertEqual(_file.read(10), data[pos:pos + 10])
+		self.assertEqual(len(checkpoints), checkpointCount)
+
+	def test_buffered(self):
+		with seekableGzipOpen(self.fpath) as _file:
+			self.assertEqual(_file.readline(), self.data.split(b"\n")[0] + b"\n")
+			_file.seek(1000)
+			self.assertEqual(_file.read(100), self.data[1000:1100])
+
+	def test_truncated(self):
+		with open(self.fpath, "rb") as _file:
+			compressed = _file.read()
+		with open(self.fpath, "wb") as _file:
+			_file.write(compressed[:-20])
+		with self.open() as _file:
+			with self.assertRaises(EOFError):
+				_file.read()
+
+
+class TestParallelCompressWriter(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		rand = random.Random(0)
+		self.data = bytes(rand.choice(b"abcd \n") for _ in range(100000))
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def test_compressions(self):
+		for compression, module in (
+			("gz", gzip),
+			("bz2", bz2),
+			("lzma", lzma),
+		):
+			fpath = join(self.tempDir, f"test.{compression}")
+			_file = ParallelCompressWriter(fpath, compression, workers=3)
+			_file._blockSize = 7000
+			for start in range(0, len(self.data), 3000):
+				_file.write(self.data[start:start + 3000])
+			self.assertEqual(_file.tell(), len(self.data))
+			_file.close()
+			with open(fpath, "rb") as compFile:
+				compressed = compFile.read()
+			self.assertEqual(module.decompress(compressed), self.data)
+			# one member (or stream) for each block
+			if compression == "gz":
+				self.assertEqual(compressed.count(b"\x1f\x8b\x08"), 15)
+
+	def test_empty(self):
+		for compression, module in (
+			("gz", gzip),
+			("bz2", bz2),
+			("lzma", lzma),
+		):
+			fpath = join(self.tempDir, f"empty.{compression}")
+			ParallelCompressWriter(fpath, compression, workers=2).close()
+			with open(fpath, "rb") as compFile:
+				self.assertEqual(module.decompress(compFile.read()), b"")
+
+	def test_text_mode(self):
+		fpath = join(self.tempDir, "test.txt.gz")
+		text = "word\tdéfinition\n" * 100000
+		_file = compressionOpen(fpath, mode="wt", encoding="utf-8", workers=2)
+		self.assertIsInstance(_file.buffer, ParallelCompressWriter)
+		self.assertEqual(_file.compression, "gz")
+		_file.write(text[:15])
+		self.assertEqual(_file.tell(), 16)
+		_file.write(text[15:])
+		_file.close()
+		with gzip.open(fpath, "rt", encoding="utf-8") as _file:
+			self.assertEqual(_file.read(), text)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import struct
+import zlib
+import gzip
+import random
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.plugin_lib import dictzip
+from pyglossary.plugin_lib.dictzip import (
+	DictzipReader,
+	DictzipWriter,
+	compressFile,
+	isDictzip,
+	openDictzip,
+)
+from pyglossary.os_utils import rmtree
+
+
+def writeDictzipFile(filename, data, chunkLen):
+	chunks = []
+	for pos in range(0, len(data), chunkLen):
+		comp = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+		chunk = comp.compress(data[pos:pos + chunkLen])
+		if pos + chunkLen >= len(data):
+			chunk += comp.flush(zlib.Z_FINISH)
+		else:
+			chunk += comp.flush(zlib.Z_FULL_FLUSH)
+		chunks.append(chunk)
+	ra = struct.pack("<HHH", 1, chunkLen, len(chunks)) + b"".join(
+		struct.pack("<H", len(chunk)) for chunk in chunks
+	)
+	extra = b"RA" + struct.pack("<H", len(ra)) + ra
+	with open(filename, "wb") as _file:
+		_file.write(b"\x1f\x8b\x08\x04" + b"\x00" * 4 + b"\x02\x03")
+		_file.write(struct.pack("<H", len(extra)) + extra)
+		for chunk in chunks:
+			_file.write(chunk)
+		_file.write(struct.pack(
+			"<II",
+			zlib.crc32(data),
+			len(data) & 0xffffffff,
+		))
+
+
+class TestDictzipReader(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		rand = random.Random(0)
+		self.data = b"".join(
+			f"{index}: {rand.random()}\n".encode("ascii")
+			for index in range(20000)
+		)
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def test_gzip_compatible(self):
+		fpath = join(self.tempDir, "test.dict.dz")
+		writeDictzipFile(fpath, self.data, 1000)
+		with gzip.open(fpath, "rb") as _file:
+			self.assertEqual(self.data, _file.read())
+
+	def test_random_access(self):
+		fpath = join(self.tempDir, "test.dict.dz")
+		writeDictzipFile(fpath, self.data, 1000)
+		self.assertTrue(isDictzip(fpath))
+		rand = random.Random(1)
+		with DictzipReader(fpath, cacheSize=4) as reader:
+			self.assertEqual(reader.size, len(self.data))
+			for _ in range(500):
+				offset = rand.randrange(len(self.data))
+				size = rand.randrange(3000)
+				reader.seek(offset)
+				self.assertEqual(
+					reader.read(size),
+					self.data[offset:offset + size],
+				)
+				self.assertEqual(
+					reader.tell(),
+					min(offset + size, len(self.data)),
+				)
+			self.assertLessEqual(len(reader._cache), 4)
+			reader.seek(-10, os.SEEK_END)
+			self.assertEqual(reader.read(), self.data[-10:])
+			reader.seek(0)
+			self.assertEqual(reader.read(), self.data)
+
+	def test_open_plain_gzip(self):
+		fpath = join(self.tempDir, "test.dict.dz")
+		with gzip.open(fpath, "wb") as _file:
+			_file.write(self.data)
+		self.assertFalse(isDictzip(fpath))
+		with openDictzip(fpath) as _file:
+			self.assertNotIsInstance(_file, DictzipReader)
+			_file.seek(100)
+			self.assertEqual(_file.read(10), self.data[100:110])
+
+
+class TestDictzipWriter(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		rand = random.Random(0)
+		self.data = b"".join(
+			f"{index}: {rand.random()}\n".encode("ascii")
+			for index in range(20000)
+		)
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def writeAndCheck(self, data, fname="test.dict.dz", **kwargs):
+		fpath = join(self.tempDir, fname)
+		rand = random.Random(2)
+		with DictzipWriter(fpath, **kwargs) as writer:
+			pos = 0
+			while pos < len(data):
+				size = rand.randrange(1, 5000)
+				writer.write(data[pos:pos + size])
+				pos += size
+				self.assertEqual(writer.tell(), min(pos, len(data)))
+		with gzip.open(fpath, "rb") as _file:
+			self.assertEqual(data, _file.read())
+		self.assertTrue(isDictzip(fpath))
+		with DictzipReader(fpath) as reader:
+			if "chunkLen" in kwargs:
+				self.assertEqual(reader.chunkLen, kwargs["chunkLen"])
+			self.assertEqual(reader.size, len(data))
+			self.assertEqual(reader.readAt(1234, 5678), data[1234:1234 + 5678])
+			self.assertEqual(reader.read(), data)
+		return fpath
+
+	def test_buffered(self):
+		self.writeAndCheck(self.data, chunkLen=1000, workers=1)
+
+	def test_streamed(self):
+		fpath = self.writeAndCheck(
+			self.data,
+			chunkLen=1000,
+			workers=4,
+			bufferSize=10000,
+		)
+		# header is reserved, so the chunks are written before closing
+		with open(fpath, "rb") as _file:
+			_file.seek(10)
+			xlen, = struct.unpack("<H", _file.read(2))
+		self.assertEqual(xlen, dictzip.maxExtraLen)
+
+	def test_parallel_same_output(self):
+		fpath1 = self.writeAndCheck(self.data, "1.dict.dz", workers=1)
+		fpath4 = self.writeAndCheck(self.data, "4.dict.dz", workers=4)
+		with open(fpath1, "rb") as file1, open(fpath4, "rb") as file4:
+			self.assertEqual(file1.read(), file4.read())
+
+	def test_multiple_of_chunk_len(self):
+		self.writeAndCheck(self.data[:50000], chunkLen=1000)
+		self.writeAndCheck(self.data[:50000], chunkLen=1000, bufferSize=100)
+
+	def test_empty(self):
+		self.writeAndCheck(b"")
+
+	def test_too_large(self):
+		fpath = join(self.tempDir, "test.dict.dz")
+		maxChunkCount = dictzip.maxChunkCount
+		dictzip.maxChunkCount = 20
+		try:
+			with DictzipWriter(
+				fpath,
+				chunkLen=1000,
+				bufferSize=5000,
+			) as writer:
+				writer.write(self.data)
+				self.assertEqual(writer.tell(), len(self.data))
+		finally:
+			dictzip.maxChunkCount = maxChunkCount
+		self.assertFalse(os.path.exists(fpath))
+		with open(fpath[:-3], "rb") as _file:
+			self.assertEqual(_file.read(), self.data)
+
+	def test_compress_file(self):
+		fpath = join(self.tempDir, "test.dict")
+		with open(fpath, "wb") as _file:
+			_file.write(self.data)
+		compressFile(fpath, chunkLen=3000)
+		with DictzipReader(fpath + ".dz") as reader:
+			self.assertEqual(reader.chunkLen, 3000)
+			self.assertEqual(reader.read(), self.data)
+
+
+if __name__ == "__main__":
+	unittest.main()
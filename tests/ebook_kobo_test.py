@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from os.path import dirname, abspath
+from os.path import join, dirname, abspath
+import os
 import sys
 import unittest
+import tempfile
+import gzip
 
 
 rootDir = dirname(dirname(abspath(__file__)))
@@ -13,6 +16,11 @@ sys.path.insert(0, rootDir)
 from pyglossary.plugins.ebook_kobo import (
 	Writer,
 )
+from pyglossary.glossary import Glossary
+from pyglossary.entry import Entry
+from pyglossary.os_utils import rmtree
+
+Glossary.init()
 
 
 class GetPrefixTest(unittest.TestCase):
@@ -129,5 +137,52 @@ class GetPrefixTest(unittest.TestCase):
 		self.case("\x00xy", "11")
 
 
+class ExternalSortTest(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def writeGroups(self, sortBufferSize):
+		outDir = join(self.tempDir, f"out{sortBufferSize}")
+		writer = Writer(Glossary())
+		writer.sortBufferSize = sortBufferSize
+		writer.open(outDir)
+		gen = writer.write()
+		next(gen)
+		for index in range(2000):
+			gen.send(Entry(
+				[f"w{index * 7 % 2000}", f"alt{index % 300}", "Ab"],
+				f"defi {index}",
+			))
+		try:
+			gen.send(None)
+		except StopIteration:
+			pass
+		runCount = len(writer._wordRunPaths)
+		groups = {}
+		for fname in os.listdir(outDir):
+			with gzip.open(join(outDir, fname), "rb") as _file:
+				groups[fname] = _file.read()
+		words = list(writer._iterWords())
+		writer._cleanup()
+		return groups, words, runCount
+
+	def test_runs(self):
+		groups, words, runCount = self.writeGroups(64 * 1024 * 1024)
+		self.assertEqual(runCount, 0)
+		self.assertEqual(
+			sorted(groups),
+			["11.html", "ab.html", "al.html"],
+		)
+		self.assertEqual(words, sorted(set(words)))
+		self.assertEqual(len(words), 2000 + 300 + 1)
+		groups2, words2, runCount = self.writeGroups(10000)
+		self.assertGreater(runCount, 5)
+		self.assertEqual(groups2, groups)
+		self.assertEqual(words2, words)
+
+
 if __name__ == "__main__":
 	unittest.main()
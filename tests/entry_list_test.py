@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+
+import sys
+from os.path import dirname, abspath
+import unittest
+import random
+import zlib
+import pickle
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.glossary_utils import EntryList
+from pyglossary.entry import Entry, DataEntry
+from pyglossary.sort_keys import namedSortKeyByName
+
+Glossary.init()
+
+
+class TestEntryList(unittest.TestCase):
+	def setUp(self):
+		rand = random.Random(0)
+		vocab = [
+			"".join(rand.choice("abcdefghij") for _ in range(rand.randint(2, 8)))
+			for _ in range(500)
+		]
+		self.items = []
+		for index in range(3000):
+			defi = " ".join(rand.choice(vocab) for _ in range(rand.randint(5, 40)))
+			self.items.append((
+				[f"word{rand.randrange(10000)}", f"alt{index}"],
+				f"<b>{defi}</b>",
+			))
+
+	def newEntryList(self, rawEntryCompress):
+		glos = Glossary()
+		glos.setRawEntryCompress(rawEntryCompress)
+		entryList = EntryList(glos)
+		entryList.zdictSampleSize = 10000
+		entryList.append(DataEntry("a.png", b"png data"))
+		for words, defi in self.items:
+			entryList.append(Entry(words, defi, defiFormat="h"))
+		return entryList
+
+	def readEntries(self, entryList):
+		return [
+			(entry.l_word, entry.defi, entry.defiFormat)
+			for entry in entryList
+			if not entry.isData()
+		]
+
+	def test_compress(self):
+		expected = [(words, defi, "h") for words, defi in self.items]
+		entryList = self.newEntryList(False)
+		self.assertIsNone(entryList._zdict)
+		self.assertEqual(self.readEntries(entryList), expected)
+
+		entryList = self.newEntryList(True)
+		self.assertEqual(len(entryList), len(self.items) + 1)
+		self.assertIsNotNone(entryList._zdict)
+		self.assertLessEqual(len(entryList._zdict), entryList.zdictSize)
+		self.assertEqual(self.readEntries(entryList), expected)
+		# smaller than compressing each entry separately
+		compressedSize = len(entryList._defiData)
+		oldSize = sum(
+			len(zlib.compress(pickle.dumps((words, defi.encode("utf-8"), "h")), 9))
+			for words, defi in self.items
+		)
+		self.assertLess(compressedSize, oldSize * 0.8)
+		dataEntries = [entry for entry in entryList if entry.isData()]
+		self.assertEqual(len(dataEntries), 1)
+		self.assertEqual(dataEntries[0].s_word, "a.png")
+
+	def test_sort(self):
+		entryList = self.newEntryList(True)
+		entryList.setSortKey(
+			namedSortKey=namedSortKeyByName["headword_lower"],
+			sortEncoding="utf-8",
+			sortLocale=None,
+			writeOptions={},
+		)
+		entryList.sort()
+		self.assertEqual(
+			self.readEntries(entryList),
+			sorted(
+				[(words, defi, "h") for words, defi in self.items],
+				key=lambda item: item[0][0].lower(),
+			),
+		)
+
+	def test_insert(self):
+		glos = Glossary()
+		entryList = EntryList(glos)
+		for word in ("b", "d", "c"):
+			entryList.append(Entry(word, f"defi {word}"))
+		entryList.insert(0, Entry(["a", "a2"], "defi a"))
+		entryList.insert(3, Entry("e", "defi e", defiFormat="x"))
+		self.assertEqual(
+			[(entry.l_word, entry.defi) for entry in entryList],
+			[
+				(["a", "a2"], "defi a"),
+				(["b"], "defi b"),
+				(["d"], "defi d"),
+				(["e"], "defi e"),
+				(["c"], "defi c"),
+			],
+		)
+		entryList.setSortKey(
+			namedSortKey=namedSortKeyByName["headword"],
+			sortEncoding="utf-8",
+			sortLocale=None,
+			writeOptions={},
+		)
+		entryList.sort()
+		entryList.append(Entry("0", "defi 0"))
+		self.assertEqual(
+			[(entry.l_word[0], entry.defiFormat) for entry in entryList],
+			[("a", "m"), ("b", "m"), ("c", "m"), ("d", "m"), ("e", "x"), ("0", "m")],
+		)
+
+	def test_small(self):
+		# less than zdictSampleSize, nothing is compressed
+		glos = Glossary()
+		entryList = EntryList(glos)
+		entryList.append(Entry("a", "b"))
+		self.assertIsNone(entryList._zdict)
+		self.assertEqual(
+			[(entry.s_word, entry.defi) for entry in entryList],
+			[("a", "b")],
+		)
+		entryList.clear()
+		self.assertEqual(len(entryList), 0)
+
+
+if __name__ == "__main__":
+	unittest.main()
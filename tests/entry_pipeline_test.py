@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+
+import sys
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.entry import Entry
+from pyglossary.entry_filters import (
+	LowerWord,
+	RTLDefi,
+	SkipEntriesWithDuplicateHeadword,
+	TrimWhitespaces,
+	NonEmptyWordFilter,
+	RemoveHtmlTagsAll,
+	ShowProgressBar,
+)
+from pyglossary.entry_pipeline import EntryPipeline
+from pyglossary.os_utils import rmtree
+
+Glossary.init()
+
+
+class TestEntryPipeline(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def newEntries(self, count):
+		for index in range(count):
+			yield Entry(
+				[f" Word{index % 700} ", f"Alt{index}"],
+				f"defi {index}  ",
+				byteProgress=(index, count),
+			)
+
+	def runFilters(self, entryFilters, workers):
+		pipeline = EntryPipeline(entryFilters, workers)
+		pipeline.batchSize = 50
+		return [
+			(list(entry.l_word), entry.defi, entry.byteProgress())
+			for entry in pipeline.run(self.newEntries(2000))
+		]
+
+	def test_order_and_serial_stage(self):
+		glos = Glossary()
+		entryFilters = [
+			TrimWhitespaces(glos),
+			NonEmptyWordFilter(glos),
+			LowerWord(glos),
+			RTLDefi(glos),
+			SkipEntriesWithDuplicateHeadword(glos),
+		]
+		pipeline = EntryPipeline(entryFilters, 2)
+		self.assertEqual(len(pipeline._parallelFilters), 4)
+		self.assertEqual(len(pipeline._serialFilters), 1)
+
+		expected = []
+		for entry in self.newEntries(2000):
+			for entryFilter in entryFilters:
+				entry = entryFilter.run(entry)
+				if entry is None:
+					break
+			else:
+				expected.append((
+					list(entry.l_word),
+					entry.defi,
+					entry.byteProgress(),
+				))
+
+		actual = self.runFilters([
+			TrimWhitespaces(glos),
+			NonEmptyWordFilter(glos),
+			LowerWord(glos),
+			RTLDefi(glos),
+			SkipEntriesWithDuplicateHeadword(glos),
+		], 2)
+		self.assertEqual(len(expected), 700)
+		self.assertEqual(expected, actual)
+
+	def test_extra_filter_before_progressbar(self):
+		glos = Glossary(ui=object())
+		glos._progressbar = True
+		glos.updateEntryFilters()
+		glos.removeHtmlTagsAll()
+		self.assertIn(
+			ShowProgressBar,
+			[type(f) for f in glos._entryFilters],
+		)
+		pipeline = EntryPipeline(glos._entryFilters, 2)
+		self.assertIn(
+			RemoveHtmlTagsAll,
+			[type(f) for f in pipeline._parallelFilters],
+		)
+
+	def test_convert_workers(self):
+		inputPath = join(self.tempDir, "input.txt")
+		with open(inputPath, "w", encoding="utf-8") as _file:
+			for index in range(3000):
+				_file.write(f"Word{index}|Alt{index}\t<b>defi {index}</b>  \n")
+
+		outputs = []
+		for workers in (0, 3):
+			for direct in (True, False):
+				outputPath = join(self.tempDir, f"output-{workers}-{direct}.txt")
+				glos = Glossary()
+				glos.config = {
+					"workers": workers,
+					"lower": True,
+					"rtl": True,
+				}
+				res = glos.convert(
+					inputFilename=inputPath,
+					outputFilename=outputPath,
+					direct=direct,
+					sqlite=False,
+				)
+				self.assertEqual(outputPath, res)
+				with open(outputPath, encoding="utf-8") as _file:
+					outputs.append(_file.read())
+
+		for output in outputs[1:]:
+			self.assertEqual(outputs[0], output)
+
+
+if __name__ == "__main__":
+	unittest.main()
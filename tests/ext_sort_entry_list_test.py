@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+import sys
+import os
+from os.path import join, dirname, abspath, isdir
+import unittest
+import tempfile
+import random
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.entry import Entry
+from pyglossary.ext_sort_entry_list import ExtSortEntryList
+from pyglossary.sort_keys import namedSortKeyByName
+from pyglossary.os_utils import rmtree
+from pyglossary.core_test import getMockLogger
+
+Glossary.init()
+
+
+class TestExtSortEntryList(unittest.TestCase):
+	def setUp(self):
+		self.mockLog = getMockLogger()
+		self.tempDir = tempfile.mkdtemp()
+		rand = random.Random(0)
+		self.words = [
+			"".join(rand.choice("abcABC") for _ in range(3))
+			for _ in range(1000)
+		]
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+		self.mockLog.clear()
+
+	def newEntryList(self, bufferSize):
+		glos = Glossary()
+		glos.setRawEntryCompress(False)
+		entryList = ExtSortEntryList(
+			glos,
+			join(self.tempDir, "sort"),
+			bufferSize=bufferSize,
+		)
+		entryList.setSortKey(
+			namedSortKey=namedSortKeyByName["headword_lower"],
+			sortEncoding="utf-8",
+			sortLocale=None,
+			writeOptions={},
+		)
+		for index, word in enumerate(self.words):
+			entryList.append(Entry(word, f"defi {index}"))
+		entryList.sort()
+		return entryList
+
+	def test_sort(self):
+		expected = sorted(
+			[(word, f"defi {index}") for index, word in enumerate(self.words)],
+			key=lambda item: item[0].lower(),
+		)
+		for bufferSize in (10000, 256 * 1024 * 1024):
+			entryList = self.newEntryList(bufferSize)
+			self.assertEqual(len(entryList), len(self.words))
+			if bufferSize == 10000:
+				self.assertGreater(len(os.listdir(join(self.tempDir, "sort"))), 5)
+			self.assertEqual(
+				[(entry.s_word, entry.defi) for entry in entryList],
+				expected,
+			)
+			entryList.close()
+			self.assertFalse(isdir(join(self.tempDir, "sort")))
+
+	def test_convert(self):
+		inputPath = join(self.tempDir, "input.txt")
+		with open(inputPath, "w", encoding="utf-8") as _file:
+			for index, word in enumerate(self.words):
+				_file.write(f"{word}\tdefi {index}\n")
+
+		outputs = []
+		for externalSort in (False, True):
+			outputPath = join(self.tempDir, f"output-{externalSort}.txt")
+			glos = Glossary()
+			glos.config = {
+				"external_sort": externalSort,
+				"external_sort_memory": 1,
+			}
+			res = glos.convert(
+				inputFilename=inputPath,
+				outputFilename=outputPath,
+				sort=True,
+				sqlite=None if externalSort else False,
+			)
+			self.assertEqual(outputPath, res)
+			# sort directory must be removed once, without errors
+			self.assertEqual(0, self.mockLog.printRemainingErrors())
+			with open(outputPath, encoding="utf-8") as _file:
+				outputs.append(_file.read())
+
+		self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+	unittest.main()
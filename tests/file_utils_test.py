@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+
+import sys
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import random
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.file_utils import fileCountLines, fileEstimateLines
+from pyglossary.os_utils import rmtree
+
+
+class TestFileCountLines(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def writeFile(self, data):
+		filename = join(self.tempDir, "test.txt")
+		with open(filename, "wb") as _file:
+			_file.write(data)
+		return filename
+
+	def test_count(self):
+		rand = random.Random(0)
+		pieces = [b"\n", b"\n\n", b"\n\n\n", b"msgid", b"\nmsgid ", b"abc", b"m"]
+		data = b"".join(rand.choice(pieces) for _ in range(20000))
+		filename = self.writeFile(data)
+		for newline in ("\n", "\n\n", "\nmsgid"):
+			expected = data.count(newline.encode("utf-8"))
+			for chunkSize in (1, 2, 3, 10, 1000, 1 << 20):
+				self.assertEqual(
+					fileCountLines(filename, newline=newline, chunkSize=chunkSize),
+					expected,
+					f"newline={newline!r}, chunkSize={chunkSize}",
+				)
+
+	def test_count_no_cut(self):
+		# no byte that is not in separator, counted in one chunk
+		data = b"\n" * 1001
+		filename = self.writeFile(data)
+		self.assertEqual(fileCountLines(filename, "\n\n", chunkSize=10), 500)
+
+	def test_count_empty(self):
+		filename = self.writeFile(b"")
+		self.assertEqual(fileCountLines(filename, "\n\n"), 0)
+		self.assertEqual(fileEstimateLines(filename, "\n\n"), 0)
+
+	def test_estimate(self):
+		rand = random.Random(0)
+		data = b"".join(
+			b"word\t" + b"x" * rand.randint(10, 200) + b"\n"
+			for _ in range(50000)
+		)
+		filename = self.writeFile(data)
+		# small file, exact
+		self.assertEqual(fileEstimateLines(filename), 50000)
+		estimate = fileEstimateLines(filename, sampleSize=4096, sampleCount=8)
+		self.assertLess(abs(estimate - 50000), 5000)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import re
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.os_utils import rmtree
+from pyglossary.core_test import getMockLogger
+
+Glossary.init()
+
+
+class TestHtmlDirWriter(unittest.TestCase):
+	def setUp(self):
+		self.mockLog = getMockLogger()
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+		self.mockLog.clear()
+
+	def test_links(self):
+		inputPath = join(self.tempDir, "input.txt")
+		with open(inputPath, "w", encoding="utf-8") as _file:
+			for index in range(300):
+				target = (index * 37) % 310
+				_file.write(
+					f"word{index}\tdefi {index} "
+					f'<a href="bword://word{target}">word{target}</a>'
+					f" {'x' * 200}\n"
+				)
+		outputPath = join(self.tempDir, "output.hdir")
+		glos = Glossary()
+		res = glos.convert(
+			inputFilename=inputPath,
+			outputFilename=outputPath,
+			writeOptions={"max_file_size": 10000},
+		)
+		self.assertEqual(res, outputPath)
+		fnames = sorted(os.listdir(outputPath))
+		self.assertNotIn("links.db", fnames)
+		pages = [fname for fname in fnames if re.match(r"\d+\.html$", fname)]
+		self.assertGreater(len(pages), 5)
+
+		entryFile = {}
+		links = {}
+		for fname in pages:
+			with open(join(outputPath, fname), encoding="utf-8") as _file:
+				text = _file.read()
+			for m in re.finditer(r'<div id="entry(\d+)">', text):
+				entryFile[int(m.group(1))] = fname
+			for m in re.finditer(
+				r'defi (\d+) <a( class="broken")? href="([^"]*)" *>word(\d+)</a>',
+				text,
+			):
+				links[int(m.group(1))] = (m.group(2), m.group(3), int(m.group(4)))
+
+		self.assertEqual(len(links), 300)
+		for index, (broken, href, target) in links.items():
+			self.assertEqual(target, (index * 37) % 310)
+			if target >= 300:
+				self.assertEqual(broken, ' class="broken"')
+				self.assertEqual(href, f"#word{target}")
+				continue
+			self.assertIsNone(broken)
+			self.assertEqual(href, f"./{entryFile[target]}#entry{target}")
+
+	def test_links_far_ahead(self):
+		# links from the first entries to entries far ahead
+		# must fit in their placeholders, so no page is rewritten
+		# and positions in index.txt stay valid
+		# short words, so broken link form does not make room either
+		count = 12000
+		inputPath = join(self.tempDir, "input.txt")
+		with open(inputPath, "w", encoding="utf-8") as _file:
+			for index in range(count):
+				target = count - 1 - index
+				_file.write(
+					f"w{index}\td{index} "
+					f'<a href="bword://w{target}">w{target}</a>\n'
+				)
+		outputPath = join(self.tempDir, "output.hdir")
+		glos = Glossary()
+		res = glos.convert(
+			inputFilename=inputPath,
+			outputFilename=outputPath,
+			writeOptions={"max_file_size": 100000},
+		)
+		self.assertEqual(res, outputPath)
+		self.assertEqual(0, self.mockLog.printRemainingErrors())
+
+		pageData = {}
+		with open(join(outputPath, "index.txt"), encoding="utf-8") as _file:
+			indexLines = [line.rstrip("\n").split("\t") for line in _file]
+		self.assertEqual(len(indexLines), count)
+		for entryIndex, word, fname, pos in indexLines:
+			if fname not in pageData:
+				with open(join(outputPath, fname), "rb") as _file:
+					pageData[fname] = _file.read()
+			b_div = f'<div id="entry{entryIndex}">'.encode("utf-8")
+			self.assertTrue(pageData[fname].startswith(b_div, int(pos)))
+
+		text = pageData[indexLines[0][2]].decode("utf-8")
+		target = count - 1
+		self.assertIn(
+			f'href="./{indexLines[target][2]}#entry{target}"',
+			text,
+		)
+
+
+if __name__ == "__main__":
+	unittest.main()
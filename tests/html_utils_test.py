@@ -70,6 +70,48 @@ def benchmark_main():
 	print("benchmark 1:", timeit.timeit("run_benchmark1()", globals=locals()))
 
 
+# (html, expected text), expected values are what
+# BeautifulSoup(html, "lxml").text returns
+htmlTextCases = [
+	("plain text", "plain text"),
+	("<b>bold</b> text", "bold text"),
+	('<font color="red">a</font><i>b</i>', "ab"),
+	("a &amp; b &lt;c&gt;", "a & b <c>"),
+	("x&nbsp;y &#233; &#x41;", "x\xa0y \xe9 A"),
+	("a < b", "a < b"),
+	("x<!-- comment -->y", "xy"),
+	("<script>var a = '<b>';</script>t<style>b {}</style>", "t"),
+	("a<br/>b<img src='x.png'/>c", "abc"),
+	("<b>unclosed <i>tags", "unclosed tags"),
+	("<!DOCTYPE html><html><body><p>x</p></body></html>", "x"),
+	("line1\nline2<hr>line3", "line1\nline2line3"),
+]
+
+
+class HtmlTextExtractorTest(unittest.TestCase):
+	def test(self):
+		extractor = HtmlTextExtractor()
+		for html, expected in htmlTextCases:
+			self.assertEqual(extractor.getText(html), expected, html)
+		# the same instance is reused
+		for html, expected in htmlTextCases:
+			self.assertEqual(extractor.getText(html), expected, html)
+
+	def test_bs4(self):
+		try:
+			from bs4 import BeautifulSoup
+			import lxml  # noqa: F401
+		except ImportError:
+			self.skipTest("bs4 or lxml is not installed")
+		extractor = HtmlTextExtractor()
+		for html, _ in htmlTextCases:
+			self.assertEqual(
+				extractor.getText(html),
+				BeautifulSoup(html, "lxml").text,
+				html,
+			)
+
+
 if __name__ == "__main__":
 	if "-b" in sys.argv:
 		benchmark_main()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+import sys
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.memory_profile import MemoryProfiler, getRssKiB
+from pyglossary.os_utils import rmtree
+
+Glossary.init()
+
+
+@unittest.skipIf(getRssKiB() is None, "can not get memory usage")
+class TestMemoryProfiler(unittest.TestCase):
+	def test_phases(self):
+		profiler = MemoryProfiler(interval=0.001)
+		profiler.start()
+		profiler.setPhase("read")
+		profiler.setPhase("sort")
+		data = bytearray(64 * 1024 * 1024)
+		for index in range(0, len(data), 4096):
+			data[index] = 1
+		profiler.sample()
+		del data
+		profiler.setPhase("write")
+		profiler.stop()
+
+		phases = dict(profiler.phasePeaks())
+		# "" phase is only there if a sample is taken before setPhase("read")
+		self.assertEqual([p for p in phases if p], ["read", "sort", "write"])
+		self.assertEqual(profiler.peakPhase, "sort")
+		self.assertEqual(profiler.peak, phases["sort"])
+		self.assertGreater(phases["sort"] - phases["read"], 32 * 1024)
+		summary = profiler.summary()
+		self.assertIn("sort", summary)
+		self.assertIn("Peak: ", summary)
+
+	def test_convert(self):
+		tempDir = tempfile.mkdtemp()
+		try:
+			inputPath = join(tempDir, "input.txt")
+			with open(inputPath, "w", encoding="utf-8") as _file:
+				for index in range(100):
+					_file.write(f"word{index}\tdefi {index}\n")
+			glos = Glossary()
+			glos.config = {"memory_profile": True}
+			outputPath = join(tempDir, "output.txt")
+			res = glos.convert(
+				inputFilename=inputPath,
+				outputFilename=outputPath,
+				sort=True,
+				sqlite=False,
+			)
+			self.assertEqual(res, outputPath)
+			self.assertIsNone(glos._memoryProfiler)
+		finally:
+			rmtree(tempDir)
+
+
+if __name__ == "__main__":
+	unittest.main()
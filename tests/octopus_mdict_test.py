@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import zlib
+import gzip
+from struct import pack
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.os_utils import rmtree
+from pyglossary.plugin_lib.readmdict import MDX, MDD
+
+Glossary.init()
+
+
+def _encodeBlock(data):
+	return b"\x02\x00\x00\x00" + \
+		pack(">I", zlib.adler32(data) & 0xffffffff) + \
+		zlib.compress(data)
+
+
+def writeMdict(filename, items, blockSize=10, keyEncoding="utf-8"):
+	"""
+		writes a minimal MDict (engine version 2.0) file
+		items is a list of (key, record) tuples, record is bytes
+		keyEncoding is "utf-8" for MDX and "utf-16-le" for MDD
+	"""
+	header = (
+		'<Dictionary GeneratedByEngineVersion="2.0"'
+		' RequiredEngineVersion="2.0" Encrypted="No" Encoding="UTF-8"'
+		' Format="Html" Title="Test MDX" Description="Test Description"/>'
+		'\r\n\x00'
+	).encode("utf-16-le")
+	keyTerm = "\x00".encode(keyEncoding)
+
+	records = []
+	offsets = []
+	offset = 0
+	for _, record in items:
+		records.append(record)
+		offsets.append(offset)
+		offset += len(record)
+
+	keyBlockInfo = b""
+	keyBlocks = []
+	for start in range(0, len(items), blockSize):
+		end = min(start + blockSize, len(items))
+		keyBlock = b"".join(
+			pack(">Q", offsets[index]) +
+			items[index][0].encode(keyEncoding) + keyTerm
+			for index in range(start, end)
+		)
+		comp = _encodeBlock(keyBlock)
+		keyBlocks.append(comp)
+		head = items[start][0]
+		tail = items[end - 1][0]
+		keyBlockInfo += pack(">Q", end - start)
+		keyBlockInfo += pack(">H", len(head)) + head.encode(keyEncoding) + keyTerm
+		keyBlockInfo += pack(">H", len(tail)) + tail.encode(keyEncoding) + keyTerm
+		keyBlockInfo += pack(">QQ", len(comp), len(keyBlock))
+	keyBlockInfoComp = _encodeBlock(keyBlockInfo)
+	keyBlocksData = b"".join(keyBlocks)
+
+	recordBlocks = []
+	for start in range(0, len(records), blockSize):
+		data = b"".join(records[start:start + blockSize])
+		recordBlocks.append((_encodeBlock(data), len(data)))
+
+	with open(filename, "wb") as _file:
+		_file.write(pack(">I", len(header)))
+		_file.write(header)
+		_file.write(pack("<I", zlib.adler32(header) & 0xffffffff))
+
+		numbers = pack(
+			">QQQQQ",
+			len(keyBlocks),
+			len(items),
+			len(keyBlockInfo),
+			len(keyBlockInfoComp),
+			len(keyBlocksData),
+		)
+		_file.write(numbers)
+		_file.write(pack(">I", zlib.adler32(numbers) & 0xffffffff))
+		_file.write(keyBlockInfoComp)
+		_file.write(keyBlocksData)
+
+		_file.write(pack(
+			">QQQQ",
+			len(recordBlocks),
+			len(items),
+			16 * len(recordBlocks),
+			sum(len(comp) for comp, _ in recordBlocks),
+		))
+		for comp, size in recordBlocks:
+			_file.write(pack(">QQ", len(comp), size))
+		for comp, _ in recordBlocks:
+			_file.write(comp)
+
+
+def writeMdx(filename, items, blockSize=10):
+	"""
+		items is a list of (word, defi) tuples
+	"""
+	writeMdict(
+		filename,
+		[(word, defi.encode("utf-8") + b"\x00") for word, defi in items],
+		blockSize=blockSize,
+	)
+
+
+class TestOctopusMdictReader(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.items = []
+		for index in range(100):
+			self.items.append((f"word{index:03d}", f"<b>defi {index}</b>"))
+			if index % 3 == 0:
+				# a link before and a link after the main word
+				self.items.append((f"alt{index:03d}", f"@@@LINK=word{index:03d}"))
+				self.items.append((f"zalt{index:03d}", f"@@@LINK=word{index:03d}"))
+		self.mdxPath = join(self.tempDir, "test.mdx")
+		writeMdx(self.mdxPath, self.items)
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def readEntries(self, **options):
+		glos = Glossary()
+		glos.read(self.mdxPath, format="OctopusMdict", direct=True, **options)
+		self.assertEqual(len(glos), 100)
+		self.assertEqual(glos.getInfo("name"), "Test MDX")
+		return [(entry.l_word, entry.defi) for entry in glos]
+
+	def test_read(self):
+		entries = self.readEntries()
+		self.assertEqual(len(entries), 100)
+		self.assertEqual(entries[0], (
+			["word000", "alt000", "zalt000"],
+			"<b>defi 0</b>",
+		))
+		self.assertEqual(entries[1], (["word001"], "<b>defi 1</b>"))
+
+	def test_single_pass(self):
+		self.assertEqual(
+			self.readEntries(single_pass=True),
+			self.readEntries(),
+		)
+
+	def test_workers(self):
+		from pyglossary.plugins.octopus_mdict_new import Reader
+
+		def recordBlockWorkers(config, **options):
+			glos = Glossary()
+			glos.config = config
+			reader = Reader(glos)
+			for name, value in options.items():
+				setattr(reader, "_" + name, value)
+			reader.open(self.mdxPath)
+			workers = reader._mdx.record_block_workers
+			reader.close()
+			return workers
+
+		self.assertEqual(recordBlockWorkers({}), 0)
+		self.assertEqual(recordBlockWorkers({"workers": 3}), 3)
+		self.assertEqual(recordBlockWorkers({"workers": 3}, workers=1), 1)
+		self.assertEqual(recordBlockWorkers({}, workers=2), 2)
+		self.assertEqual(self.readEntries(workers=3), self.readEntries())
+
+	def test_read_gzip(self):
+		expected = self.readEntries()
+		with open(self.mdxPath, "rb") as _file:
+			data = _file.read()
+		os.remove(self.mdxPath)
+		self.mdxPath += ".gz"
+		with gzip.open(self.mdxPath, "wb") as _file:
+			_file.write(data)
+		glos = Glossary()
+		glos.read(self.mdxPath, direct=True)
+		self.assertEqual(
+			[(entry.l_word, entry.defi) for entry in glos],
+			expected,
+		)
+		# read directly, without uncompressing to a file
+		self.assertEqual(os.listdir(self.tempDir), ["test.mdx.gz"])
+
+
+class TestReadMdictLookup(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def test_mdx_lookup(self):
+		items = [
+			(f"word{index:03d}", f"defi {index}")
+			for index in range(100)
+		]
+		items.insert(50, ("word010", "second defi 10"))
+		fpath = join(self.tempDir, "test.mdx")
+		writeMdx(fpath, items, blockSize=7)
+		mdx = MDX(fpath)
+		mdx.block_cache_size = 3
+		self.assertEqual(mdx.lookup("word000"), [b"defi 0"])
+		self.assertEqual(mdx.lookup("word099"), [b"defi 99"])
+		self.assertEqual(mdx.lookup(b"word055"), [b"defi 55"])
+		self.assertEqual(
+			mdx.lookup("word010"),
+			[b"defi 10", b"second defi 10"],
+		)
+		self.assertEqual(mdx.lookup("missing"), [])
+		self.assertLessEqual(len(mdx._block_cache), 3)
+		for word, defi in items:
+			self.assertIn(defi.encode("utf-8"), mdx.lookup(word))
+
+	def test_parallel_items(self):
+		items = [
+			(f"word{index:04d}", f"defi {index} " * (index % 20))
+			for index in range(2000)
+		]
+		fpath = join(self.tempDir, "test.mdx")
+		writeMdx(fpath, items, blockSize=13)
+		expected = list(MDX(fpath).items())
+		self.assertEqual(len(expected), len(items))
+		mdx = MDX(fpath)
+		mdx.record_block_workers = 4
+		mdx.record_block_prefetch_size = 2000
+		self.assertEqual(list(mdx.items()), expected)
+
+	def test_mdd_lookup(self):
+		items = [
+			(f"\\images\\Image{index}.png", f"image data {index}".encode("ascii"))
+			for index in range(30)
+		]
+		fpath = join(self.tempDir, "test.mdd")
+		writeMdict(fpath, items, blockSize=4, keyEncoding="utf-16-le")
+		mdd = MDD(fpath)
+		self.assertEqual(mdd.lookup("images/image3.png"), b"image data 3")
+		self.assertEqual(mdd.lookup("\\images\\Image29.png"), b"image data 29")
+		self.assertIsNone(mdd.lookup("images/image30.png"))
+		self.assertEqual(list(mdd.items())[5], (
+			"\\images\\Image5.png".encode("utf-8"),
+			b"image data 5",
+		))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+import sys
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import struct
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.plugin_lib.stardict_index import (
+	IdxIndex,
+	SynIndex,
+	openBuffer,
+)
+from pyglossary.os_utils import rmtree
+
+
+class TestStarDictIndex(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		# offsets and sizes contain NUL bytes
+		self.records = [
+			(f"word{index}".encode("utf-8"), index * 256, index % 3)
+			for index in range(1000)
+		]
+		self.records.append(("سلام".encode("utf-8"), 0, 0))
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def idxBytes(self, offsetFormat=">I"):
+		return b"".join(
+			b_word + b"\x00" +
+			struct.pack(offsetFormat, offset) +
+			struct.pack(">I", size)
+			for b_word, offset, size in self.records
+		)
+
+	def test_idx(self):
+		fpath = join(self.tempDir, "test.idx")
+		with open(fpath, "wb") as _file:
+			_file.write(self.idxBytes())
+		index = IdxIndex(openBuffer(fpath))
+		self.assertEqual(len(index), len(self.records))
+		self.assertEqual(list(index), self.records)
+		self.assertEqual(index[0], self.records[0])
+		self.assertEqual(index[123], self.records[123])
+		index.close()
+
+	def test_idx_64bit(self):
+		index = IdxIndex(self.idxBytes(">Q"), offsetBits=64)
+		self.assertEqual(list(index), self.records)
+
+	def test_idx_corrupted(self):
+		with self.assertLogs("pyglossary", level="ERROR"):
+			index = IdxIndex(self.idxBytes() + b"abc\x00\x01")
+		self.assertEqual(list(index), self.records)
+
+	def test_empty(self):
+		fpath = join(self.tempDir, "test.idx")
+		open(fpath, "wb").close()
+		index = IdxIndex(openBuffer(fpath))
+		self.assertEqual(len(index), 0)
+		self.assertEqual(list(index), [])
+
+	def test_syn(self):
+		synRecords = [
+			("alt-b", 5),
+			("alt-a", 2),
+			("alt-c", 5),
+			("invalid", 10),
+			("alt-d", 0),
+			("alt-e", 5),
+		]
+		buf = b"".join(
+			alt.encode("utf-8") + b"\x00" + struct.pack(">I", entryIndex)
+			for alt, entryIndex in synRecords
+		)
+		with self.assertLogs("pyglossary", level="ERROR"):
+			synIndex = SynIndex(buf, 10)
+		self.assertEqual(len(synIndex), len(synRecords))
+		self.assertEqual(synIndex.getAlts(5), ["alt-b", "alt-c", "alt-e"])
+		self.assertEqual(synIndex.getAlts(2), ["alt-a"])
+		self.assertEqual(synIndex.getAlts(0), ["alt-d"])
+		self.assertEqual(synIndex.getAlts(1), [])
+
+
+if __name__ == "__main__":
+	unittest.main()
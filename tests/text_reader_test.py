@@ -0,0 +1,220 @@
+#!/usr/bin/python3
+
+import sys
+import os
+import re
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import random
+import gzip
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.plugins.tabfile import Reader as TabfileReader
+from pyglossary.text_reader import (
+	TextFilePosWrapper,
+	WideTextFilePosWrapper,
+	openTextFilePos,
+)
+from pyglossary.os_utils import rmtree
+
+Glossary.init()
+
+
+class TestTextFilePosWrapper(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	b_lines = [
+		"word\tdefi\n".encode("utf-8"),
+		"\n".encode("utf-8"),
+		"واژه\tمعنی\r\n".encode("utf-8"),
+		"a\rb\x0cc\n".encode("utf-8"),
+		("x" * 100 + "\r\n").encode("utf-8"),
+		"last line".encode("utf-8"),
+	]
+
+	def readLines(self, wrapper):
+		lines = []
+		positions = []
+		for line in wrapper:
+			lines.append(line)
+			positions.append(wrapper.tell())
+		wrapper.close()
+		return lines, positions
+
+	def test_lines_and_pos(self):
+		self.checkLinesAndPos(b"".join(self.b_lines))
+
+	def test_lines_and_pos_cr(self):
+		# "\r" line endings (old Mac)
+		self.checkLinesAndPos(
+			"word\tdefi\r\rواژه\tمعنی\r".encode("utf-8") * 3 + b"last line",
+		)
+
+	def checkLinesAndPos(self, data):
+		filename = join(self.tempDir, "test.txt")
+		with open(filename, "wb") as _file:
+			_file.write(data)
+		# like text mode (universal newlines)
+		with open(filename, encoding="utf-8") as _file:
+			expectedLines = list(_file)
+		expectedPositions = []
+		pos = 0
+		for b_line in re.findall(b"[^\r\n]*(?:\r\n?|\n)|[^\r\n]+", data):
+			pos += len(b_line)
+			expectedPositions.append(pos)
+		self.assertEqual(len(expectedPositions), len(expectedLines))
+		for blockSize in (1, 7, 1000):
+			wrapper = openTextFilePos(filename, "utf-8")
+			self.assertIsInstance(wrapper, TextFilePosWrapper)
+			wrapper.blockSize = blockSize
+			wrapper._gen = wrapper._iterLines()
+			self.assertEqual(
+				self.readLines(wrapper),
+				(expectedLines, expectedPositions),
+			)
+
+	def test_compressed(self):
+		filename = join(self.tempDir, "test.txt.gz")
+		with gzip.open(filename, "wb") as _file:
+			_file.write(b"".join(self.b_lines) * 1000)
+		lines, positions = self.readLines(openTextFilePos(filename, "utf-8"))
+		# "last line" has no newline, and is joined with next "word"
+		# and "a\rb\x0cc\n" is 2 lines
+		self.assertEqual(len(lines), len(self.b_lines) * 1000 + 1)
+		# offsets in compressed file
+		self.assertEqual(positions, sorted(positions))
+		self.assertEqual(positions[-1], os.path.getsize(filename))
+
+	def test_tabfile_cr(self):
+		filename = join(self.tempDir, "test.txt")
+		with open(filename, "wb") as _file:
+			_file.write(b"a\tA\rb\tB\rc\tC\r")
+		glos = Glossary()
+		reader = TabfileReader(glos)
+		reader.open(filename)
+		entries = [
+			(entry.s_word, entry.defi)
+			for entry in reader
+			if entry is not None
+		]
+		reader.close()
+		self.assertEqual(entries, [("a", "A"), ("b", "B"), ("c", "C")])
+
+	def test_utf16(self):
+		filename = join(self.tempDir, "test.txt")
+		text = "word\tdefi\nواژه\tمعنی\n"
+		with open(filename, "w", encoding="utf-16") as _file:
+			_file.write(text)
+		wrapper = openTextFilePos(filename, "utf-16")
+		self.assertIsInstance(wrapper, WideTextFilePosWrapper)
+		lines, _ = self.readLines(wrapper)
+		self.assertEqual(lines, text.splitlines(keepends=True))
+
+
+class TestTextReaderParallel(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def writeInput(self, newline, count=3000):
+		rand = random.Random(0)
+		lines = [
+			"##name\tTest Glossary",
+			"##sourceLang\tEnglish",
+		]
+		for index in range(count):
+			defi = " ".join(
+				rand.choice(("alpha", "بتا", "gamma\\ndelta", "e\\tf", "g\\\\h"))
+				for _ in range(rand.randint(1, 30))
+			)
+			lines.append(f"word{index}|alt{index}\\|x\t{defi}")
+			if index % 500 == 0:
+				lines.append("")
+			if index % 777 == 0:
+				lines.append("line with no tab")
+		filename = join(self.tempDir, f"input-{len(newline)}.txt")
+		with open(filename, "w", encoding="utf-8", newline="") as _file:
+			_file.write(newline.join(lines) + newline)
+		return filename
+
+	def readEntries(self, filename, workers, chunkSize=4096):
+		glos = Glossary()
+		glos.config = {"workers": workers}
+		reader = TabfileReader(glos)
+		reader.parallelChunkSize = chunkSize
+		reader.open(filename)
+		entries = [
+			(entry.l_word, entry.defi, entry.byteProgress())
+			for entry in reader
+			if entry is not None
+		]
+		reader.close()
+		self.assertEqual(glos.getInfo("name"), "Test Glossary")
+		self.assertEqual(glos.getInfo("sourceLang"), "English")
+		return entries, len(reader)
+
+	def test_parallel(self):
+		filename = self.writeInput("\n")
+		serial, serialLen = self.readEntries(filename, 0)
+		parallel, parallelLen = self.readEntries(filename, 3)
+		self.assertEqual(len(serial), 3000)
+		self.assertEqual(parallelLen, 3000)
+		self.assertEqual(serial[0][0], ["word0", "alt0|x"])
+		self.assertEqual(serial, parallel)
+		self.assertEqual(parallel[-1][2][0], parallel[-1][2][1])
+
+	def test_parallel_crlf(self):
+		filename = self.writeInput("\r\n")
+		serial, _ = self.readEntries(filename, 0)
+		parallel, _ = self.readEntries(filename, 3)
+		self.assertEqual(len(serial), 3000)
+		# byteProgress of serial reader is not exact with \r\n
+		self.assertEqual(
+			[entry[:2] for entry in serial],
+			[entry[:2] for entry in parallel],
+		)
+		self.assertEqual(parallel[-1][2][0], parallel[-1][2][1])
+
+	def test_parallel_lone_cr(self):
+		filename = self.writeInput("\n", count=6000)
+		with open(filename, "rb") as _file:
+			data = _file.read()
+		# only in the second half, after the first block read by loadInfo
+		data = re.sub(b"\n(word5[0-9]{3}\\|)", b"\r\\1", data)
+		with open(filename, "wb") as _file:
+			_file.write(data)
+		serial, _ = self.readEntries(filename, 0)
+		parallel, _ = self.readEntries(filename, 3)
+		self.assertEqual(len(serial), 6000)
+		self.assertEqual(
+			[entry[:2] for entry in serial],
+			[entry[:2] for entry in parallel],
+		)
+
+	def test_parallel_cr(self):
+		filename = self.writeInput("\r")
+		serial, _ = self.readEntries(filename, 0)
+		parallel, _ = self.readEntries(filename, 3)
+		self.assertEqual(len(serial), 3000)
+		self.assertEqual(serial, parallel)
+
+	def test_small_file(self):
+		# smaller than 2 chunks, read in main process
+		filename = self.writeInput("\n", count=10)
+		serial, _ = self.readEntries(filename, 0)
+		parallel, _ = self.readEntries(filename, 3, chunkSize=1 << 20)
+		self.assertEqual(serial, parallel)
+
+
+if __name__ == "__main__":
+	unittest.main()
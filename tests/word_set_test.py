@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+import sys
+from os.path import dirname, abspath, isfile
+import unittest
+import random
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.glossary import Glossary
+from pyglossary.entry import Entry
+from pyglossary.entry_filters import (
+	PreventDuplicateWords,
+	SkipEntriesWithDuplicateHeadword,
+)
+from pyglossary.word_set import (
+	MemoryWordSet,
+	FingerprintWordSet,
+	DiskWordSet,
+	BloomFilter,
+)
+
+Glossary.init()
+
+
+class TestWordSet(unittest.TestCase):
+	def setUp(self):
+		rand = random.Random(0)
+		self.words = [
+			"".join(rand.choice("abcdef") for _ in range(rand.randint(1, 7)))
+			for _ in range(20000)
+		]
+
+	def checkWordSet(self, wordSet):
+		expected = set()
+		for word in self.words:
+			self.assertEqual(wordSet.add(word), word not in expected, word)
+			expected.add(word)
+		self.assertEqual(len(wordSet), len(expected))
+		for word in expected:
+			self.assertIn(word, wordSet)
+		self.assertNotIn("ghi", wordSet)
+		self.assertNotIn("", wordSet)
+		wordSet.close()
+
+	def test_memory(self):
+		self.checkWordSet(MemoryWordSet())
+
+	def test_hash(self):
+		wordSet = FingerprintWordSet(capacity=4)
+		self.checkWordSet(wordSet)
+
+	def test_disk(self):
+		wordSet = DiskWordSet(bitCountLog=12)
+		wordSet.insertBatchSize = 100
+		filename = wordSet._filename
+		self.assertTrue(isfile(filename))
+		self.checkWordSet(wordSet)
+		self.assertFalse(isfile(filename))
+
+	def test_disk_large_bloom(self):
+		wordSet = DiskWordSet(bitCountLog=20)
+		for index in range(10000):
+			self.assertTrue(wordSet.add(f"word{index}"))
+		# no (or very few) false positives, so database is not queried
+		self.assertLess(wordSet._queryCount, 10)
+		self.assertFalse(wordSet.add("word5"))
+		wordSet.close()
+
+	def test_bloom(self):
+		bloom = BloomFilter(bitCountLog=16)
+		self.assertTrue(bloom.add("a"))
+		self.assertFalse(bloom.add("a"))
+		self.assertIn("a", bloom)
+		self.assertNotIn("b", bloom)
+
+
+class TestDuplicateFilters(unittest.TestCase):
+	def newEntries(self):
+		for word in ("a", "b", "a", "a (3)", "a", "b", "a"):
+			yield Entry(word, "defi")
+
+	def runFilter(self, filterClass, wordSetType):
+		glos = Glossary()
+		glos.config = {"word_set": wordSetType}
+		entryFilter = filterClass(glos)
+		result = []
+		for entry in self.newEntries():
+			entry = entryFilter.run(entry)
+			if entry is not None:
+				result.append(entry.s_word)
+		return result
+
+	def test_prevent_duplicate_words(self):
+		for wordSetType in ("memory", "hash", "disk"):
+			self.assertEqual(
+				self.runFilter(PreventDuplicateWords, wordSetType),
+				["a", "b", "a (2)", "a (3)", "a (4)", "b (2)", "a (5)"],
+			)
+
+	def test_skip_duplicate_headword(self):
+		for wordSetType in ("memory", "hash", "disk"):
+			self.assertEqual(
+				self.runFilter(SkipEntriesWithDuplicateHeadword, wordSetType),
+				["a", "b", "a (3)"],
+			)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import unittest
+import tempfile
+import random
+import zipfile
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from pyglossary.zip_writer import ZipStreamWriter
+from pyglossary.os_utils import rmtree
+
+
+class TestZipStreamWriter(unittest.TestCase):
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		rand = random.Random(0)
+		self.items = [
+			("mimetype", b"application/epub+zip", zipfile.ZIP_STORED),
+			("META-INF/container.xml", b"<container/>", zipfile.ZIP_DEFLATED),
+			("OEBPS/متن.xhtml", "متن".encode("utf-8"), zipfile.ZIP_DEFLATED),
+			("OEBPS/empty.css", b"", zipfile.ZIP_DEFLATED),
+		]
+		for index in range(30):
+			data = " ".join(
+				rand.choice(("alpha", "beta", "gamma", "delta"))
+				for _ in range(rand.randint(10, 5000))
+			).encode("ascii")
+			self.items.append((f"OEBPS/g{index:06d}.xhtml", data, zipfile.ZIP_DEFLATED))
+		self.items.append(("OEBPS/image.png", os.urandom(20000), zipfile.ZIP_STORED))
+
+	def tearDown(self):
+		rmtree(self.tempDir)
+
+	def checkZip(self, workers):
+		filename = join(self.tempDir, f"test{workers}.zip")
+		zipWriter = ZipStreamWriter(filename, workers=workers)
+		for name, data, compressType in self.items:
+			zipWriter.add(name, data, compressType)
+		zipWriter.close()
+		zipWriter.close()  # no-op
+
+		with zipfile.ZipFile(filename) as zipFp:
+			self.assertIsNone(zipFp.testzip())
+			self.assertEqual(
+				[(info.filename, info.compress_type) for info in zipFp.infolist()],
+				[(name, compressType) for name, _, compressType in self.items],
+			)
+			for name, data, _ in self.items:
+				self.assertEqual(zipFp.read(name), data)
+		with open(filename, "rb") as _file:
+			# mimetype must be the first file, and not compressed (for epub)
+			self.assertEqual(_file.read(58)[30:], b"mimetypeapplication/epub+zip")
+
+	def test_one_worker(self):
+		self.checkZip(1)
+
+	def test_three_workers(self):
+		self.checkZip(3)
+
+	def test_zero_workers(self):
+		# like the workers config, 0 or 1 means no threads
+		zipWriter = ZipStreamWriter(join(self.tempDir, "test.zip"), workers=0)
+		self.assertIsNone(zipWriter._executor)
+		zipWriter.close()
+		self.checkZip(0)
+
+
+if __name__ == "__main__":
+	unittest.main()